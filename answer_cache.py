@@ -0,0 +1,163 @@
+"""Disk-backed LLM answer cache shared by every session and process on a host."""
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS answers (
+    key TEXT PRIMARY KEY,
+    scope TEXT NOT NULL,
+    question TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    created REAL NOT NULL,
+    last_access REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS answers_scope ON answers (scope);
+CREATE INDEX IF NOT EXISTS answers_last_access ON answers (last_access);
+"""
+
+# Words that flip a question's meaning; near-duplicates must agree on them
+NEGATIONS = frozenset(["not", "no", "never", "without", "cannot", "cant", "dont", "doesnt", "isnt",
+                       "arent", "wont", "except", "neither", "nor"])
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase words separated by single spaces, punctuation dropped"""
+    return " ".join(re.findall(r"[a-z0-9]+", question.lower()))
+
+
+def _sha256(*parts: str) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode('utf-8'))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _bigrams(words) -> set:
+    padded = ["^"] + words + ["$"]
+    return set(zip(padded, padded[1:]))
+
+
+def question_similarity(a: str, b: str) -> float:
+    """Jaccard similarity of word bigrams, so word order counts; 0 when negations differ"""
+    left, right = a.split(), b.split()
+    if not left or not right or NEGATIONS.intersection(left) != NEGATIONS.intersection(right):
+        return 0.0
+    left, right = _bigrams(left), _bigrams(right)
+    return len(left & right) / len(left | right)
+
+
+class AnswerCache:
+    """SQLite cache of chat completions.
+
+    Exact hits are keyed on a hash of the model, system prompt, retrieved
+    context and normalized question. Near-duplicate matching is off unless a
+    threshold is given; it compares word bigrams, so reordered words ("can
+    counties fund nonprofits" / "can nonprofits fund counties") do not match,
+    and never matches questions that differ in a negation. It only considers
+    entries with the same model, system prompt and context (the "scope"), so
+    a reworded question can never pick up an answer that was generated from
+    different sources.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float = 7 * 24 * 3600, max_entries: int = 5000,
+                 near_duplicate_threshold: Optional[float] = None):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.near_duplicate_threshold = near_duplicate_threshold
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread; WAL lets readers in other processes proceed during writes"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def make_key(model: str, system_prompt: str, context: str, question: str) -> Tuple[str, str]:
+        """Return (exact key, scope key) for a request"""
+        scope = _sha256(model, system_prompt, context)
+        return _sha256(scope, normalize_question(question)), scope
+
+    def get(self, model: str, system_prompt: str, context: str, question: str) -> Optional[str]:
+        key, scope = self.make_key(model, system_prompt, context, question)
+        now = time.time()
+        oldest = now - self.ttl_seconds
+        conn = self._connect()
+        with conn:
+            row = conn.execute(
+                "SELECT key, answer FROM answers WHERE key = ? AND created >= ?", (key, oldest)
+            ).fetchone()
+            if row is None and self.near_duplicate_threshold is not None:
+                row = self._near_duplicate(conn, scope, normalize_question(question), oldest)
+            if row is None:
+                with self._stats_lock:
+                    self.misses += 1
+                return None
+            conn.execute(
+                "UPDATE answers SET last_access = ?, hits = hits + 1 WHERE key = ?", (now, row[0])
+            )
+        with self._stats_lock:
+            self.hits += 1
+        return row[1]
+
+    def _near_duplicate(self, conn: sqlite3.Connection, scope: str, question: str,
+                        oldest: float) -> Optional[Tuple[str, str]]:
+        best, best_score = None, self.near_duplicate_threshold
+        for key, cached_question, answer in conn.execute(
+            "SELECT key, question, answer FROM answers WHERE scope = ? AND created >= ?",
+            (scope, oldest)
+        ):
+            score = question_similarity(question, cached_question)
+            if score >= best_score:
+                best, best_score = (key, answer), score
+        return best
+
+    def put(self, model: str, system_prompt: str, context: str, question: str, answer: str):
+        key, scope = self.make_key(model, system_prompt, context, question)
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO answers (key, scope, question, answer, created, last_access, hits) "
+                "VALUES (?, ?, ?, ?, ?, ?, 0)",
+                (key, scope, normalize_question(question), answer, now, now)
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        """Drop expired entries, then the least recently used beyond max_entries"""
+        conn.execute("DELETE FROM answers WHERE created < ?", (now - self.ttl_seconds,))
+        conn.execute(
+            "DELETE FROM answers WHERE key IN ("
+            "SELECT key FROM answers ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM answers")
+
+    def stats(self) -> Dict[str, int]:
+        count = self._connect().execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+        with self._stats_lock:
+            hits, misses = self.hits, self.misses
+        return {"hits": hits, "misses": misses, "size": count, "max_entries": self.max_entries}
@@ -0,0 +1,346 @@
+"""Headless JSON HTTP API over the grant assistant, independent of the Streamlit UI.
+
+Endpoints::
+
+    GET  /health                      corpus generation, chunk count and cache stats
+    GET  /advisor?county=Centre       regional advisor for a county
+    GET  /metrics[?format=jsonl]      stage timings and counters (Prometheus text)
+    POST /search     {"query", "mode"?}               ranked passages
+    POST /answer     {"query", "history"?}            complete answer
+    POST /answer/stream {"query", "history"?}         answer as server-sent events
+    POST /eligibility {"entity_type", ..., "grant_type"?}
+    POST /evaluate   {application fields} or {"applications": [...]}
+
+Requests are served by a fixed pool of worker threads over one warm, shared
+public corpus; when every worker is busy and the backlog is full, new
+connections get 503 so a load balancer can retry elsewhere. Run one process
+per core behind the balancer to scale out. An idle keep-alive connection
+holds a worker for at most DCNR_API_IDLE_TIMEOUT seconds (default 5) and is
+closed after its response whenever other connections are waiting.
+
+The server keeps no sessions: "history" is the earlier transcript as
+[{"role", "content"}] messages, trimmed to the same token ceiling as the
+app's conversation memory.
+
+Usage::
+
+    python api_server.py [--host 127.0.0.1] [--port 8600] [--workers 8]
+"""
+import argparse
+import json
+import logging
+import os
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from assistant import AssistantService, search_payload, sources_of
+from batch_scoring import BOOL_COLUMNS, NUMBER_COLUMNS
+from llm_client import get_shared_client
+from metrics import METRICS, inc, span
+from retrieval import SEARCH_MODES
+
+logger = logging.getLogger(__name__)
+
+MAX_BODY_BYTES = 1024 * 1024
+TEXT_FIELDS = ('entity_type', 'project_type', 'county', 'grant_type')
+
+
+class APIError(Exception):
+    """A request the API rejects, with the HTTP status to report"""
+
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def validate_application(record, where: str = "") -> Dict:
+    """Reject an eligibility or evaluation body whose known fields have the wrong JSON type"""
+    if not isinstance(record, dict):
+        raise APIError(HTTPStatus.BAD_REQUEST, f"'{where.rstrip('.')}' must be a JSON object")
+    for name, value in record.items():
+        if name in TEXT_FIELDS:
+            if not isinstance(value, str):
+                raise APIError(HTTPStatus.BAD_REQUEST, f"'{where}{name}' must be a string")
+        elif name in NUMBER_COLUMNS:
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise APIError(HTTPStatus.BAD_REQUEST, f"'{where}{name}' must be a number")
+        elif name in BOOL_COLUMNS or name.startswith('has_'):
+            if not isinstance(value, bool):
+                raise APIError(HTTPStatus.BAD_REQUEST, f"'{where}{name}' must be true or false")
+    return record
+
+
+class APIRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "DCNRGrantAPI/1.0"
+    # Idle keep-alive connections give their worker back after this many seconds
+    timeout = float(os.environ.get("DCNR_API_IDLE_TIMEOUT", 5))
+
+    @property
+    def service(self) -> AssistantService:
+        return self.server.service
+
+    def log_message(self, format, *args):
+        logger.debug("%s %s", self.address_string(), format % args)
+
+    def send_json(self, status: HTTPStatus, payload):
+        body = json.dumps(payload, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_json(self) -> Dict:
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            raise APIError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+        if length > MAX_BODY_BYTES:
+            raise APIError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"Body exceeds {MAX_BODY_BYTES} bytes")
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError as e:
+            raise APIError(HTTPStatus.BAD_REQUEST, f"Invalid JSON: {e}")
+        if not isinstance(body, dict):
+            raise APIError(HTTPStatus.BAD_REQUEST, "Body must be a JSON object")
+        return body
+
+    @staticmethod
+    def require_query(body: Dict) -> str:
+        query = body.get('query')
+        if not isinstance(query, str) or not query.strip():
+            raise APIError(HTTPStatus.BAD_REQUEST, "'query' must be a non-empty string")
+        return query
+
+    @staticmethod
+    def optional_history(body: Dict) -> List[Dict]:
+        history = body.get('history') or []
+        if not isinstance(history, list) or not all(
+                isinstance(m, dict) and isinstance(m.get('content'), str) for m in history):
+            raise APIError(HTTPStatus.BAD_REQUEST, "'history' must be a list of {\"role\", \"content\"} messages")
+        return history
+
+    def dispatch(self, routes: Dict):
+        url = urlsplit(self.path)
+        handler = routes.get(url.path)
+        route = url.path if handler is not None else "/unknown"
+        self.status = 0
+        # Route names are dotted so they do not read as nested span paths
+        with span("api" + route.replace("/", ".")):
+            try:
+                if handler is None:
+                    raise APIError(HTTPStatus.NOT_FOUND, f"No endpoint {self.command} {url.path}")
+                handler(self, url)
+            except APIError as e:
+                self.send_json(e.status, {'error': str(e)})
+            except Exception as e:
+                logger.exception("Error handling %s %s", self.command, self.path)
+                self.send_json(HTTPStatus.INTERNAL_SERVER_ERROR, {'error': str(e)})
+        inc("dcnr_http_requests_total", route=route, status=self.status)
+
+    def send_response(self, code, message=None):
+        self.status = int(code)
+        super().send_response(code, message)
+
+    def end_headers(self):
+        # Connections waiting for a worker get this one once the response is done
+        if self.server.waiting and not self.close_connection:
+            self.send_header("Connection", "close")
+        super().end_headers()
+
+    def do_GET(self):
+        self.dispatch(GET_ROUTES)
+
+    def do_POST(self):
+        self.dispatch(POST_ROUTES)
+
+    # Endpoints
+
+    def get_metrics(self, url):
+        """Prometheus text by default; ?format=jsonl for one JSON object per series"""
+        if parse_qs(url.query).get('format', [''])[0] == 'jsonl':
+            body, content_type = METRICS.render_jsonl(), "application/x-ndjson"
+        else:
+            body, content_type = METRICS.render_prometheus(), "text/plain; version=0.0.4; charset=utf-8"
+        data = body.encode('utf-8')
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def get_health(self, url):
+        self.send_json(HTTPStatus.OK, self.service.health())
+
+    def get_advisor(self, url):
+        county = parse_qs(url.query).get('county', [''])[0]
+        if not county:
+            raise APIError(HTTPStatus.BAD_REQUEST, "'county' query parameter is required")
+        advisor = self.service.advisor(county)
+        if advisor is None:
+            raise APIError(HTTPStatus.NOT_FOUND, f"No regional advisor found for '{county}'")
+        self.send_json(HTTPStatus.OK, advisor)
+
+    def post_search(self, url):
+        body = self.read_json()
+        mode = body.get('mode', 'hybrid')
+        if mode not in SEARCH_MODES:
+            raise APIError(HTTPStatus.BAD_REQUEST, f"'mode' must be one of {', '.join(SEARCH_MODES)}")
+        results = self.service.search(self.require_query(body), mode)
+        self.send_json(HTTPStatus.OK, {'results': search_payload(results)})
+
+    def post_answer(self, url):
+        body = self.read_json()
+        query = self.require_query(body)
+        answer, results = self.service.answer(query, history=self.optional_history(body))
+        self.send_json(HTTPStatus.OK, {'query': query, 'answer': answer, 'sources': sources_of(results)})
+
+    def post_answer_stream(self, url):
+        """Server-sent events: one 'data' event per answer piece, then 'event: done'"""
+        body = self.read_json()
+        pieces = self.service.stream(self.require_query(body), history=self.optional_history(body))
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for piece in pieces:
+                self.write_chunk(f"data: {json.dumps({'delta': piece})}\n\n")
+            self.write_chunk("event: done\ndata: {}\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # Client went away; stop generating
+            pieces.close()
+            self.close_connection = True
+        except Exception as e:
+            # Headers are already sent, so the error goes to the client as an event, not a JSON response
+            logger.exception("Error streaming %s", self.path)
+            self.status = HTTPStatus.INTERNAL_SERVER_ERROR
+            self.close_connection = True
+            try:
+                self.write_chunk(f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n")
+                self.wfile.write(b"0\r\n\r\n")
+            except OSError:
+                pass
+
+    def write_chunk(self, text: str):
+        data = text.encode('utf-8')
+        self.wfile.write(f"{len(data):X}\r\n".encode('ascii') + data + b"\r\n")
+        self.wfile.flush()
+
+    def post_eligibility(self, url):
+        self.send_json(HTTPStatus.OK, self.service.eligibility(validate_application(self.read_json())))
+
+    def post_evaluate(self, url):
+        body = self.read_json()
+        if 'applications' in body:
+            if not isinstance(body['applications'], list):
+                raise APIError(HTTPStatus.BAD_REQUEST, "'applications' must be a list")
+            for i, record in enumerate(body['applications']):
+                validate_application(record, f"applications[{i}].")
+        else:
+            validate_application(body)
+        self.send_json(HTTPStatus.OK, self.service.evaluate(body))
+
+
+GET_ROUTES = {
+    '/health': APIRequestHandler.get_health,
+    '/advisor': APIRequestHandler.get_advisor,
+    '/metrics': APIRequestHandler.get_metrics,
+}
+POST_ROUTES = {
+    '/search': APIRequestHandler.post_search,
+    '/answer': APIRequestHandler.post_answer,
+    '/answer/stream': APIRequestHandler.post_answer_stream,
+    '/eligibility': APIRequestHandler.post_eligibility,
+    '/evaluate': APIRequestHandler.post_evaluate,
+}
+
+
+class PooledHTTPServer(HTTPServer):
+    """HTTPServer that hands each connection to a fixed pool of worker threads.
+
+    At most workers + backlog connections are accepted at once; beyond that
+    a connection is answered with 503 straight away instead of queueing.
+    """
+
+    def __init__(self, address, service: AssistantService, workers: int = 8, backlog: int = 64):
+        super().__init__(address, APIRequestHandler)
+        self.service = service
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api-worker")
+        self.slots = threading.BoundedSemaphore(workers + backlog)
+        # Accepted connections not yet picked up by a worker
+        self.waiting = 0
+        self._waiting_lock = threading.Lock()
+
+    def process_request(self, request, client_address):
+        if not self.slots.acquire(blocking=False):
+            self._reject(request)
+            return
+        with self._waiting_lock:
+            self.waiting += 1
+        self.pool.submit(self._serve, request, client_address)
+
+    def _serve(self, request, client_address):
+        with self._waiting_lock:
+            self.waiting -= 1
+        try:
+            # Streamed answer pieces are small; send each one immediately
+            request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self.slots.release()
+
+    def _reject(self, request):
+        body = b'{"error": "Server busy"}'
+        try:
+            request.sendall(b"HTTP/1.1 503 Service Unavailable\r\nContent-Type: application/json\r\n"
+                            b"Retry-After: 1\r\nConnection: close\r\n"
+                            + f"Content-Length: {len(body)}\r\n\r\n".encode('ascii') + body)
+        except OSError:
+            pass
+        self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=True)
+
+
+def main(argv: Optional[Iterable[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Serve the grant assistant as a JSON HTTP API")
+    parser.add_argument("--host", default=os.environ.get("DCNR_API_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("DCNR_API_PORT", 8600)))
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("DCNR_API_WORKERS", 8)),
+                        help="worker threads serving requests")
+    parser.add_argument("--backlog", type=int, default=64,
+                        help="connections allowed to wait for a worker before answering 503")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    api_key = os.environ.get("OPENAI_API_KEY")
+    # Without a key, answers are extractive, as in the app
+    service = AssistantService(client=get_shared_client(api_key) if api_key else None)
+    service.warm()
+    server = PooledHTTPServer((args.host, args.port), service, workers=args.workers, backlog=args.backlog)
+    logger.info("Serving on http://%s:%d with %d workers", args.host, args.port, args.workers)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -6,18 +6,19 @@ for proxy in ['HTTP_PROXY', 'HTTPS_PROXY', 'http_proxy', 'https_proxy', 'ALL_PRO
     if proxy in os.environ:
         del os.environ[proxy]
 
-# Now import OpenAI
-from openai import OpenAI
-import PyPDF2
-import requests
-from bs4 import BeautifulSoup
-from datetime import datetime, timedelta
-import json
-import pickle
-from typing import Dict, List, Tuple
+# Now import the OpenAI-backed client
+from llm_client import get_shared_client
+from typing import List, Tuple
 import time
-import threading
-import streamlit.components.v1 as components
+from regional_advisors import format_advisor_info, get_regional_advisor
+from assistant import RETRIEVAL_CONFIG, SAMPLE_QUESTIONS, create_answer_cache, search_all_content, stream_answer
+from conversation import ConversationMemory
+from grant_rag import GrantRAGSystem
+from ingest_cache import IngestionCache
+from metrics import span
+from pdf_extract import DEFAULT_MAX_BYTES, DEFAULT_MAX_PAGES, PDFDocument
+from public_corpus import PublicCorpus
+from retrieval import CorpusIndex, RetrievalCache
 
 # Page config
 st.set_page_config(page_title="PA DCNR Grant Assistant", page_icon="🌲", layout="wide")
@@ -27,110 +28,6 @@ st.set_page_config(page_title="PA DCNR Grant Assistant", page_icon="🌲", layou
 # For Streamlit Cloud, it will use the secret
 OPENAI_API_KEY = st.secrets.get("OPENAI_API_KEY", "sk-your-actual-api-key-here")
 
-# Regional Advisors Data
-REGIONAL_ADVISORS = {
-    "regions": {
-        "1": {
-            "advisor": "Danielle Guttman",
-            "phone": "(717) 884-6908",
-            "email": "dguttman@pa.gov",
-            "counties": ["philadelphia", "delaware", "chester", "montgomery", "bucks"]
-        },
-        "2": {
-            "advisor": "Jeanne Barrett Ortiz",
-            "phone": "(267) 252-2806",
-            "email": "jeabarrett@pa.gov",
-            "counties": ["northampton", "lehigh", "carbon", "monroe", "pike"]
-        },
-        "3": {
-            "advisor": "Lindsay Baer",
-            "phone": "(717) 858-1185",
-            "email": "libaer@pa.gov",
-            "counties": ["perry", "cumberland", "franklin", "adams", "york", "lancaster", 
-                        "lebanon", "dauphin", "juniata", "mifflin", "huntingdon", "blair", 
-                        "cambria", "bedford", "fulton", "somerset"]
-        },
-        "4": {
-            "advisor": "Wes Fahringer",
-            "phone": "(570) 900-3265",
-            "email": "mfahringer@pa.gov",
-            "counties": ["centre", "clinton", "lycoming", "union", "snyder", 
-                        "northumberland", "montour", "columbia"]
-        },
-        "5": {
-            "advisor": "Adriene Smochek",
-            "phone": "(412) 565-7803",
-            "email": "asmochek@pa.gov",
-            "counties": ["beaver", "allegheny", "washington", "greene", "fayette", 
-                        "westmoreland", "indiana", "armstrong", "butler", "lawrence"]
-        },
-        "6": {
-            "advisor": "Adam Mattis",
-            "phone": "(412) 770-3774",
-            "email": "amattis@pa.gov",
-            "counties": ["erie", "crawford", "mercer", "venango", "forest", "warren", 
-                        "mckean", "elk", "clarion", "jefferson", "clearfield", "potter", 
-                        "tioga", "bradford", "susquehanna", "wayne", "wyoming", "sullivan", 
-                        "lackawanna"]
-        }
-    }
-}
-
-def get_regional_advisor(county_name):
-    """Get the regional advisor for a given county"""
-    county_lower = county_name.lower().strip()
-    
-    # First try exact match
-    for region_num, region_data in REGIONAL_ADVISORS["regions"].items():
-        if county_lower in region_data["counties"]:
-            return {
-                "region": region_num,
-                "advisor_name": region_data["advisor"],
-                "phone": region_data["phone"],
-                "email": region_data["email"],
-                "counties_served": region_data["counties"]
-            }
-    
-    # If no exact match, try fuzzy matching for common typos
-    from difflib import get_close_matches
-    all_counties = []
-    for region_data in REGIONAL_ADVISORS["regions"].values():
-        all_counties.extend(region_data["counties"])
-    
-    # Find close matches (allowing for typos)
-    close_matches = get_close_matches(county_lower, all_counties, n=1, cutoff=0.6)
-    
-    if close_matches:
-        matched_county = close_matches[0]
-        # Now find which region this county belongs to
-        for region_num, region_data in REGIONAL_ADVISORS["regions"].items():
-            if matched_county in region_data["counties"]:
-                return {
-                    "region": region_num,
-                    "advisor_name": region_data["advisor"],
-                    "phone": region_data["phone"],
-                    "email": region_data["email"],
-                    "counties_served": region_data["counties"],
-                    "matched_county": matched_county  # Include what we matched to
-                }
-    
-    return None
-
-def format_advisor_info(advisor_info):
-    """Format advisor information for display"""
-    if not advisor_info:
-        return "Regional advisor information not found. Please check the county name."
-    
-    return f"""
-**Your Regional Advisor (Region {advisor_info['region']}):**
-👤 **{advisor_info['advisor_name']}**
-📞 Phone: {advisor_info['phone']}
-📧 Email: {advisor_info['email']}
-
-This advisor serves {len(advisor_info['counties_served'])} counties in your region.
-Contact them early in your grant planning process for guidance and support!
-"""
-
 # Enhanced CSS with more animations and styling
 st.markdown("""
 <style>
@@ -517,10 +414,10 @@ st.markdown("""
 # Initialize session state
 if 'messages' not in st.session_state:
     st.session_state.messages = []
+if 'memory' not in st.session_state:
+    st.session_state.memory = ConversationMemory.from_env()
 if 'documents' not in st.session_state:
     st.session_state.documents = {}
-if 'grant_data' not in st.session_state:
-    st.session_state.grant_data = {}
 if 'client' not in st.session_state:
     st.session_state.client = None
 if 'last_update' not in st.session_state:
@@ -529,605 +426,156 @@ if 'question_clicked' not in st.session_state:
     st.session_state.question_clicked = False
 if 'pending_question' not in st.session_state:
     st.session_state.pending_question = None
+if 'document_chunks' not in st.session_state:
+    st.session_state.document_chunks = {}
+if 'document_files' not in st.session_state:
+    st.session_state.document_files = {}
+if 'search_index' not in st.session_state:
+    st.session_state.search_index = None
+if 'upload_version' not in st.session_state:
+    st.session_state.upload_version = 0
+if 'retrieval_cache' not in st.session_state:
+    st.session_state.retrieval_cache = RetrievalCache(maxsize=256)
 
 def get_openai_client():
-    """Get or create OpenAI client with minimal configuration"""
-    if 'client' not in st.session_state or st.session_state.client is None:
-        try:
-            # Double-check no proxy settings exist
-            for proxy in ['HTTP_PROXY', 'HTTPS_PROXY', 'http_proxy', 'https_proxy', 'ALL_PROXY', 'all_proxy']:
-                if proxy in os.environ:
-                    del os.environ[proxy]
-            
-            # Check if we're on Streamlit Cloud
-            if os.environ.get('STREAMLIT_SHARING_MODE'):
-                # Use environment variable for API key on Streamlit Cloud
-                api_key = st.secrets.get("OPENAI_API_KEY", OPENAI_API_KEY)
-            else:
-                # Use hardcoded key for local development
-                api_key = OPENAI_API_KEY
-            
-            # Create the most basic client possible
-            client = OpenAI(api_key=api_key)
-            
-            # Store it
-            st.session_state.client = client
-            return client
-            
-        except Exception as e:
-            st.error(f"Error creating OpenAI client: {str(e)}")
-            # Try alternative initialization
-            try:
-                # Set API key directly and try again
-                os.environ['OPENAI_API_KEY'] = api_key
-                client = OpenAI()
-                st.session_state.client = client
-                return client
-            except Exception as e2:
-                st.error(f"Alternative initialization also failed: {str(e2)}")
-                return None
-    
-    return st.session_state.client
-
-class GrantRAGSystem:
-    def __init__(self):
-        self.grant_url = "https://www.pa.gov/agencies/dcnr/programs-and-services/grants/community-conservation-partnerships-program-grants.html"
-        self.data_file = "grant_data.pkl"
-        
-    def scrape_grant_data(self):
-        """Scrape grant information from PA DCNR website"""
-        try:
-            response = requests.get(self.grant_url, timeout=30)
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            grant_data = {
-                'last_updated': datetime.now().isoformat(),
-                'grants': [],
-                'general_info': '',
-                'deadlines': [],
-                'eligibility_criteria': {},
-                'planning_session_transcript': self.get_planning_session_content(),
-                'regional_advisors': REGIONAL_ADVISORS
-            }
-            
-            # Extract general program information
-            main_content = soup.find('main') or soup.find('div', class_='content')
-            if main_content:
-                # Extract paragraphs and lists
-                for elem in main_content.find_all(['p', 'ul', 'ol', 'h2', 'h3']):
-                    grant_data['general_info'] += elem.get_text(strip=True) + '\n'
-            
-            # Look for specific grant types
-            grant_sections = soup.find_all(['section', 'div'], class_=['grant', 'program'])
-            for section in grant_sections:
-                grant_info = {
-                    'title': section.find(['h2', 'h3']).get_text(strip=True) if section.find(['h2', 'h3']) else '',
-                    'description': '',
-                    'eligibility': '',
-                    'deadline': ''
-                }
-                
-                # Extract grant details
-                for p in section.find_all('p'):
-                    text = p.get_text(strip=True)
-                    if 'eligib' in text.lower():
-                        grant_info['eligibility'] += text + ' '
-                    elif 'deadline' in text.lower() or 'due' in text.lower():
-                        grant_info['deadline'] = text
-                    else:
-                        grant_info['description'] += text + ' '
-                
-                if grant_info['title']:
-                    grant_data['grants'].append(grant_info)
-            
-            # Save scraped data
-            with open(self.data_file, 'wb') as f:
-                pickle.dump(grant_data, f)
-            
-            return grant_data
-            
-        except Exception as e:
-            st.error(f"Error scraping website: {str(e)}")
-            # Return at least the planning session content
-            return {
-                'last_updated': datetime.now().isoformat(),
-                'grants': [],
-                'general_info': '',
-                'deadlines': [],
-                'eligibility_criteria': {},
-                'planning_session_transcript': self.get_planning_session_content(),
-                'regional_advisors': REGIONAL_ADVISORS
-            }
-    
-    def get_planning_session_content(self):
-        """Get the DCNR planning session transcript content"""
-        return """DCNR Community Conservation Partnerships Program - Planning Session Information
-
-Important Dates:
-- Grant applications accepted: January 21st, 2025 through April 2nd, 2025
-- Application deadline: April 2nd, 2025 at 4:00 PM
-
-Eligible Applicants:
-- Municipalities
-- Municipal authorities
-- Council of Governments
-- Conservation districts
-- School districts
-- Nonprofit 501c3 organizations
-
-Note: Municipal applicants are strongly encouraged because they are eligible for Keystone Fund. Nonprofits are only eligible for environmental stewardship funds, which is very limited.
-
-Planning Project Types:
-1. Master Site Development Plans
-   - Site-specific plan for development, rehabilitation, use, and management
-   - Focus on one site owned or controlled by applicant
-   - Typical grant award: $25,000 to $75,000
-
-2. Comprehensive Recreation, Park, Open Space & Greenway Plans
-   - Long-term development for park recreation systems
-   - Can be municipal, county, or regional scale
-   - Establishes priorities, actions, costs, and timeline
-
-3. Conservation Management/Stewardship Plans
-   - Analyzes conservation of natural areas and critical habitat
-   - Includes public access and passive recreation opportunities
-   - Requires collaboration with conservancy or land trust
-
-4. Swimming Pool Complex Feasibility Studies
-   - Structural assessment of existing features
-   - Market analysis and financial capability assessment
-   - Public engagement essential
-
-5. Indoor Recreation Facility Feasibility Studies
-   - For recreation centers, gymnasiums, indoor ice rinks
-   - Includes parking, accessibility, and site amenities
-   - Focus on one site only
-
-Grant Requirements:
-- Minimum of two quotes from qualified consultants required
-- Dollar-for-dollar match requirement
-- Detailed scope of work required (not lump sum)
-- Public participation required for all plans
-- For existing facilities: 25-year minimum lease or ownership
-
-Ready-to-Go Status Requirements:
-1. Clear and detailed scope of work uploaded
-2. Realistic, detailed budget (no lump sums)
-3. Funding commitment letter for match
-4. Site control documentation (for site-specific plans)
-
-Budget Categories:
-- Contracted professional services
-- Donated professional services
-- Other project costs (cash and non-cash)
-
-Scoring (100 points maximum):
-- Ready-to-go status
-- Criteria questions responses
-- Consistency with local/regional plans
-- Partnerships
-
-Key Tips:
-- Contact your bureau regional advisor early
-- Review frequently asked questions document
-- Involve qualified consultants early
-- Obtain detailed cost estimates
-- Reference help text in grant application
-- Visit apps.dcnr.pa.gov for resources
-
-REGIONAL ADVISORS:
-It's important to contact your regional advisor early in the grant planning process. They can provide guidance on your application and help ensure you meet all requirements."""
-    
-    def load_grant_data(self):
-        """Load saved grant data or scrape if needed"""
-        if os.path.exists(self.data_file):
-            with open(self.data_file, 'rb') as f:
-                data = pickle.load(f)
-                
-            # Check if data is older than 30 days
-            last_update = datetime.fromisoformat(data['last_updated'])
-            if datetime.now() - last_update > timedelta(days=30):
-                return self.scrape_grant_data()
-            
-            # Ensure regional advisors are included
-            if 'regional_advisors' not in data:
-                data['regional_advisors'] = REGIONAL_ADVISORS
-                
-            return data
-        else:
-            return self.scrape_grant_data()
-    
-    def check_eligibility(self, user_info: Dict, grant_type: str = None) -> Dict:
-        """Check eligibility based on user information"""
-        eligibility_results = {
-            'eligible_grants': [],
-            'ineligible_grants': [],
-            'recommendations': [],
-            'regional_advisor': None
-        }
-        
-        # Check for regional advisor if county provided
-        if 'county' in user_info:
-            advisor_info = get_regional_advisor(user_info['county'])
-            if advisor_info:
-                eligibility_results['regional_advisor'] = advisor_info
-        
-        # Basic eligibility criteria (to be enhanced with actual DCNR rules)
-        criteria = {
-            'Recreation and Conservation': {
-                'entity_types': ['municipality', 'county', 'council of governments'],
-                'requirements': ['public entity', 'matching funds available']
-            },
-            'Partnership Grants': {
-                'entity_types': ['nonprofit', '501c3', 'educational institution'],
-                'requirements': ['environmental mission', 'community benefit']
-            },
-            'Land Trust Grants': {
-                'entity_types': ['land trust', 'conservancy'],
-                'requirements': ['accredited or working toward accreditation']
-            }
-        }
-        
-        # Check each grant type
-        for grant_name, grant_criteria in criteria.items():
-            if grant_type and grant_type != grant_name:
-                continue
-                
-            is_eligible = True
-            reasons = []
-            
-            # Check entity type
-            user_entity = user_info.get('entity_type', '').lower()
-            if not any(etype in user_entity for etype in grant_criteria['entity_types']):
-                is_eligible = False
-                reasons.append(f"Entity type '{user_entity}' may not qualify")
-            
-            # Add to results
-            if is_eligible:
-                eligibility_results['eligible_grants'].append({
-                    'grant': grant_name,
-                    'confidence': 'High',
-                    'notes': 'Meets basic criteria'
-                })
-            else:
-                eligibility_results['ineligible_grants'].append({
-                    'grant': grant_name,
-                    'reasons': reasons
-                })
-        
-        return eligibility_results
-    
-    def evaluate_grant_application(self, application_info: Dict) -> Dict:
-        """Evaluate grant application and provide approval chances"""
-        score = 0
-        max_score = 100
-        feedback = []
-        strengths = []
-        weaknesses = []
-        
-        # Entity Type Score (20 points)
-        entity_type = application_info.get('entity_type', '').lower()
-        if 'municipality' in entity_type or 'county' in entity_type:
-            score += 20
-            strengths.append("✅ Municipal/County applicants have access to Keystone Fund")
-        elif 'council of governments' in entity_type:
-            score += 18
-            strengths.append("✅ Council of Governments is a strong eligible applicant")
-        elif 'school' in entity_type:
-            score += 15
-            strengths.append("✅ School districts are eligible applicants")
-        elif 'nonprofit' in entity_type or '501c3' in entity_type:
-            score += 10
-            weaknesses.append("⚠️ Nonprofits limited to environmental stewardship funds only")
-        else:
-            score += 5
-            weaknesses.append("❌ Entity type may need partnership with eligible organization")
-        
-        # Community Impact Score (20 points)
-        footfall = application_info.get('footfall', 0)
-        population_served = application_info.get('population_served', 0)
-        
-        if footfall > 0 or population_served > 0:
-            impact_number = max(footfall, population_served)
-            if impact_number >= 5000:
-                score += 20
-                strengths.append(f"✅ Strong community impact: {impact_number:,} people served")
-            elif impact_number >= 1000:
-                score += 15
-                strengths.append(f"✅ Good community impact: {impact_number:,} people served")
-            elif impact_number >= 100:
-                score += 10
-                feedback.append(f"📊 Moderate community impact: {impact_number:,} people served")
-            else:
-                score += 5
-                weaknesses.append(f"❌ Low community impact: only {impact_number} people served")
-                feedback.append("💡 Consider partnerships to increase community reach")
-        
-        # Matching Funds Score (20 points)
-        has_matching_funds = application_info.get('has_matching_funds', False)
-        match_percentage = application_info.get('match_percentage', 0)
-        
-        if has_matching_funds:
-            if match_percentage >= 100:
-                score += 20
-                strengths.append("✅ Full dollar-for-dollar match secured")
-            elif match_percentage >= 50:
-                score += 15
-                strengths.append(f"✅ {match_percentage}% match identified")
-            else:
-                score += 10
-                weaknesses.append("⚠️ Partial match may need to be increased")
-        else:
-            weaknesses.append("❌ No matching funds identified - this is required!")
-        
-        # Project Readiness Score (20 points)
-        has_scope = application_info.get('has_detailed_scope', False)
-        has_quotes = application_info.get('has_consultant_quotes', False)
-        has_site_control = application_info.get('has_site_control', False)
-        
-        readiness_score = 0
-        if has_scope:
-            readiness_score += 7
-            strengths.append("✅ Detailed scope of work prepared")
-        else:
-            weaknesses.append("❌ Need detailed scope of work")
-            
-        if has_quotes:
-            readiness_score += 7
-            strengths.append("✅ Consultant quotes obtained")
-        else:
-            weaknesses.append("❌ Need minimum 2 consultant quotes")
-            
-        if has_site_control:
-            readiness_score += 6
-            strengths.append("✅ Site control documented")
-        elif application_info.get('project_type', '').lower() in ['master site', 'feasibility']:
-            weaknesses.append("❌ Site control required for this project type")
-            
-        score += readiness_score
-        
-        # Public Support Score (10 points)
-        has_public_support = application_info.get('has_public_support', False)
-        has_partnerships = application_info.get('has_partnerships', False)
-        
-        if has_public_support:
-            score += 5
-            strengths.append("✅ Public support demonstrated")
-        else:
-            feedback.append("💡 Consider conducting public meetings or surveys")
-            
-        if has_partnerships:
-            score += 5
-            strengths.append("✅ Strong partnerships in place")
-        else:
-            feedback.append("💡 Consider partnering with other organizations")
-        
-        # Planning Priorities Score (10 points)
-        addresses_equity = application_info.get('addresses_equity', False)
-        rehabilitation_project = application_info.get('rehabilitation_project', False)
-        
-        if addresses_equity:
-            score += 5
-            strengths.append("✅ Addresses recreation for all/equity")
-        if rehabilitation_project:
-            score += 5
-            strengths.append("✅ Focuses on rehabilitation of existing facilities")
-        
-        # Calculate approval chances
-        if score >= 80:
-            approval_chance = "Excellent (80-95%)"
-            overall_feedback = "Your application appears very strong! Make sure all documentation is complete."
-        elif score >= 65:
-            approval_chance = "Good (60-80%)"
-            overall_feedback = "Your application has good potential. Address the weaknesses to improve chances."
-        elif score >= 50:
-            approval_chance = "Moderate (40-60%)"
-            overall_feedback = "Your application needs improvement. Focus on addressing major weaknesses."
-        elif score >= 35:
-            approval_chance = "Low (20-40%)"
-            overall_feedback = "Significant improvements needed. Consider partnering or waiting until better prepared."
+    """Get the process-wide OpenAI client for the current key (pooled connections, retries, circuit breaker)"""
+    try:
+        # Double-check no proxy settings exist
+        for proxy in ['HTTP_PROXY', 'HTTPS_PROXY', 'http_proxy', 'https_proxy', 'ALL_PROXY', 'all_proxy']:
+            if proxy in os.environ:
+                del os.environ[proxy]
+        
+        # Check if we're on Streamlit Cloud
+        if os.environ.get('STREAMLIT_SHARING_MODE'):
+            # Use environment variable for API key on Streamlit Cloud
+            api_key = st.secrets.get("OPENAI_API_KEY", OPENAI_API_KEY)
         else:
-            approval_chance = "Very Low (<20%)"
-            overall_feedback = "Major issues need to be addressed. Consider seeking technical assistance."
+            # Use hardcoded key for local development
+            api_key = OPENAI_API_KEY
         
-        # Add regional advisor recommendation if county provided
-        if 'county' in application_info:
-            advisor_info = get_regional_advisor(application_info['county'])
-            if advisor_info:
-                feedback.append(f"💡 Contact your regional advisor {advisor_info['advisor_name']} at {advisor_info['phone']} for guidance")
+        # One client per key and endpoint, so sessions share a connection pool and a changed key takes effect
+        st.session_state.client = get_shared_client(api_key)
+        return st.session_state.client
         
-        return {
-            'score': score,
-            'max_score': max_score,
-            'approval_chance': approval_chance,
-            'strengths': strengths,
-            'weaknesses': weaknesses,
-            'feedback': feedback,
-            'overall_feedback': overall_feedback
-        }
-
-# Initialize the system
-rag_system = GrantRAGSystem()
+    except Exception as e:
+        st.error(f"Error creating OpenAI client: {str(e)}")
+        return None
+
+@st.cache_resource
+def get_rag_system():
+    """One GrantRAGSystem per process, shared by the public corpus and every session"""
+    return GrantRAGSystem()
+
+rag_system = get_rag_system()
+
+@st.cache_resource
+def get_answer_cache():
+    """Answer cache shared by all sessions in this process (and other processes via SQLite)"""
+    return create_answer_cache()
+
+PDF_MAX_PAGES = int(os.environ.get("DCNR_PDF_MAX_PAGES", DEFAULT_MAX_PAGES))
+PDF_MAX_BYTES = int(os.environ.get("DCNR_PDF_MAX_BYTES", DEFAULT_MAX_BYTES))
+# The model only sees ConversationMemory's bounded history; this caps what the page re-renders
+MAX_DISPLAYED_MESSAGES = int(os.environ.get("DCNR_MAX_DISPLAYED_MESSAGES", 200))
+# Seconds between re-renders of a streaming answer
+STREAM_RENDER_INTERVAL = float(os.environ.get("DCNR_STREAM_RENDER_INTERVAL", 0.1))
+
+@st.cache_resource
+def get_ingestion_cache():
+    """Process-wide cache of extracted and embedded uploads, keyed by file content"""
+    return IngestionCache(
+        os.environ.get("DCNR_INGEST_CACHE_DIR", "ingest_cache"),
+        max_memory_entries=int(os.environ.get("DCNR_INGEST_CACHE_MEMORY_ENTRIES", 64)),
+        max_disk_bytes=int(os.environ.get("DCNR_INGEST_CACHE_MAX_BYTES", 1024 ** 3)),
+        max_age_seconds=float(os.environ.get("DCNR_INGEST_CACHE_MAX_AGE", 30 * 24 * 3600)),
+        pdf_max_pages=PDF_MAX_PAGES,
+        pdf_max_bytes=PDF_MAX_BYTES
+    )
 
-def extract_text_from_pdf(file):
-    """Extract text from PDF file"""
-    text = ""
+def open_pdf(file):
+    """Open an uploaded PDF within the page and byte limits, or None after reporting why not"""
     try:
-        pdf_reader = PyPDF2.PdfReader(file)
-        for page in pdf_reader.pages:
-            text += page.extract_text() + "\n"
+        return PDFDocument(file.getvalue(), max_pages=PDF_MAX_PAGES, max_bytes=PDF_MAX_BYTES)
     except Exception as e:
-        st.error(f"Error reading PDF: {e}")
-    return text
-
-def search_all_content(query, documents, grant_data):
-    """Search in both uploaded documents and grant data"""
-    query_words = query.lower().split()
-    results = []
-    
-    # Check if query mentions a county for regional advisor
-    county_match = None
-    pa_counties = []
-    for region_data in REGIONAL_ADVISORS["regions"].values():
-        pa_counties.extend(region_data["counties"])
-    
-    # First try exact match for counties
-    for word in query_words:
-        if word in pa_counties:
-            county_match = word
-            break
-    
-    # If no exact match, try fuzzy matching for potential typos
-    if not county_match:
-        from difflib import get_close_matches
-        for word in query_words:
-            close_matches = get_close_matches(word, pa_counties, n=1, cutoff=0.6)
-            if close_matches:
-                county_match = close_matches[0]
-                break
-    
-    # If county mentioned, add regional advisor info to results
-    if county_match:
-        advisor_info = get_regional_advisor(county_match)
-        if advisor_info:
-            advisor_snippet = f"Regional Advisor for {county_match.title()} County: {advisor_info['advisor_name']}, Phone: {advisor_info['phone']}, Email: {advisor_info['email']}"
-            results.append((10, "DCNR Regional Advisors", advisor_snippet))
-    
-    # Search in uploaded documents
-    for filename, content in documents.items():
-        content_lower = content.lower()
-        score = sum(1 for word in query_words if word in content_lower)
-        
-        if score > 0:
-            snippet_start = content_lower.find(query_words[0])
-            if snippet_start != -1:
-                snippet_start = max(0, snippet_start - 100)
-                snippet_end = min(len(content), snippet_start + 500)
-                snippet = content[snippet_start:snippet_end]
-                results.append((score, f"Document: {filename}", snippet))
-    
-    # Search in grant data
-    grant_text = grant_data.get('general_info', '')
-    if grant_text:
-        grant_lower = grant_text.lower()
-        score = sum(1 for word in query_words if word in grant_lower)
-        
-        if score > 0:
-            snippet_start = grant_lower.find(query_words[0])
-            if snippet_start != -1:
-                snippet_start = max(0, snippet_start - 100)
-                snippet_end = min(len(grant_text), snippet_start + 500)
-                snippet = grant_text[snippet_start:snippet_end]
-                results.append((score, "PA DCNR Website", snippet))
-    
-    # Search in planning session transcript
-    planning_content = grant_data.get('planning_session_transcript', '')
-    if planning_content:
-        planning_lower = planning_content.lower()
-        score = sum(1 for word in query_words if word in planning_lower)
-        
-        if score > 0:
-            snippet_start = planning_lower.find(query_words[0])
-            if snippet_start != -1:
-                snippet_start = max(0, snippet_start - 100)
-                snippet_end = min(len(planning_content), snippet_start + 500)
-                snippet = planning_content[snippet_start:snippet_end]
-                results.append((score, "DCNR Planning Session", snippet))
-    
-    # Sort by relevance
-    results.sort(key=lambda x: x[0], reverse=True)
-    return results[:5]
+        st.error(f"Error reading PDF {file.name}: {e}")
+        return None
 
-def process_message(prompt, client):
-    """Process a message and generate response"""
-    # Search all content
-    search_results = search_all_content(
-        prompt, 
-        st.session_state.documents,
-        st.session_state.grant_data
-    )
-    
-    if client:
-        # AI-powered response
-        if search_results:
-            # Build context
-            context = "\n\n".join([
-                f"[From {source}]\n{snippet}..."
-                for score, source, snippet in search_results
-            ])
-            
-            # Create prompt
-            system_prompt = """You are an expert grant advisor for Pennsylvania DCNR Community Conservation Partnership Program grants. 
-            Help users understand grant opportunities, eligibility requirements, application processes, deadlines, and connect them with their regional advisors.
-            Be specific and helpful, citing sources when possible. Use emojis occasionally to make responses friendlier.
-            
-            When users mention a Pennsylvania county, always provide their regional advisor's contact information.
-            
-            You can also evaluate grant applications based on these scoring criteria:
-            - Entity Type (20 points): Municipalities/counties score highest, nonprofits limited
-            - Community Impact (20 points): Based on population served or facility usage
-            - Matching Funds (20 points): Dollar-for-dollar match required
-            - Project Readiness (20 points): Scope, quotes, site control
-            - Public Support (10 points): Demonstrated support and partnerships
-            - Planning Priorities (10 points): Equity and rehabilitation projects score higher
-            
-            If asked about approval chances, explain that applications scoring:
-            - 80+ points: Excellent chances (80-95%)
-            - 65-79 points: Good chances (60-80%)
-            - 50-64 points: Moderate chances (40-60%)
-            - Below 50: Need significant improvements
-            
-            Always emphasize the importance of contacting regional advisors early in the grant planning process."""
-            
-            user_prompt = f"""Context from documents and website:
-{context}
+def extract_pages_from_pdf(file) -> List[Tuple[int, str]]:
+    """Extract (page number, text) pairs from a PDF file"""
+    document = open_pdf(file)
+    return list(document.pages()) if document else []
 
-Question: {prompt}
-
-Please provide a helpful answer based on the context. If a Pennsylvania county is mentioned, include the regional advisor's contact information."""
-            
-            # Get response from OpenAI
-            try:
-                response = client.chat.completions.create(
-                    model="gpt-3.5-turbo",
-                    messages=[
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": user_prompt}
-                    ],
-                    max_tokens=700,
-                    temperature=0.7
-                )
-                
-                answer = response.choices[0].message.content
-                
-                # Add sources
-                sources = list(set([source for _, source, _ in search_results]))
-                answer += f"\n\n📚 **Sources:** {', '.join(sources)}"
-                
-            except Exception as e:
-                answer = f"Error generating response: {str(e)}"
-        else:
-            answer = "I couldn't find specific information about that in the uploaded documents or grant data. Try asking about grant types, eligibility requirements, application deadlines, or your regional advisor by mentioning your county."
-    else:
-        # Non-AI response when API key is not configured
-        answer = "🔍 **Search Results:**\n\n"
-        if search_results:
-            for score, source, snippet in search_results[:3]:
-                answer += f"**From {source}:**\n{snippet[:200]}...\n\n"
-            answer += "\n💡 *Configure an OpenAI API key in the main area above for AI-powered answers!*"
+def extract_text_from_pdf(file):
+    """Extract text from PDF file"""
+    return "\n".join(text for _, text in extract_pages_from_pdf(file))
+
+@st.cache_resource
+def get_public_corpus():
+    """Public grant corpus and index, loaded once per process and shared by every session"""
+    return PublicCorpus(get_rag_system())
+
+def rebuild_search_index():
+    """Rebuild the session's index of uploaded documents; the public corpus is shared"""
+    # Bumping the version retires every cached result for the previous uploads
+    st.session_state.upload_version += 1
+    if not st.session_state.document_chunks:
+        st.session_state.search_index = None
+        return None
+    index = CorpusIndex()
+    for name, chunks in st.session_state.document_chunks.items():
+        ingested = st.session_state.document_files.get(name)
+        if ingested is not None:
+            # Vectors were computed once per file content by the ingestion cache
+            index.add_embedded(chunks, ingested.vectors, ingested.features)
         else:
-            answer = """I found no specific matches in the available documents. 
-
-Some general information about PA DCNR grants:
-• Recreation and Conservation grants for municipalities and counties
-• Partnership grants for nonprofits and educational institutions  
-• Land Trust grants for conservation organizations
-• Most grants require matching funds
-• Contact your regional advisor for guidance
+            index.add_chunks(chunks)
+    st.session_state.search_index = index
+    return index
+
+def cached_search_all_content(query):
+    """search_all_content over the public corpus and session uploads, memoised per version of each"""
+    snapshot = get_public_corpus().current()
+    
+    cache = st.session_state.retrieval_cache
+    key = cache.make_key(query, (snapshot.generation, st.session_state.upload_version),
+                         RETRIEVAL_CONFIG.cache_key())
+    results = cache.get(key)
+    if results is None:
+        results = search_all_content(
+            query,
+            st.session_state.documents,
+            snapshot.grant_data,
+            index=snapshot.index,
+            private_index=st.session_state.search_index
+        )
+        cache.put(key, results)
+    return list(results)
+
+def add_message(role: str, content: str):
+    """Append to the displayed transcript, dropping the oldest messages beyond MAX_DISPLAYED_MESSAGES"""
+    messages = st.session_state.messages
+    messages.append({"role": role, "content": content})
+    if len(messages) > MAX_DISPLAYED_MESSAGES:
+        del messages[:len(messages) - MAX_DISPLAYED_MESSAGES]
+
+def stream_message(prompt, client, stream: bool = True):
+    """Generate the response to a message piece by piece (see assistant.stream_answer)"""
+    # Folding uses the extractive summary: an LLM summary would block the chat path on a second completion
+    memory = st.session_state.memory
+    with span("process_message", stream=stream):
+        # Search all content, with follow-ups expanded by the question they follow
+        with span("search"):
+            search_results = cached_search_all_content(memory.retrieval_query(prompt))
+        pieces = []
+        for piece in stream_answer(prompt, search_results, client, get_answer_cache(), stream=stream,
+                                   history=memory.history_messages()):
+            pieces.append(piece)
+            yield piece
+        memory.add_turn(prompt, "".join(pieces))
 
-💡 *Configure an OpenAI API key in the main area above for detailed AI-powered answers!*"""
-    
-    return answer
+def process_message(prompt, client):
+    """Process a message and generate response"""
+    return "".join(stream_message(prompt, client, stream=False))
 
 def main():
     # Animated header with PA logo
@@ -1154,15 +602,12 @@ def main():
         st.error("⚠️ Failed to initialize OpenAI client. Please check your API key configuration.")
         st.stop()
     
-    # Load grant data with animation
-    if 'grant_data' not in st.session_state or not st.session_state.grant_data:
+    # The public corpus is loaded once per process; later sessions find it ready
+    public_corpus = get_public_corpus()
+    if not public_corpus.loaded:
         with st.spinner("Loading grant information..."):
-            progress_bar = st.progress(0)
-            for i in range(100):
-                time.sleep(0.01)
-                progress_bar.progress(i + 1)
-            st.session_state.grant_data = rag_system.load_grant_data() or {}
-            progress_bar.empty()
+            public_corpus.current()
+    snapshot = public_corpus.current()
     
     # Sidebar with slide-in animation
     with st.sidebar:
@@ -1209,19 +654,24 @@ def main():
         
         # Grant Data Status with pulse animation
         st.header("📊 Grant Data Status")
-        if st.session_state.grant_data:
-            last_update = st.session_state.grant_data.get('last_updated', 'Unknown')
+        if snapshot.grant_data:
+            last_update = snapshot.grant_data.get('last_updated', 'Unknown')
             st.markdown(f'<div class="pulse">ℹ️ Last updated: {last_update}</div>', unsafe_allow_html=True)
             
             if st.button("🔄 Force Update", help="Update grant data from website"):
                 with st.spinner("Updating grant data..."):
-                    new_data = rag_system.scrape_grant_data()
-                    if new_data:
-                        st.session_state.grant_data = new_data
+                    new_data = rag_system.refresh(force=True)
+                    if new_data and public_corpus.reload().generation == snapshot.generation:
+                        st.info("✅ Grant data is already up to date.")
+                    elif new_data:
                         st.success("✅ Grant data updated!")
                         st.balloons()
                         time.sleep(1)
                         st.rerun()
+                    elif rag_system.refresh_state.in_flight:
+                        st.info("An update is already running; the new data will appear shortly.")
+                    else:
+                        st.error(f"Error scraping website: {rag_system.refresh_state.last_error}")
         
         st.divider()
         
@@ -1236,30 +686,49 @@ def main():
         
         if uploaded_files and st.button("🚀 Process Documents", type="primary"):
             st.session_state.documents = {}
+            st.session_state.document_chunks = {}
+            st.session_state.document_files = {}
+            ingestion_cache = get_ingestion_cache()
             
             progress_text = st.empty()
             progress_bar = st.progress(0)
             
-            for idx, file in enumerate(uploaded_files):
+            # Cached files cost a lookup; PDFs still to extract are opened up front so the
+            # progress bar counts their real pages (every other file counts as one)
+            pending = []
+            for file in uploaded_files:
+                data = file.getvalue()
+                is_pdf = file.name.endswith('.pdf')
+                ingested = ingestion_cache.lookup(data)
+                document = open_pdf(file) if ingested is None and is_pdf else None
+                if ingested is None and is_pdf and document is None:
+                    continue
+                pending.append((file, data, is_pdf, ingested, document))
+            total_units = sum(document.page_count if document else 1 for *_, document in pending)
+            done_units = 0
+            
+            for file, data, is_pdf, ingested, document in pending:
                 progress_text.text(f"Processing {file.name}...")
-                progress_bar.progress((idx + 1) / len(uploaded_files))
                 
-                if file.name.endswith('.pdf'):
-                    text = extract_text_from_pdf(file)
-                else:
-                    file_bytes = file.read()
-                    for encoding in ['utf-8', 'latin-1', 'cp1252']:
-                        try:
-                            text = file_bytes.decode(encoding)
-                            break
-                        except:
-                            continue
-                    else:
-                        text = file_bytes.decode('latin-1', errors='ignore')
+                def on_page(done, total, name=file.name, start=done_units):
+                    progress_text.text(f"Processing {name}: page {done} of {total}")
+                    progress_bar.progress((start + done) / total_units)
+                
+                try:
+                    ingested = ingested or ingestion_cache.ingest(data, is_pdf, on_page=on_page, document=document)
+                except Exception as e:
+                    st.error(f"Error reading {file.name}: {e}")
+                    continue
+                done_units += document.page_count if document else 1
+                progress_bar.progress(done_units / total_units)
+                if ingested.truncated:
+                    st.warning(f"Only the first {len(ingested.pages)} of {ingested.total_pages} pages of {file.name} were processed")
                 
-                st.session_state.documents[file.name] = text
-                time.sleep(0.3)  # Visual effect
+                st.session_state.documents[file.name] = ingested.text
+                st.session_state.document_chunks[file.name] = ingested.chunks(f"doc:{file.name}", f"Document: {file.name}")
+                st.session_state.document_files[file.name] = ingested
             
+            rebuild_search_index()
             progress_text.empty()
             progress_bar.empty()
             st.success(f"✅ Processed {len(uploaded_files)} documents!")
@@ -1481,20 +950,7 @@ def main():
     if not st.session_state.messages:
         st.markdown("### 💬 Try asking me about:")
         
-        sample_questions = [
-            "I'm from Lawrence County, who is my regional advisor?",
-            "What types of DCNR grants are available?",
-            "What are the eligibility requirements for Recreation and Conservation grants?",
-            "When is the 2025 grant application deadline?",
-            "How much matching funding is required?",
-            "Can nonprofits apply for DCNR grants?",
-            "What documents do I need for the application?",
-            "What is a master site development plan?",
-            "Who should I contact in Chester County for grant help?",
-            "What are the ready-to-go requirements for planning applications?",
-            "What types of planning projects does DCNR fund?",
-            "I need help from my regional advisor in Erie County"
-        ]
+        sample_questions = SAMPLE_QUESTIONS
         
         # Create animated question cards
         cols = st.columns(3)
@@ -1508,11 +964,11 @@ def main():
     # Process pending question if exists
     if st.session_state.question_clicked and st.session_state.pending_question:
         # Add to messages
-        st.session_state.messages.append({"role": "user", "content": st.session_state.pending_question})
+        add_message("user", st.session_state.pending_question)
         
         # Generate response
         answer = process_message(st.session_state.pending_question, client)
-        st.session_state.messages.append({"role": "assistant", "content": answer})
+        add_message("assistant", answer)
         
         # Clear the pending question
         st.session_state.pending_question = None
@@ -1522,7 +978,7 @@ def main():
     # Chat input
     if prompt := st.chat_input("Ask about DCNR grants, eligibility, deadlines, regional advisors, or application process"):
         # Add user message
-        st.session_state.messages.append({"role": "user", "content": prompt})
+        add_message("user", prompt)
         with st.chat_message("user"):
             st.markdown(f'<div class="chat-message">{prompt}</div>', unsafe_allow_html=True)
         
@@ -1533,12 +989,19 @@ def main():
             # Show typing animation
             message_placeholder.markdown('<div class="loading-dots">Thinking</div>', unsafe_allow_html=True)
             
-            # Generate response
-            answer = process_message(prompt, client)
+            # Stream the response into the placeholder, re-rendering at most every STREAM_RENDER_INTERVAL
+            # seconds so long answers do not re-render the whole markdown once per token
+            answer = ""
+            last_render = 0.0
+            for piece in stream_message(prompt, client):
+                answer += piece
+                now = time.monotonic()
+                if now - last_render >= STREAM_RENDER_INTERVAL:
+                    message_placeholder.markdown(f'<div class="chat-message">{answer}▌</div>', unsafe_allow_html=True)
+                    last_render = now
             
-            # Display answer with typewriter effect
             message_placeholder.markdown(f'<div class="chat-message">{answer}</div>', unsafe_allow_html=True)
-            st.session_state.messages.append({"role": "assistant", "content": answer})
+            add_message("assistant", answer)
     
     st.markdown('</div>', unsafe_allow_html=True)
     
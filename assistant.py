@@ -0,0 +1,356 @@
+"""Search and answer pipeline shared by the Streamlit app, the HTTP API and batch QA."""
+import logging
+import os
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from answer_cache import AnswerCache
+from chunking import chunk_documents
+from context_builder import ContextBudget, build_context, count_tokens
+from conversation import ConversationMemory
+from grant_rag import GrantRAGSystem
+from llm_client import LLMUnavailableError
+from metrics import inc, observe, span
+from public_corpus import PublicCorpus
+from regional_advisors import find_county_in_text, get_regional_advisor
+from retrieval import CorpusIndex, RetrievalCache, RetrievalConfig, build_search_index, reciprocal_rank_fusion
+
+logger = logging.getLogger(__name__)
+
+# Retrieval candidate budgets, tunable per deployment via DCNR_* environment variables
+RETRIEVAL_CONFIG = RetrievalConfig.from_env()
+# Prompt context and completion token budgets, likewise
+CONTEXT_BUDGET = ContextBudget.from_env()
+
+CHAT_MODEL = "gpt-3.5-turbo"
+
+SYSTEM_PROMPT = """You are an expert grant advisor for Pennsylvania DCNR Community Conservation Partnership Program grants. 
+            Help users understand grant opportunities, eligibility requirements, application processes, deadlines, and connect them with their regional advisors.
+            Be specific and helpful, citing sources when possible. Use emojis occasionally to make responses friendlier.
+            
+            When users mention a Pennsylvania county, always provide their regional advisor's contact information.
+            
+            You can also evaluate grant applications based on these scoring criteria:
+            - Entity Type (20 points): Municipalities/counties score highest, nonprofits limited
+            - Community Impact (20 points): Based on population served or facility usage
+            - Matching Funds (20 points): Dollar-for-dollar match required
+            - Project Readiness (20 points): Scope, quotes, site control
+            - Public Support (10 points): Demonstrated support and partnerships
+            - Planning Priorities (10 points): Equity and rehabilitation projects score higher
+            
+            If asked about approval chances, explain that applications scoring:
+            - 80+ points: Excellent chances (80-95%)
+            - 65-79 points: Good chances (60-80%)
+            - 50-64 points: Moderate chances (40-60%)
+            - Below 50: Need significant improvements
+            
+            Always emphasize the importance of contacting regional advisors early in the grant planning process."""
+
+NO_RESULTS_ANSWER = "I couldn't find specific information about that in the uploaded documents or grant data. Try asking about grant types, eligibility requirements, application deadlines, or your regional advisor by mentioning your county."
+
+# Example questions offered in the chat; also the benchmark's built-in query set
+SAMPLE_QUESTIONS = [
+    "I'm from Lawrence County, who is my regional advisor?",
+    "What types of DCNR grants are available?",
+    "What are the eligibility requirements for Recreation and Conservation grants?",
+    "When is the 2025 grant application deadline?",
+    "How much matching funding is required?",
+    "Can nonprofits apply for DCNR grants?",
+    "What documents do I need for the application?",
+    "What is a master site development plan?",
+    "Who should I contact in Chester County for grant help?",
+    "What are the ready-to-go requirements for planning applications?",
+    "What types of planning projects does DCNR fund?",
+    "I need help from my regional advisor in Erie County"
+]
+
+SearchResult = Tuple[float, str, str]
+
+
+def create_answer_cache() -> AnswerCache:
+    """Answer cache configured from DCNR_ANSWER_CACHE_* environment variables.
+
+    Near-duplicate matching stays off unless DCNR_ANSWER_CACHE_NEAR_DUPLICATE sets a threshold.
+    """
+    near_duplicate = os.environ.get("DCNR_ANSWER_CACHE_NEAR_DUPLICATE", "")
+    return AnswerCache(
+        os.environ.get("DCNR_ANSWER_CACHE_PATH", "answer_cache.sqlite3"),
+        ttl_seconds=float(os.environ.get("DCNR_ANSWER_CACHE_TTL", 7 * 24 * 3600)),
+        max_entries=int(os.environ.get("DCNR_ANSWER_CACHE_MAX_ENTRIES", 5000)),
+        near_duplicate_threshold=float(near_duplicate) if near_duplicate else None
+    )
+
+
+def search_all_content(query, documents, grant_data, index: CorpusIndex = None,
+                       mode: str = "hybrid", config: RetrievalConfig = None,
+                       private_index: CorpusIndex = None) -> List[SearchResult]:
+    """Search in both uploaded documents and grant data
+
+    mode selects the retrievers: "hybrid" (BM25 and dense vectors fused with
+    reciprocal rank fusion), "keyword" or "dense". When the shared public index
+    is passed as index, private_index holds the session's uploads and its
+    rankings join the fusion alongside the public ones.
+    """
+    config = config or RETRIEVAL_CONFIG
+
+    # Check if query mentions a county for regional advisor (precomputed county index)
+    with span("county_match"):
+        county_match = find_county_in_text(query)
+
+    # Rank chunks of uploaded documents, website content and planning transcript
+    if index is None:
+        with span("build_index"):
+            index = build_search_index(chunk_documents(documents), grant_data)
+    with span("retrieve", mode=mode):
+        rankings = index.candidate_rankings(query, config, mode)
+    if private_index is not None:
+        with span("retrieve_uploads", mode=mode):
+            for name, ranking in private_index.candidate_rankings(query, config, mode).items():
+                rankings[f"upload_{name}"] = ranking
+
+    # If county mentioned, the regional advisor info joins the fusion as its own ranking
+    advisor_result = None
+    if county_match:
+        with span("advisor_lookup"):
+            advisor_info = get_regional_advisor(county_match)
+        if advisor_info:
+            advisor_snippet = f"Regional Advisor for {county_match.title()} County: {advisor_info['advisor_name']}, Phone: {advisor_info['phone']}, Email: {advisor_info['email']}"
+            advisor_result = ("DCNR Regional Advisors", advisor_snippet)
+            rankings["advisor"] = ["advisor"]
+
+    # Chunks are already passage-sized, so the matching chunk is the snippet
+    results = []
+    with span("fuse"):
+        fused = reciprocal_rank_fusion(rankings, k=config.rrf_k, weights=config.weights)
+    for score, key in fused[:config.top_k]:
+        if key == "advisor":
+            results.append((score, *advisor_result))
+        else:
+            chunk = index.keyword.chunks.get(key) or private_index.keyword.chunks[key]
+            results.append((score, chunk.label, chunk.text))
+    return results
+
+
+def record_usage(usage):
+    """Count the prompt and completion tokens an LLM response reports"""
+    if usage is None:
+        return
+    inc("dcnr_llm_tokens_total", getattr(usage, "prompt_tokens", 0) or 0, direction="in")
+    inc("dcnr_llm_tokens_total", getattr(usage, "completion_tokens", 0) or 0, direction="out")
+
+
+def extractive_answer(search_results, note):
+    """Search-only answer listing the top passages, used without a working LLM"""
+    answer = "🔍 **Search Results:**\n\n"
+    for score, source, snippet in search_results[:3]:
+        answer += f"**From {source}:**\n{snippet[:200]}...\n\n"
+    answer += f"\n{note}"
+    return answer
+
+
+def stream_answer(prompt: str, search_results: List[SearchResult], client,
+                  answer_cache: Optional[AnswerCache] = None, stream: bool = True,
+                  raise_errors: bool = False, budget: Optional[ContextBudget] = None,
+                  history: Optional[List[Dict]] = None) -> Iterator[str]:
+    """Generate the answer to a question from its search results piece by piece.
+
+    With stream=True the chat completion is requested in streaming mode and
+    tokens are yielded as they arrive; the sources footer always comes last.
+    Without a client (no API key) the answer is extractive. LLM failures are
+    answered with the passages or an error message unless raise_errors is set.
+    The context and the completion length follow budget (CONTEXT_BUDGET by default).
+    history holds earlier chat messages (see ConversationMemory.history_messages).
+    """
+    if client:
+        # AI-powered response
+        if search_results:
+            with span("prompt_build") as stage:
+                # Deduplicated passages packed into the input token budget
+                budget = budget or CONTEXT_BUDGET
+                built = build_context(search_results, budget)
+                context = built.text
+
+                user_prompt = f"""Context from documents and website:
+{context}
+
+Question: {prompt}
+
+Please provide a helpful answer based on the context. If a Pennsylvania county is mentioned, include the regional advisor's contact information."""
+                history = history or []
+                prompt_tokens = count_tokens(SYSTEM_PROMPT) + count_tokens(user_prompt) + sum(
+                    count_tokens(message['content']) for message in history)
+                # The same question after a different conversation must not share a cached answer
+                cache_context = context + "".join(f"\n\n[{m['role']}] {m['content']}" for m in history)
+                max_tokens = budget.completion_tokens(prompt_tokens, built.tokens)
+                stage.set(context_tokens=built.tokens, prompt_tokens=prompt_tokens, max_tokens=max_tokens,
+                          passages=len(built.passages), duplicates=built.duplicates,
+                          over_budget=built.over_budget)
+                inc("dcnr_context_passages_dropped_total", built.duplicates, reason="duplicate")
+                inc("dcnr_context_passages_dropped_total", built.over_budget, reason="budget")
+
+            # Get response from OpenAI; identical questions over the same context are answered from the cache
+            try:
+                answer = None
+                if answer_cache:
+                    with span("answer_cache"):
+                        answer = answer_cache.get(CHAT_MODEL, SYSTEM_PROMPT, cache_context, prompt)
+                    inc("dcnr_answer_cache_total", result="miss" if answer is None else "hit")
+                if answer is not None:
+                    yield answer
+                else:
+                    with span("llm", model=CHAT_MODEL, stream=stream):
+                        started = time.perf_counter()
+                        extra = {"stream_options": {"include_usage": True}} if stream else {}
+                        response = client.create_chat_completion(
+                            model=CHAT_MODEL,
+                            messages=[
+                                {"role": "system", "content": SYSTEM_PROMPT},
+                                *history,
+                                {"role": "user", "content": user_prompt}
+                            ],
+                            max_tokens=max_tokens,
+                            temperature=0.7,
+                            stream=stream,
+                            **extra
+                        )
+
+                        if stream:
+                            pieces = []
+                            for event in response:
+                                # The final event carries token usage and no choices
+                                record_usage(getattr(event, "usage", None))
+                                if not event.choices:
+                                    continue
+                                delta = event.choices[0].delta.content
+                                if delta:
+                                    if not pieces:
+                                        observe("dcnr_llm_first_token_seconds", time.perf_counter() - started)
+                                    pieces.append(delta)
+                                    yield delta
+                            answer = "".join(pieces)
+                        else:
+                            record_usage(getattr(response, "usage", None))
+                            answer = response.choices[0].message.content
+                            observe("dcnr_llm_first_token_seconds", time.perf_counter() - started)
+                            yield answer
+                    if answer_cache:
+                        answer_cache.put(CHAT_MODEL, SYSTEM_PROMPT, cache_context, prompt, answer)
+
+                # Add sources, best-ranked first like the API's and batch answers' source lists
+                yield f"\n\n📚 **Sources:** {', '.join(sources_of(search_results))}"
+
+            except LLMUnavailableError:
+                if raise_errors:
+                    raise
+                # Provider is degraded: answer from the search results alone
+                yield extractive_answer(
+                    search_results,
+                    "⚠️ *The AI service is temporarily unavailable, so here are the most relevant passages instead.*"
+                )
+            except Exception as e:
+                if raise_errors:
+                    raise
+                yield f"Error generating response: {str(e)}"
+        else:
+            yield NO_RESULTS_ANSWER
+    else:
+        # Non-AI response when API key is not configured
+        if search_results:
+            yield extractive_answer(
+                search_results,
+                "💡 *Configure an OpenAI API key in the main area above for AI-powered answers!*"
+            )
+        else:
+            yield """I found no specific matches in the available documents. 
+
+Some general information about PA DCNR grants:
+• Recreation and Conservation grants for municipalities and counties
+• Partnership grants for nonprofits and educational institutions  
+• Land Trust grants for conservation organizations
+• Most grants require matching funds
+• Contact your regional advisor for guidance
+
+💡 *Configure an OpenAI API key in the main area above for detailed AI-powered answers!*"""
+
+
+def sources_of(search_results: Iterable[SearchResult]) -> List[str]:
+    """Distinct sources of the search results, best-ranked first"""
+    return list(dict.fromkeys(source for _, source, _ in search_results))
+
+
+def search_payload(results: Iterable[SearchResult]) -> List[Dict]:
+    return [{'score': score, 'source': source, 'text': text} for score, source, text in results]
+
+
+class AssistantService:
+    """Search, answers, eligibility and scoring over the process-wide public corpus"""
+
+    def __init__(self, rag_system: Optional[GrantRAGSystem] = None, client=None,
+                 answer_cache: Optional[AnswerCache] = None):
+        self.rag_system = rag_system or GrantRAGSystem()
+        self.corpus = PublicCorpus(self.rag_system)
+        self.retrieval_cache = RetrievalCache(maxsize=int(os.environ.get("DCNR_RETRIEVAL_CACHE_SIZE", 1024)))
+        self.answer_cache = answer_cache or create_answer_cache()
+        # Without a client, answers are extractive
+        self.client = client
+
+    def warm(self):
+        """Load the public corpus and index before the first request"""
+        snapshot = self.corpus.current()
+        logger.info("Corpus generation %d ready (%d chunks)", snapshot.generation, len(snapshot.index))
+
+    def health(self) -> Dict:
+        snapshot = self.corpus.current()
+        return {
+            'status': 'ok',
+            'corpus_generation': snapshot.generation,
+            'chunks': len(snapshot.index),
+            'last_updated': snapshot.grant_data.get('last_updated'),
+            'llm': self.client is not None,
+            'retrieval_cache': self.retrieval_cache.stats(),
+        }
+
+    def search(self, query: str, mode: str = "hybrid") -> List[SearchResult]:
+        with span("search"):
+            snapshot = self.corpus.current()
+            key = self.retrieval_cache.make_key(query, snapshot.generation, mode, RETRIEVAL_CONFIG.cache_key())
+            results = self.retrieval_cache.get(key)
+            if results is None:
+                results = search_all_content(query, {}, snapshot.grant_data, index=snapshot.index, mode=mode)
+                self.retrieval_cache.put(key, results)
+            return list(results)
+
+    def stream(self, query: str, history: Optional[List[Dict]] = None) -> Iterator[str]:
+        memory = ConversationMemory.from_messages(history or [])
+        # Search eagerly so its errors surface before a caller starts streaming the response
+        results = self.search(memory.retrieval_query(query))
+
+        def pieces():
+            with span("answer", stream=True):
+                yield from stream_answer(query, results, self.client, self.answer_cache,
+                                         history=memory.history_messages())
+        return pieces()
+
+    def answer(self, query: str, raise_errors: bool = False,
+               history: Optional[List[Dict]] = None) -> Tuple[str, List[SearchResult]]:
+        """The same answer process_message gives in the app, and the search results behind it.
+
+        history is the earlier transcript as chat messages; it is bounded by the same env limits as in the app.
+        """
+        memory = ConversationMemory.from_messages(history or [])
+        with span("answer", stream=False):
+            results = self.search(memory.retrieval_query(query))
+            answer = "".join(stream_answer(query, results, self.client, self.answer_cache, stream=False,
+                                           raise_errors=raise_errors, history=memory.history_messages()))
+            return answer, results
+
+    def eligibility(self, user_info: Dict) -> Dict:
+        return self.rag_system.check_eligibility(user_info, user_info.get('grant_type'))
+
+    def evaluate(self, body: Dict):
+        if 'applications' in body:
+            return self.rag_system.evaluate_grant_applications(body['applications']).results()
+        return self.rag_system.evaluate_grant_application(body)
+
+    def advisor(self, county: str) -> Optional[Dict]:
+        return get_regional_advisor(county)
@@ -0,0 +1,193 @@
+"""Answer a JSONL file of questions headlessly, with concurrent, rate-limited LLM calls.
+
+Each input line is {"id"?: ..., "question": "..."} ("query" is accepted too;
+the id defaults to the line number). Each output line is
+{"id", "question", "answer", "sources", "elapsed"} or, after a failure,
+{"id", "question", "error"}. Answers go through the same retrieval and prompt
+as the chat in the app.
+
+The output file doubles as the checkpoint: it is appended to one line per
+finished question, and re-running the same command skips every id already
+answered and retries the ones that failed. Resuming first compacts the file
+to one answered record per id, so a retried question never leaves its
+earlier error record behind.
+
+Usage::
+
+    python batch_qa.py questions.jsonl answers.jsonl [--workers 8] [--rate 2]
+                       [--base-url http://localhost:8000/v1] [--metrics-out metrics.jsonl]
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Iterable, Iterator, Optional, Set
+
+from assistant import AssistantService, sources_of
+from llm_client import RateLimiter, ResilientLLMClient
+from metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+
+def read_questions(path: str) -> Iterator[Dict]:
+    """Questions from a JSONL file, each with a string id"""
+    with open(path, encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"{path}:{number}: invalid JSON: {e}")
+            question = (item.get('question') or item.get('query')) if isinstance(item, dict) else None
+            if not isinstance(question, str) or not question.strip():
+                raise ValueError(f"{path}:{number}: needs a non-empty 'question'")
+            yield {'id': str(item.get('id', number)), 'question': question}
+
+
+def load_checkpoint(path: str) -> Set[str]:
+    """Ids already answered in an existing output file, compacting it first.
+
+    The file is rewritten to hold only the last answered record per id: failed
+    records are dropped because those questions are retried and appended again,
+    and a partly written last line from an interrupted run is cut. Call it
+    before opening a CheckpointWriter on the same path.
+    """
+    if not os.path.exists(path):
+        return set()
+    with open(path, 'rb') as f:
+        data = f.read()
+    end = data.rfind(b'\n') + 1
+    answered: Dict[str, bytes] = {}
+    lines = data[:end].splitlines()
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(record, dict) and 'answer' in record:
+            answered[str(record['id'])] = line
+    if end < len(data) or len(answered) < len(lines):
+        temporary = f"{path}.tmp"
+        with open(temporary, 'wb') as f:
+            f.writelines(line + b'\n' for line in answered.values())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, path)
+    return set(answered)
+
+
+class CheckpointWriter:
+    """Appends one JSON line per result and flushes it, so a crash loses at most the line in flight"""
+
+    def __init__(self, path: str):
+        self._file = open(path, 'a', encoding='utf-8')
+        self._lock = threading.Lock()
+
+    def write(self, record: Dict):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+def answer_question(service: AssistantService, item: Dict) -> Dict:
+    started = time.perf_counter()
+    try:
+        answer, results = service.answer(item['question'], raise_errors=True)
+    except Exception as e:
+        logger.warning("Question %s failed: %s", item['id'], e)
+        return {**item, 'error': f"{type(e).__name__}: {e}"}
+    return {**item, 'answer': answer, 'sources': sources_of(results),
+            'elapsed': round(time.perf_counter() - started, 3)}
+
+
+def run_batch(service: AssistantService, questions: Iterable[Dict], writer: CheckpointWriter,
+              workers: int = 8, skip: Optional[Set[str]] = None) -> Dict[str, int]:
+    """Answer questions on a pool of workers, keeping at most 2 * workers in flight"""
+    skip = skip or set()
+    counts = {'answered': 0, 'failed': 0, 'skipped': 0}
+    pending = set()
+
+    def collect(futures):
+        for future in futures:
+            record = future.result()
+            writer.write(record)
+            counts['failed' if 'error' in record else 'answered'] += 1
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="qa-worker") as pool:
+        for item in questions:
+            if item['id'] in skip:
+                counts['skipped'] += 1
+                continue
+            if len(pending) >= 2 * workers:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(finished)
+            pending.add(pool.submit(answer_question, service, item))
+        collect(wait(pending).done)
+    return counts
+
+
+def main(argv: Optional[Iterable[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of grant questions")
+    parser.add_argument("questions", help="JSONL input, one {\"id\", \"question\"} object per line")
+    parser.add_argument("output", help="JSONL output; also the checkpoint read when resuming")
+    parser.add_argument("--workers", type=int, default=8, help="concurrent questions")
+    parser.add_argument("--rate", type=float, default=float(os.environ.get("DCNR_LLM_RATE", 2.0)),
+                        help="LLM requests per second across all workers")
+    parser.add_argument("--burst", type=int, default=None, help="requests allowed at once before the rate applies")
+    parser.add_argument("--base-url", default=os.environ.get("OPENAI_BASE_URL"),
+                        help="chat completions endpoint, e.g. a local stub server")
+    parser.add_argument("--no-llm", action="store_true", help="extractive answers only")
+    parser.add_argument("--metrics-out", help="write stage timings and counters here as JSON lines")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    client = None
+    api_key = os.environ.get("OPENAI_API_KEY")
+    if not args.no_llm:
+        if not api_key and not args.base_url:
+            parser.error("set OPENAI_API_KEY or --base-url, or pass --no-llm")
+        client = ResilientLLMClient(
+            api_key or "unused", base_url=args.base_url, max_connections=args.workers,
+            rate_limiter=RateLimiter(args.rate, args.burst),
+            read_timeout=float(os.environ.get("DCNR_LLM_READ_TIMEOUT", 60)),
+            max_retries=int(os.environ.get("DCNR_LLM_MAX_RETRIES", 3))
+        )
+
+    done = load_checkpoint(args.output)
+    if done:
+        logger.info("Resuming: %d questions already answered in %s", len(done), args.output)
+    service = AssistantService(client=client)
+    service.warm()
+
+    writer = CheckpointWriter(args.output)
+    started = time.perf_counter()
+    try:
+        counts = run_batch(service, read_questions(args.questions), writer, workers=args.workers, skip=done)
+    finally:
+        writer.close()
+        if client is not None:
+            client.close()
+    elapsed = time.perf_counter() - started
+    if args.metrics_out:
+        with open(args.metrics_out, 'w', encoding='utf-8') as f:
+            f.write(METRICS.render_jsonl())
+    print(f"Answered {counts['answered']}, failed {counts['failed']}, skipped {counts['skipped']} "
+          f"in {elapsed:.1f} s", file=sys.stderr)
+    return 1 if counts['failed'] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,374 @@
+"""Latency, throughput, memory and recall benchmarks over synthetic grant corpora.
+
+Each scale builds a seeded synthetic corpus of website sections of roughly
+that many bytes of text, with facts planted in some sections under unique
+project code names. A labelled question asks about each planted fact, so
+recall@k is the share of those questions whose top k results contain the fact.
+The built-in sample questions are timed as well.
+
+Stages, each with p50/p95/p99 latency, throughput and RSS:
+
+    index_build            build_search_index over the corpus (timed once)
+    search_all_content     hybrid search per query
+    extract_text_from_pdf  text extraction from a synthetic PDF of the corpus
+    get_regional_advisor   county lookups, including misspellings
+    process_message        search plus answer; extractive unless --base-url is given
+
+Every scale runs in a fresh process so peak RSS is per scale. Results are
+written as JSON; --compare flags stages whose p95 regressed against an
+earlier results file and exits 1.
+
+Usage::
+
+    python benchmark.py [--scales 10kb,1mb] [--output bench_results.json]
+                        [--compare previous.json] [--base-url http://localhost:8000/v1]
+
+The 100mb and 1gb scales need several, respectively tens of, GB of memory.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+SCALES = {'10kb': 10 * 1024, '1mb': 1024 ** 2, '100mb': 100 * 1024 ** 2, '1gb': 1024 ** 3}
+DEFAULT_SCALES = ('10kb', '1mb')
+SECTION_BYTES = 1500
+LABELLED_QUESTIONS = 200
+RECALL_KS = (1, 3, 5)
+PDF_MAX_PAGES = 200
+PDF_LINES_PER_PAGE = 50
+# A stage whose p95 grows by more than this fraction counts as a regression
+REGRESSION_TOLERANCE = 0.2
+
+DOMAIN_WORDS = (
+    "grant application deadline funding match municipality county nonprofit trail park "
+    "playground conservation recreation rehabilitation planning feasibility acquisition "
+    "easement watershed greenway riverfront design engineering construction community "
+    "partnership stewardship environmental eligibility requirements documents budget "
+    "quotes consultant site control public support resolution equity outreach keystone "
+    "program project phase facility amenities accessibility ada restoration habitat "
+    "forest stream buffer land trust council governments school district authority"
+).split()
+PROGRAMS = ("Recreation and Conservation", "Partnership", "Land Trust", "Rivers Conservation", "Trails")
+COUNTIES = ("Erie", "Chester", "Centre", "Lawrence", "Allegheny", "Bucks", "Lycoming", "York", "Potter", "Wayne")
+MONTHS = ("January", "February", "March", "April", "May", "June",
+          "July", "August", "September", "October", "November", "December")
+COUNTY_QUERIES = ("Erie", "erie county", "Chester", "Lawrnce", "Alleghney", "Philadelphia", "Centre",
+                  "Montgomery", "Schuylkill", "Nowhere", "Bucks County", "lycoming", "Westmorland")
+
+
+def filler_vocabulary(rng: np.random.Generator, size: int = 5000) -> List[str]:
+    """Domain words plus pronounceable filler words"""
+    syllables = ["ba", "ce", "di", "fo", "gu", "ha", "je", "ki", "lo", "mu", "na", "pe",
+                 "ri", "so", "tu", "va", "we", "yo", "ra", "te"]
+    words = list(DOMAIN_WORDS)
+    seen = set(words)
+    while len(words) < size:
+        word = "".join(rng.choice(syllables, size=rng.integers(2, 4)))
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+    return words
+
+
+def code_names(rng: np.random.Generator, count: int, exclude: Iterable[str]) -> List[str]:
+    """Unique project names built from syllables the filler vocabulary never uses"""
+    syllables = ["zor", "qua", "xen", "vly", "kry", "thax", "oum", "zeph", "ptyr", "grox"]
+    exclude = set(exclude)
+    names = []
+    seen = set()
+    while len(names) < count:
+        name = "".join(rng.choice(syllables, size=3)).capitalize()
+        if name not in seen and name.lower() not in exclude:
+            seen.add(name)
+            names.append(name)
+    return names
+
+
+def synthetic_corpus(size_bytes: int, seed: int = 0,
+                     labelled: int = LABELLED_QUESTIONS) -> Tuple[Dict, List[Dict]]:
+    """Grant data of about size_bytes of section text, and labelled questions about planted facts"""
+    from chunking import make_section
+    from grant_rag import GrantRAGSystem
+
+    rng = np.random.default_rng(seed)
+    vocabulary = np.array(filler_vocabulary(rng))
+    # Zipf-like word frequencies, as in real text
+    weights = 1.0 / np.arange(1, len(vocabulary) + 1)
+    weights /= weights.sum()
+    words_per_section = SECTION_BYTES // 7
+
+    n_sections = max(3, size_bytes // SECTION_BYTES)
+    n_labelled = min(labelled, n_sections)
+    planted = dict(zip(rng.choice(n_sections, size=n_labelled, replace=False).tolist(),
+                       code_names(rng, n_labelled, vocabulary.tolist())))
+
+    sections = []
+    questions = []
+    for i in range(n_sections):
+        words = vocabulary[rng.choice(len(vocabulary), size=words_per_section, p=weights)].tolist()
+        program = PROGRAMS[i % len(PROGRAMS)]
+        if i in planted:
+            name = planted[i]
+            county = COUNTIES[int(rng.integers(len(COUNTIES)))]
+            month = MONTHS[int(rng.integers(12))]
+            fact = (f"The {name} {program} project in {county} County has an application deadline "
+                    f"of {month} {int(rng.integers(1, 29))}.")
+            at = int(rng.integers(len(words)))
+            words[at:at] = [fact]
+            question = (f"When is the application deadline for the {name} project?" if len(questions) % 2
+                        else f"What is the {name} {program} project in {county} County?")
+            questions.append({'question': question, 'expect': name})
+        title = f"{program} grant guidance {i}"
+        sections.append(make_section(f"https://example.org/grants/{i // 50}.html", [title], " ".join(words)))
+
+    grant_data = {
+        'last_updated': datetime.now().isoformat(),
+        'sections': sections,
+        'planning_session_transcript': GrantRAGSystem.get_planning_session_content(None),
+    }
+    return grant_data, questions
+
+
+def pdf_bytes(pages: Sequence[str]) -> bytes:
+    """A minimal PDF with one Helvetica text page per entry"""
+    def escape(line: str) -> str:
+        return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in pages:
+        words = text.split()
+        lines = [" ".join(words[i:i + 14]) for i in range(0, len(words), 14)][:PDF_LINES_PER_PAGE]
+        stream = "BT /F1 9 Tf 40 800 Td 14 TL " + " ".join(f"({escape(line)}) Tj T*" for line in lines) + " ET"
+        stream = stream.encode('latin-1', 'replace')
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % (len(objects)))
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        " ".join(f"{kid} 0 R" for kid in kids).encode(), len(kids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def rss_mb() -> Optional[float]:
+    """Current resident set size, where /proc is available"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process so far"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+
+
+def measure(fn: Callable, inputs: Sequence, repeat: int = 1) -> Dict:
+    """Time fn over every input (repeat times) and summarise latency, throughput and memory"""
+    rss_before = rss_mb()
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for item in inputs:
+            t0 = time.perf_counter()
+            fn(item)
+            latencies.append(time.perf_counter() - t0)
+    total = time.perf_counter() - started
+    ms = np.array(latencies) * 1000
+    rss_after = rss_mb()
+    return {
+        'calls': len(latencies),
+        'p50_ms': round(float(np.percentile(ms, 50)), 4),
+        'p95_ms': round(float(np.percentile(ms, 95)), 4),
+        'p99_ms': round(float(np.percentile(ms, 99)), 4),
+        'mean_ms': round(float(ms.mean()), 4),
+        'throughput_per_s': round(len(latencies) / total, 2) if total > 0 else None,
+        'rss_delta_mb': round(rss_after - rss_before, 2) if rss_before is not None else None,
+        'peak_rss_mb': round(peak_rss_mb(), 2) if resource is not None else None,
+    }
+
+
+def recall_at_k(results_per_question: List[List[Tuple[float, str, str]]], questions: List[Dict]) -> Dict:
+    """Share of labelled questions whose top k results contain the planted fact"""
+    recall = {}
+    for k in RECALL_KS:
+        hits = sum(
+            any(question['expect'].lower() in text.lower() for _, _, text in results[:k])
+            for results, question in zip(results_per_question, questions)
+        )
+        recall[f"recall@{k}"] = round(hits / len(questions), 4) if questions else None
+    return recall
+
+
+def run_scale(scale: str, seed: int = 0, repeat: int = 3, base_url: Optional[str] = None) -> Dict:
+    """Every stage for one corpus scale; meant to run in its own process"""
+    from assistant import RETRIEVAL_CONFIG, SAMPLE_QUESTIONS, search_all_content, stream_answer
+    from pdf_extract import PDFDocument
+    from regional_advisors import get_regional_advisor
+    from retrieval import build_search_index
+
+    t0 = time.perf_counter()
+    grant_data, labelled = synthetic_corpus(SCALES[scale], seed=seed)
+    corpus_bytes = sum(len(section['text'].encode('utf-8')) for section in grant_data['sections'])
+    report = {
+        'scale': scale,
+        'corpus_bytes': corpus_bytes,
+        'sections': len(grant_data['sections']),
+        'labelled_questions': len(labelled),
+        'generate_s': round(time.perf_counter() - t0, 3),
+        'stages': {},
+    }
+    stages = report['stages']
+
+    built = []
+    stages['index_build'] = measure(lambda data: built.append(build_search_index({}, data)), [grant_data])
+    index = built[0]
+    report['chunks'] = len(index)
+
+    def search(query):
+        return search_all_content(query, {}, grant_data, index=index)
+
+    found = {}
+
+    def search_and_keep(query):
+        found[query] = search(query)
+
+    queries = [question['question'] for question in labelled] + list(SAMPLE_QUESTIONS)
+    stages['search_all_content'] = measure(search_and_keep, queries, repeat=repeat)
+    stages['search_all_content'].update(recall_at_k([found[q['question']] for q in labelled], labelled))
+    stages['search_all_content']['top_k'] = RETRIEVAL_CONFIG.top_k
+
+    n_pages = min(PDF_MAX_PAGES, max(1, len(grant_data['sections'])))
+    document = pdf_bytes([section['text'] for section in grant_data['sections'][:n_pages]])
+    stages['extract_text_from_pdf'] = measure(
+        lambda data: PDFDocument(data, max_pages=n_pages, max_bytes=len(data)).text(), [document], repeat=repeat)
+    stages['extract_text_from_pdf'].update({'pages': n_pages, 'pdf_bytes': len(document)})
+
+    stages['get_regional_advisor'] = measure(get_regional_advisor, COUNTY_QUERIES, repeat=max(repeat, 50))
+
+    client = None
+    if base_url:
+        from llm_client import ResilientLLMClient
+        client = ResilientLLMClient(os.environ.get("OPENAI_API_KEY") or "unused", base_url=base_url)
+
+    def process_message(prompt):
+        return "".join(stream_answer(prompt, search(prompt), client, stream=False))
+
+    stages['process_message'] = measure(process_message, list(SAMPLE_QUESTIONS), repeat=repeat)
+    stages['process_message']['llm'] = bool(client)
+    report['peak_rss_mb'] = peak_rss_mb()
+    return report
+
+
+def environment() -> Dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ""
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'git_commit': commit or None,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+    }
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float = REGRESSION_TOLERANCE) -> List[str]:
+    """Stages whose p95 latency rose, or recall fell, by more than tolerance"""
+    regressions = []
+    previous = {report['scale']: report for report in baseline.get('results', [])}
+    for report in current['results']:
+        old = previous.get(report['scale'])
+        if old is None:
+            continue
+        for stage, metrics in report['stages'].items():
+            old_metrics = old['stages'].get(stage)
+            if not old_metrics:
+                continue
+            if old_metrics['p95_ms'] > 0 and metrics['p95_ms'] > old_metrics['p95_ms'] * (1 + tolerance):
+                regressions.append(f"{report['scale']} {stage}: p95 {old_metrics['p95_ms']} -> {metrics['p95_ms']} ms")
+            for k in RECALL_KS:
+                key = f"recall@{k}"
+                if key in metrics and old_metrics.get(key) and metrics[key] < old_metrics[key] * (1 - tolerance):
+                    regressions.append(f"{report['scale']} {stage}: {key} {old_metrics[key]} -> {metrics[key]}")
+    return regressions
+
+
+def main(argv: Optional[Iterable[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark retrieval and answering over synthetic corpora")
+    parser.add_argument("--scales", default=",".join(DEFAULT_SCALES),
+                        help=f"comma-separated subset of {', '.join(SCALES)}")
+    parser.add_argument("--output", default="bench_results.json", help="where to write the JSON results")
+    parser.add_argument("--compare", help="earlier results file to check for regressions")
+    parser.add_argument("--repeat", type=int, default=3, help="passes over each query set")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--base-url", help="chat completions endpoint for process_message, e.g. a local stub")
+    args = parser.parse_args(argv)
+
+    scales = [scale.strip().lower() for scale in args.scales.split(",") if scale.strip()]
+    unknown = [scale for scale in scales if scale not in SCALES]
+    if unknown:
+        parser.error(f"unknown scales {unknown}; choose from {', '.join(SCALES)}")
+
+    results = []
+    for scale in scales:
+        print(f"Running {scale}...", file=sys.stderr)
+        # A fresh process per scale keeps peak RSS and warm caches from leaking between scales
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+            report = pool.submit(run_scale, scale, args.seed, args.repeat, args.base_url).result()
+        results.append(report)
+        search = report['stages']['search_all_content']
+        recall = search.get(f"recall@{RECALL_KS[-1]}")
+        print(f"  {report['chunks']} chunks; search p50 {search['p50_ms']} ms, p99 {search['p99_ms']} ms, "
+              f"recall@{RECALL_KS[-1]} {recall}; peak RSS {report['peak_rss_mb']} MB", file=sys.stderr)
+
+    output = {'environment': environment(), 'results': results}
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(output, f, indent=2)
+    print(f"Wrote {args.output}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare(output, json.load(f))
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,136 @@
+"""Split extracted text into overlapping, token-bounded passages for retrieval."""
+import hashlib
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+WORD_PATTERN = re.compile(r"\S+")
+
+# Defaults sized so one chunk is roughly the old 500-character snippet window
+DEFAULT_CHUNK_TOKENS = 120
+DEFAULT_CHUNK_OVERLAP = 30
+
+
+@dataclass(frozen=True)
+class Chunk:
+    """A passage of a source document with its location metadata"""
+    chunk_id: str
+    doc_key: str
+    source: str
+    text: str
+    page: Optional[int]
+    start: int
+    end: int
+
+    @property
+    def label(self) -> str:
+        """Source label shown to users, including the page when known"""
+        if self.page is None:
+            return self.source
+        return f"{self.source} (p. {self.page})"
+
+
+def make_chunk_id(doc_key: str, page: Optional[int], start: int) -> str:
+    page_part = f"p{page}" if page is not None else "p0"
+    return f"{doc_key}#{page_part}:{start}"
+
+
+def chunk_text(text: str, doc_key: str, source: str, page: Optional[int] = None,
+               max_tokens: int = DEFAULT_CHUNK_TOKENS,
+               overlap: int = DEFAULT_CHUNK_OVERLAP) -> List[Chunk]:
+    """Split text into windows of at most max_tokens words, overlapping by overlap words"""
+    if overlap >= max_tokens:
+        raise ValueError("overlap must be smaller than max_tokens")
+
+    words = [(m.start(), m.end()) for m in WORD_PATTERN.finditer(text)]
+    if not words:
+        return []
+
+    chunks = []
+    stride = max_tokens - overlap
+    first = 0
+    while True:
+        last = min(first + max_tokens, len(words)) - 1
+        start, end = words[first][0], words[last][1]
+        chunks.append(Chunk(
+            chunk_id=make_chunk_id(doc_key, page, start),
+            doc_key=doc_key,
+            source=source,
+            text=text[start:end],
+            page=page,
+            start=start,
+            end=end,
+        ))
+        if last == len(words) - 1:
+            break
+        first += stride
+    return chunks
+
+
+def chunk_pages(pages: Iterable[Tuple[int, str]], doc_key: str, source: str,
+                max_tokens: int = DEFAULT_CHUNK_TOKENS,
+                overlap: int = DEFAULT_CHUNK_OVERLAP) -> List[Chunk]:
+    """Chunk a paginated document page by page so every chunk keeps its page number"""
+    chunks = []
+    for page_no, page_text in pages:
+        chunks.extend(chunk_text(page_text, doc_key, source, page=page_no,
+                                 max_tokens=max_tokens, overlap=overlap))
+    return chunks
+
+
+def make_section(url: str, path: List[str], text: str, page: Optional[int] = None,
+                 source: Optional[str] = None) -> Dict:
+    """A stably keyed unit of scraped content: one heading path of a page, or one PDF page"""
+    anchor = f"p{page}" if page is not None else " > ".join(path)
+    source = source or f"PA DCNR: {' > '.join(path)}"
+    return {
+        'key': f"{url}#{anchor}",
+        'source': source,
+        'page': page,
+        'text': text,
+        'sha256': hashlib.sha256(f"{source}\0{text}".encode('utf-8')).hexdigest(),
+    }
+
+
+def grant_sections(grant_data: Dict) -> Dict[str, Dict]:
+    """Independently indexed units of grant data by doc_key, each with a content hash.
+
+    Corpora scraped before sections existed fall back to one unit for the whole
+    website text.
+    """
+    if not grant_data:
+        return {}
+    units = {}
+    if 'sections' in grant_data:
+        for section in grant_data['sections']:
+            units[f"section:{section['key']}"] = section
+    else:
+        units["grant:general_info"] = make_section(
+            "grant", ["general_info"], grant_data.get('general_info', ''), source="PA DCNR Website")
+    units["grant:planning_session"] = make_section(
+        "grant", ["planning_session"], grant_data.get('planning_session_transcript', ''),
+        source="DCNR Planning Session")
+    return units
+
+
+def chunk_grant_data(grant_data: Dict, doc_keys: Optional[Iterable[str]] = None) -> List[Chunk]:
+    """Chunk the scraped website sections and the planning session transcript.
+
+    doc_keys restricts chunking to those units, for patching an existing index.
+    """
+    units = grant_sections(grant_data)
+    if doc_keys is not None:
+        units = {doc_key: units[doc_key] for doc_key in doc_keys if doc_key in units}
+    chunks = []
+    for doc_key, unit in units.items():
+        chunks.extend(chunk_text(unit['text'], doc_key, unit['source'], page=unit.get('page')))
+    return chunks
+
+
+def chunk_documents(documents: Dict[str, str]) -> Dict[str, List[Chunk]]:
+    """Chunk plain-text documents that were stored without page metadata"""
+    return {
+        filename: chunk_text(content, f"doc:{filename}", f"Document: {filename}")
+        for filename, content in documents.items()
+        if content
+    }
@@ -0,0 +1,185 @@
+"""Token-budgeted prompt context from ranked search results.
+
+Passages are taken in rank order. A passage mostly contained in one already
+taken (the same text from the planning transcript and an upload, say) is
+dropped and its source credited to the kept copy; the words an adjacent chunk
+window shares with a kept passage are trimmed off. What remains is packed
+into the input token budget, cutting the last passage at a word boundary if
+that still leaves it useful, and the completion budget is sized from how much
+context was sent.
+"""
+import math
+import os
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence, Tuple
+
+try:
+    import tiktoken
+except ImportError:  # Token counts fall back to an estimate
+    tiktoken = None
+
+WORD_PATTERN = re.compile(r"\S+")
+# Word n-gram size used to detect near-duplicate passages
+SHINGLE_SIZE = 5
+# Longest run of words checked when trimming the overlap between adjacent chunk windows
+MAX_OVERLAP_WORDS = 60
+# A passage cut to fit the budget must keep at least this many tokens to be worth sending
+MIN_PASSAGE_TOKENS = 40
+
+_encoding = None
+
+
+def count_tokens(text: str) -> int:
+    """Tokens in text: exact with tiktoken installed, otherwise about four characters per token"""
+    global _encoding
+    if not text:
+        return 0
+    if tiktoken is not None:
+        if _encoding is None:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        return len(_encoding.encode(text, disallowed_special=()))
+    return math.ceil(len(text) / 4)
+
+
+@dataclass
+class ContextBudget:
+    """Input budget for retrieved context and the range the completion budget is sized within"""
+    context_tokens: int = 1500
+    min_completion_tokens: int = 256
+    max_completion_tokens: int = 700
+    # Completion tokens allowed per context token sent, on top of the minimum
+    completion_ratio: float = 0.3
+    context_window: int = 16385
+    duplicate_threshold: float = 0.8
+
+    @classmethod
+    def from_env(cls) -> "ContextBudget":
+        """Read overrides such as DCNR_CONTEXT_TOKENS from the environment"""
+        budget = cls()
+        for name in ("context_tokens", "min_completion_tokens", "max_completion_tokens", "context_window"):
+            value = os.environ.get(f"DCNR_{name.upper()}")
+            if value:
+                setattr(budget, name, int(value))
+        return budget
+
+    def completion_tokens(self, prompt_tokens: int, context_tokens: int) -> int:
+        """Answer length to request: grows with the context sent, capped by the model's window"""
+        wanted = self.min_completion_tokens + int(self.completion_ratio * context_tokens)
+        wanted = min(self.max_completion_tokens, wanted)
+        return max(1, min(wanted, self.context_window - prompt_tokens))
+
+
+@dataclass
+class Passage:
+    source: str
+    text: str
+    score: float
+    tokens: int
+    truncated: bool = False
+    also_in: List[str] = field(default_factory=list)
+
+    def header(self) -> str:
+        label = self.source
+        if self.also_in:
+            label += f"; also in {', '.join(self.also_in)}"
+        return f"[From {label}]\n"
+
+    def render(self) -> str:
+        return f"{self.header()}{self.text}{'...' if self.truncated else ''}"
+
+
+@dataclass
+class BuiltContext:
+    text: str
+    passages: List[Passage]
+    tokens: int
+    duplicates: int = 0
+    over_budget: int = 0
+
+
+def _shingles(words: Sequence[str]) -> set:
+    lowered = [word.lower() for word in words]
+    if len(lowered) < SHINGLE_SIZE:
+        return {tuple(lowered)} if lowered else set()
+    return {tuple(lowered[i:i + SHINGLE_SIZE]) for i in range(len(lowered) - SHINGLE_SIZE + 1)}
+
+
+def _overlap(first: Sequence[str], second: Sequence[str]) -> int:
+    """Length of the longest suffix of first that is a prefix of second"""
+    for size in range(min(len(first), len(second), MAX_OVERLAP_WORDS), SHINGLE_SIZE - 1, -1):
+        if first[-size:] == second[:size]:
+            return size
+    return 0
+
+
+def truncate_to_tokens(text: str, tokens: int) -> str:
+    """Longest word-boundary prefix of text within tokens"""
+    words = WORD_PATTERN.findall(text)
+    low, high = 0, len(words)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if count_tokens(" ".join(words[:middle])) <= tokens:
+            low = middle
+        else:
+            high = middle - 1
+    return " ".join(words[:low])
+
+
+def build_context(search_results: Sequence[Tuple[float, str, str]],
+                  budget: Optional[ContextBudget] = None) -> BuiltContext:
+    """Deduplicate ranked (score, source, text) results and pack them into budget.context_tokens"""
+    budget = budget or ContextBudget()
+    kept: List[Tuple[Passage, List[str], set]] = []
+    duplicates = 0
+
+    for score, source, text in search_results:
+        words = WORD_PATTERN.findall(text)
+        if not words:
+            continue
+        original_length = len(words)
+        shingles = _shingles(words)
+        duplicate_of = None
+        for passage, kept_words, kept_shingles in kept:
+            if shingles and len(shingles & kept_shingles) / len(shingles) >= budget.duplicate_threshold:
+                duplicate_of = passage
+                break
+            # Adjacent chunk windows repeat each other's edges
+            head = _overlap(kept_words, words)
+            if head:
+                words = words[head:]
+            tail = _overlap(words, kept_words)
+            if tail:
+                words = words[:-tail]
+            if not words:
+                break
+        if duplicate_of is not None or not words:
+            duplicates += 1
+            if duplicate_of is not None and source != duplicate_of.source and source not in duplicate_of.also_in:
+                duplicate_of.also_in.append(source)
+            continue
+        trimmed = " ".join(words) if len(words) != original_length else text
+        kept.append((Passage(source, trimmed, score, count_tokens(trimmed)), words, _shingles(words)))
+
+    passages = []
+    used = 0
+    over_budget = 0
+    separator = count_tokens("\n\n")
+    for passage, _, _ in kept:
+        # The source label and separators count against the budget too
+        overhead = count_tokens(passage.header()) + (separator if passages else 0)
+        remaining = budget.context_tokens - used - overhead
+        if passage.tokens <= remaining:
+            passages.append(passage)
+            used += overhead + passage.tokens
+        elif remaining >= MIN_PASSAGE_TOKENS:
+            passage.text = truncate_to_tokens(passage.text, remaining - 1)
+            passage.tokens = count_tokens(passage.text)
+            passage.truncated = True
+            passages.append(passage)
+            used += overhead + passage.tokens + 1
+        else:
+            over_budget += 1
+
+    text = "\n\n".join(passage.render() for passage in passages)
+    return BuiltContext(text, passages, count_tokens(text), duplicates, over_budget)
@@ -0,0 +1,187 @@
+"""Bounded conversation memory: recent turns verbatim, older ones folded into a rolling summary.
+
+The history sent with a question never exceeds history_tokens, however long
+the session: each stored message is clipped to turn_tokens, turns beyond
+max_turns (or beyond the ceiling) are folded into the summary oldest first,
+and the summary itself is kept within summary_tokens. Follow-up questions
+("what about for nonprofits?") are expanded with the previous question before
+retrieval, so search sees the topic the user is following up on.
+"""
+import logging
+import os
+import re
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional
+
+from context_builder import count_tokens, truncate_to_tokens
+
+logger = logging.getLogger(__name__)
+
+# Per-message framing the chat API adds around content
+MESSAGE_OVERHEAD_TOKENS = 4
+SOURCES_MARKER = "\n\n📚 **Sources:**"
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+# Questions this short, that open like "what about ...", or that are shortish and refer back
+# ("is it open to them?") are treated as follow-ups
+FOLLOW_UP_MAX_WORDS = 4
+REFERENCE_MAX_WORDS = 10
+FOLLOW_UP_PATTERN = re.compile(r"^\s*((what|how)\s+about|and|also|same)\b", re.IGNORECASE)
+REFERENCE_PATTERN = re.compile(r"\b(it|its|they|them|their|those|these)\b", re.IGNORECASE)
+SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+SUMMARY_PROMPT = """You maintain a running summary of a conversation between an applicant and a Pennsylvania DCNR grant advisor.
+Merge the new exchange into the summary. Keep the applicant's facts (entity type, county, project, amounts, deadlines) and any open questions; drop pleasantries.
+Reply with the updated summary only, in at most {words} words."""
+
+
+@dataclass
+class Turn:
+    user: str
+    assistant: str
+    tokens: int
+
+
+Summarizer = Callable[[str, Turn, int], str]
+
+
+def extractive_summary(summary: str, turn: Turn, max_tokens: int) -> str:
+    """Append one line per folded turn, dropping the oldest lines to stay within max_tokens"""
+    answer = SENTENCE_END.split(turn.assistant.strip(), maxsplit=1)[0] if turn.assistant.strip() else ""
+    line = f"- Asked: {truncate_to_tokens(turn.user, 40)} | Answer: {truncate_to_tokens(answer, 60)}"
+    lines = [existing for existing in summary.splitlines() if existing] + [line]
+    while len(lines) > 1 and count_tokens("\n".join(lines)) > max_tokens:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+def make_llm_summarizer(client, model: str) -> Summarizer:
+    """Summarizer that asks the chat model to merge a folded turn into the summary.
+
+    Each fold is a blocking completion, so this suits offline callers, not a chat request path.
+    """
+    def summarize(summary: str, turn: Turn, max_tokens: int) -> str:
+        response = client.create_chat_completion(
+            model=model,
+            messages=[
+                {"role": "system", "content": SUMMARY_PROMPT.format(words=int(max_tokens * 0.7))},
+                {"role": "user", "content": f"Summary so far:\n{summary or '(none)'}\n\n"
+                                            f"New exchange:\nApplicant: {turn.user}\nAdvisor: {turn.assistant}"}
+            ],
+            max_tokens=max_tokens,
+            temperature=0.2
+        )
+        return response.choices[0].message.content.strip()
+    return summarize
+
+
+class ConversationMemory:
+    """Recent turns plus a rolling summary, within a hard token ceiling"""
+
+    def __init__(self, max_turns: int = 3, history_tokens: int = 1200, summary_tokens: int = 300,
+                 turn_tokens: int = 350, summarizer: Optional[Summarizer] = None):
+        # A full summary plus the newest turn at its clip size must fit, or add_turn would fold every turn at once
+        largest = (count_tokens(SUMMARY_PREFIX) + summary_tokens + MESSAGE_OVERHEAD_TOKENS
+                   + 2 * (turn_tokens + MESSAGE_OVERHEAD_TOKENS))
+        if largest > history_tokens:
+            raise ValueError(f"history_tokens ({history_tokens}) must fit a full summary and one full turn "
+                             f"({largest} tokens); lower summary_tokens or turn_tokens")
+        self.max_turns = max_turns
+        self.history_tokens = history_tokens
+        self.summary_tokens = summary_tokens
+        self.turn_tokens = turn_tokens
+        # Falls back to extractive_summary when unset or when it fails
+        self.summarizer = summarizer
+        self.turns: deque = deque()
+        self.summary = ""
+        self.folded = 0
+
+    @classmethod
+    def from_env(cls, **kwargs) -> "ConversationMemory":
+        """Limits from DCNR_HISTORY_TURNS, DCNR_HISTORY_TOKENS, DCNR_SUMMARY_TOKENS and DCNR_TURN_TOKENS"""
+        for name, env in (("max_turns", "DCNR_HISTORY_TURNS"), ("history_tokens", "DCNR_HISTORY_TOKENS"),
+                          ("summary_tokens", "DCNR_SUMMARY_TOKENS"), ("turn_tokens", "DCNR_TURN_TOKENS")):
+            value = os.environ.get(env)
+            if value and name not in kwargs:
+                kwargs[name] = int(value)
+        return cls(**kwargs)
+
+    @classmethod
+    def from_messages(cls, messages: Iterable[Dict], **kwargs) -> "ConversationMemory":
+        """Memory rebuilt from a chat transcript of alternating user and assistant messages.
+
+        Limits not given as keyword arguments come from the environment, as in from_env.
+        """
+        memory = cls.from_env(**kwargs)
+        question = None
+        for message in messages:
+            role, content = message.get('role'), message.get('content') or ""
+            if role == 'user':
+                question = content
+            elif role == 'assistant' and question is not None:
+                memory.add_turn(question, content)
+                question = None
+        return memory
+
+    @property
+    def tokens(self) -> int:
+        """Tokens of history_messages(), counted on the text exactly as it is sent"""
+        summary = count_tokens(self._summary_content()) + MESSAGE_OVERHEAD_TOKENS if self.summary else 0
+        return summary + sum(turn.tokens for turn in self.turns)
+
+    def _summary_content(self) -> str:
+        return f"{SUMMARY_PREFIX}{self.summary}"
+
+    def _clip(self, text: str) -> str:
+        if count_tokens(text) <= self.turn_tokens:
+            return text
+        return truncate_to_tokens(text, self.turn_tokens - 1) + "..."
+
+    def add_turn(self, user: str, assistant: str):
+        """Remember an exchange, folding the oldest turns into the summary as needed"""
+        # The sources footer is for the reader; the model does not need it back
+        assistant = assistant.split(SOURCES_MARKER, 1)[0]
+        user, assistant = self._clip(user), self._clip(assistant)
+        tokens = count_tokens(user) + count_tokens(assistant) + 2 * MESSAGE_OVERHEAD_TOKENS
+        self.turns.append(Turn(user, assistant, tokens))
+        while self.turns and (len(self.turns) > self.max_turns or self.tokens > self.history_tokens):
+            self._fold(self.turns.popleft())
+
+    def _fold(self, turn: Turn):
+        summary = None
+        if self.summarizer is not None:
+            try:
+                summary = self.summarizer(self.summary, turn, self.summary_tokens)
+            except Exception as e:
+                logger.warning("Summarizing conversation failed, keeping an extractive summary: %s", e)
+        if not summary:
+            summary = extractive_summary(self.summary, turn, self.summary_tokens)
+        if count_tokens(summary) > self.summary_tokens:
+            summary = truncate_to_tokens(summary, self.summary_tokens)
+        self.summary = summary
+        self.folded += 1
+
+    def history_messages(self) -> List[Dict]:
+        """Chat messages to send between the system prompt and the new question"""
+        messages = []
+        if self.summary:
+            messages.append({"role": "system", "content": self._summary_content()})
+        for turn in self.turns:
+            messages.append({"role": "user", "content": turn.user})
+            messages.append({"role": "assistant", "content": turn.assistant})
+        return messages
+
+    def retrieval_query(self, question: str) -> str:
+        """The question, expanded with the previous one when it reads as a follow-up"""
+        if not self.turns:
+            return question
+        words = len(question.split())
+        if (words <= FOLLOW_UP_MAX_WORDS or FOLLOW_UP_PATTERN.search(question)
+                or (words <= REFERENCE_MAX_WORDS and REFERENCE_PATTERN.search(question))):
+            return f"{question} {self.turns[-1].user}"
+        return question
+
+    def clear(self):
+        self.turns.clear()
+        self.summary = ""
+        self.folded = 0
@@ -0,0 +1,352 @@
+"""Versioned, content-addressed on-disk store for the scraped grant corpus.
+
+Layout::
+
+    corpus_store/
+        manifest.json          current version, schema, per-source hashes
+        history/<version>.json previous manifests, kept for concurrent readers
+        objects/<sha256>       immutable source texts and index files
+
+Objects are written before the manifest that references them and the
+manifest is swapped in with os.replace, so readers always see a complete
+version. Nothing is unpickled: sources are UTF-8 text or JSON.
+
+Garbage collection keeps the objects of the last KEEP_HISTORY versions and of
+every version a StoredGrantData view in this process still holds. A view held
+by another process can outlive that window; reading a source it has not
+loaded yet then raises CorpusStoreError, and the reader should load the
+current version (PublicCorpus does so on its next check).
+"""
+import contextlib
+import hashlib
+import io
+import json
+import os
+import pickle
+import tempfile
+import weakref
+from collections.abc import Mapping
+from datetime import date, datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from chunking import Chunk
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-writer deployments only
+    fcntl = None
+
+SCHEMA_VERSION = 1
+TEXT_SOURCES = ('general_info', 'planning_session_transcript')
+JSON_SOURCES = ('grants', 'deadlines', 'eligibility_criteria', 'pages', 'sections')
+KEEP_HISTORY = 3
+
+
+class CorpusStoreError(Exception):
+    """The store is missing pieces, corrupted or written by an incompatible schema"""
+
+
+class _SafeUnpickler(pickle.Unpickler):
+    """Only allows plain data and the stdlib types the scraper stored, so legacy pickles cannot run code"""
+
+    ALLOWED = {('datetime', 'datetime'), ('datetime', 'date'), ('datetime', 'timedelta'),
+               ('datetime', 'timezone'), ('collections', 'OrderedDict')}
+
+    def find_class(self, module, name):
+        if (module, name) in self.ALLOWED:
+            return super().find_class(module, name)
+        raise pickle.UnpicklingError(f"Refusing to load {module}.{name} from legacy grant data")
+
+
+def _plain(value):
+    """Legacy pickled data with dates as ISO strings and containers as dicts and lists, ready for JSON"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Mapping):
+        return {key: _plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(item) for item in value]
+    return value
+
+
+# StoredGrantData views alive in this process, by id; garbage collection keeps their versions' objects
+_open_views: "weakref.WeakValueDictionary[int, StoredGrantData]" = weakref.WeakValueDictionary()
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def atomic_write(path: str, data: bytes):
+    """Write a file so readers see either the old or the new contents, never a partial write"""
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(tmp_path)
+        raise
+
+
+class StoredGrantData(Mapping):
+    """Read-only grant_data view that loads each source the first time it is accessed"""
+
+    def __init__(self, store: "CorpusStore", manifest: Dict):
+        self.store = store
+        self.manifest = manifest
+        self._loaded: Dict[str, Any] = {'last_updated': manifest['last_updated']}
+        _open_views[id(self)] = self
+
+    @property
+    def version(self) -> int:
+        return self.manifest['version']
+
+    def __getitem__(self, key):
+        if key not in self._loaded:
+            entry = self.manifest['sources'].get(key)
+            if entry is None:
+                raise KeyError(key)
+            self._loaded[key] = self.store.read_source(entry)
+        return self._loaded[key]
+
+    def __iter__(self) -> Iterator[str]:
+        yield 'last_updated'
+        yield from self.manifest['sources']
+
+    def __len__(self):
+        return len(self.manifest['sources']) + 1
+
+
+class CorpusStore:
+    def __init__(self, root: str):
+        self.root = root
+        self.objects_dir = os.path.join(root, 'objects')
+        self.history_dir = os.path.join(root, 'history')
+        self.manifest_path = os.path.join(root, 'manifest.json')
+
+    @contextlib.contextmanager
+    def _write_lock(self):
+        """Serialise writers across processes; readers never take the lock"""
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.history_dir, exist_ok=True)
+        with open(os.path.join(self.root, '.lock'), 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def object_path(self, digest: str) -> str:
+        return os.path.join(self.objects_dir, digest)
+
+    def write_object(self, data: bytes) -> str:
+        digest = _sha256(data)
+        path = self.object_path(digest)
+        if not os.path.exists(path):
+            atomic_write(path, data)
+        return digest
+
+    def read_object(self, digest: str, verify: bool = True) -> bytes:
+        try:
+            with open(self.object_path(digest), 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            raise CorpusStoreError(f"Missing corpus object {digest}")
+        if verify and _sha256(data) != digest:
+            raise CorpusStoreError(f"Corpus object {digest} is corrupted")
+        return data
+
+    def read_source(self, entry: Dict) -> Any:
+        data = self.read_object(entry['sha256'])
+        if entry['kind'] == 'json':
+            return json.loads(data.decode('utf-8'))
+        return data.decode('utf-8')
+
+    def read_manifest(self) -> Optional[Dict]:
+        """Current manifest, or None for an empty store"""
+        try:
+            with open(self.manifest_path, 'rb') as f:
+                manifest = json.loads(f.read().decode('utf-8'))
+        except FileNotFoundError:
+            return None
+        except ValueError as e:
+            raise CorpusStoreError(f"Unreadable corpus manifest: {e}")
+        if manifest.get('schema_version') != SCHEMA_VERSION:
+            raise CorpusStoreError(
+                f"Corpus store schema {manifest.get('schema_version')} is not supported (expected {SCHEMA_VERSION})"
+            )
+        return manifest
+
+    def read_history(self) -> List[Dict]:
+        """Retained manifests, newest first; their objects have not been garbage collected"""
+        manifests = []
+        if not os.path.isdir(self.history_dir):
+            return manifests
+        versions = sorted((int(name[:-5]) for name in os.listdir(self.history_dir) if name.endswith('.json')),
+                          reverse=True)
+        for version in versions:
+            try:
+                with open(os.path.join(self.history_dir, f"{version}.json"), 'rb') as f:
+                    manifests.append(json.loads(f.read().decode('utf-8')))
+            except (FileNotFoundError, ValueError):
+                continue  # Collected or half-written by a concurrent writer
+        return manifests
+
+    def _publish(self, manifest: Dict):
+        data = json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8')
+        atomic_write(os.path.join(self.history_dir, f"{manifest['version']}.json"), data)
+        atomic_write(self.manifest_path, data)
+
+    def load(self) -> Optional[StoredGrantData]:
+        manifest = self.read_manifest()
+        if manifest is None:
+            return None
+        return StoredGrantData(self, manifest)
+
+    def save(self, grant_data: Mapping, meta: Optional[Dict] = None) -> Dict:
+        """Write a new corpus version; unchanged sources reuse their existing objects.
+
+        If no source changed at all, the current version is kept and only meta is updated.
+        """
+        with self._write_lock():
+            previous = self.read_manifest()
+            sources = {}
+            for name in TEXT_SOURCES + JSON_SOURCES:
+                if name not in grant_data:
+                    continue
+                value = grant_data[name]
+                if name in TEXT_SOURCES:
+                    kind, data = 'text', (value or '').encode('utf-8')
+                else:
+                    kind, data = 'json', json.dumps(value, sort_keys=True).encode('utf-8')
+                sources[name] = {'kind': kind, 'sha256': self.write_object(data), 'bytes': len(data)}
+
+            if previous and previous['sources'] == sources:
+                # Nothing changed: keep the current version (and its index), only record meta
+                previous['meta'] = {**previous.get('meta', {}), **(meta or {})}
+                self._publish(previous)
+                return previous
+
+            manifest = {
+                'schema_version': SCHEMA_VERSION,
+                'version': (previous['version'] + 1) if previous else 1,
+                'created': datetime.now().isoformat(),
+                'last_updated': grant_data.get('last_updated') or datetime.now().isoformat(),
+                'sources': sources,
+                'meta': {**(previous or {}).get('meta', {}), **(meta or {})},
+            }
+            self._publish(manifest)
+            self._collect_garbage()
+            return manifest
+
+    def update_meta(self, **meta) -> Optional[Dict]:
+        """Record bookkeeping (e.g. HTTP validators) on the current version without new sources"""
+        with self._write_lock():
+            manifest = self.read_manifest()
+            if manifest is None:
+                return None
+            manifest['meta'] = {**manifest.get('meta', {}), **meta}
+            self._publish(manifest)
+            return manifest
+
+    @staticmethod
+    def sources_digest(manifest: Dict) -> str:
+        """Identity of a manifest's sources, used to check whether a stored index is current"""
+        parts = sorted(f"{name}:{entry['sha256']}" for name, entry in manifest['sources'].items())
+        return _sha256("\n".join(parts).encode('utf-8'))
+
+    def save_index(self, manifest: Dict, chunks: List[Chunk], matrix: np.ndarray,
+                   doc_freq: Dict[str, int], params: Dict) -> Optional[Dict]:
+        """Attach a chunk table and dense matrix to the manifest version they were built from"""
+        table = json.dumps({
+            'chunks': [[c.chunk_id, c.doc_key, c.source, c.text, c.page, c.start, c.end] for c in chunks],
+            'doc_freq': doc_freq,
+        }).encode('utf-8')
+        buffer = io.BytesIO()
+        np.save(buffer, np.ascontiguousarray(matrix, dtype=np.float32))
+
+        with self._write_lock():
+            current = self.read_manifest()
+            if current is None or current['version'] != manifest['version']:
+                return None  # A newer corpus landed meanwhile; its own index will be built
+            current['index'] = {
+                'sources_digest': self.sources_digest(current),
+                'params': params,
+                'chunks_sha256': self.write_object(table),
+                'matrix_sha256': self.write_object(buffer.getvalue()),
+            }
+            self._publish(current)
+            return current
+
+    def load_index(self, manifest: Dict, params: Dict) -> Optional[Tuple[List[Chunk], np.ndarray, Dict[str, int]]]:
+        """Chunks, a copy-on-write memory-mapped matrix and feature DFs, if a current index exists"""
+        if not self.has_index(manifest, params):
+            return None
+        entry = manifest['index']
+        table = json.loads(self.read_object(entry['chunks_sha256']).decode('utf-8'))
+        matrix_path = self.object_path(entry['matrix_sha256'])
+        if not os.path.exists(matrix_path):
+            raise CorpusStoreError(f"Missing corpus object {entry['matrix_sha256']}")
+        matrix = np.load(matrix_path, mmap_mode='c')
+        chunks = [Chunk(*row) for row in table['chunks']]
+        return chunks, matrix, table['doc_freq']
+
+    def has_index(self, manifest: Dict, params: Dict) -> bool:
+        entry = manifest.get('index')
+        return bool(entry) and entry['params'] == params and entry['sources_digest'] == self.sources_digest(manifest)
+
+    def _collect_garbage(self):
+        """Delete objects not referenced by the last KEEP_HISTORY manifests or a view open in this process"""
+        versions = sorted(int(name[:-5]) for name in os.listdir(self.history_dir) if name.endswith('.json'))
+        for version in versions[:-KEEP_HISTORY]:
+            os.unlink(os.path.join(self.history_dir, f"{version}.json"))
+
+        manifests = []
+        for version in versions[-KEEP_HISTORY:]:
+            with open(os.path.join(self.history_dir, f"{version}.json"), 'rb') as f:
+                manifests.append(json.loads(f.read().decode('utf-8')))
+        root = os.path.abspath(self.root)
+        manifests.extend(view.manifest for view in list(_open_views.values())
+                         if os.path.abspath(view.store.root) == root)
+
+        referenced = set()
+        for manifest in manifests:
+            referenced.update(entry['sha256'] for entry in manifest['sources'].values())
+            if manifest.get('index'):
+                referenced.add(manifest['index']['chunks_sha256'])
+                referenced.add(manifest['index']['matrix_sha256'])
+        for name in os.listdir(self.objects_dir):
+            if not name.startswith('.') and name not in referenced:
+                with contextlib.suppress(FileNotFoundError):
+                    os.unlink(os.path.join(self.objects_dir, name))
+
+    def import_seed(self, path: str) -> Dict:
+        """Populate an empty store from a read-only JSON snapshot shipped with the code"""
+        try:
+            with open(path, 'rb') as f:
+                data = json.loads(f.read().decode('utf-8'))
+        except ValueError as e:
+            raise CorpusStoreError(f"Seed grant data could not be read: {e}")
+        if not isinstance(data, dict):
+            raise CorpusStoreError("Seed grant data is not a JSON object")
+        return self.save(data)
+
+    def import_pickle(self, path: str) -> Dict:
+        """One-time migration of a legacy grant_data.pkl holding only plain data"""
+        with open(path, 'rb') as f:
+            try:
+                data = _SafeUnpickler(f).load()
+            except pickle.UnpicklingError as e:
+                raise CorpusStoreError(f"Legacy grant data could not be migrated: {e}")
+        if not isinstance(data, dict):
+            raise CorpusStoreError("Legacy grant data is not a dict")
+        return self.save(_plain(data))
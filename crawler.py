@@ -0,0 +1,218 @@
+"""Bounded concurrent crawler for linked DCNR program pages and PDF guidance documents."""
+import hashlib
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+from urllib.parse import urldefrag, urljoin, urlparse
+from urllib.robotparser import RobotFileParser
+
+from pdf_extract import iter_pdf_pages
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "PA-DCNR-Grant-Assistant/1.0"
+MAX_RESPONSE_BYTES = 20 * 1024 * 1024
+
+
+def is_pdf(url: str, content_type: str = "") -> bool:
+    return "pdf" in content_type.lower() or urlparse(url).path.lower().endswith(".pdf")
+
+
+def http_validators(content: bytes, headers: Mapping) -> Dict:
+    """ETag, Last-Modified and content hash to revalidate a fetched URL with next time"""
+    return {
+        'etag': headers.get('ETag'),
+        'last_modified': headers.get('Last-Modified'),
+        'sha256': hashlib.sha256(content).hexdigest()
+    }
+
+
+def conditional_headers(validators: Dict) -> Dict:
+    """If-None-Match/If-Modified-Since request headers from recorded validators"""
+    headers = {}
+    if validators.get('etag'):
+        headers['If-None-Match'] = validators['etag']
+    if validators.get('last_modified'):
+        headers['If-Modified-Since'] = validators['last_modified']
+    return headers
+
+
+class HostPolicy:
+    """Per-host concurrency limit, politeness delay and robots.txt rules"""
+
+    def __init__(self, concurrency: int, delay: float, robots: Optional[RobotFileParser]):
+        self.slots = threading.BoundedSemaphore(concurrency)
+        self.robots = robots
+        crawl_delay = robots.crawl_delay(USER_AGENT) if robots else None
+        self.delay = max(delay, float(crawl_delay or 0))
+        self._next_request = 0.0
+        self._lock = threading.Lock()
+
+    def allowed(self, url: str) -> bool:
+        return self.robots is None or self.robots.can_fetch(USER_AGENT, url)
+
+    def wait_turn(self):
+        """Space requests to this host at least `delay` seconds apart"""
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_request)
+            self._next_request = start + self.delay
+        if start > now:
+            time.sleep(start - now)
+
+
+class GrantCrawler:
+    """Breadth-first crawl from the program landing page.
+
+    HTML pages are followed when they share the start URL's host and path
+    prefix; PDFs linked from them are fetched but not followed. Each depth
+    level is fetched concurrently on a thread pool, with a per-host
+    concurrency cap and politeness delay, and robots.txt is honoured.
+    Every fetched page is parsed by the owning GrantRAGSystem and handed to
+    on_page as soon as it arrives.
+    """
+
+    def __init__(self, rag_system, max_depth: int = 1, max_pages: int = 100, max_workers: int = 8,
+                 per_host_concurrency: int = 2, delay: float = 0.5,
+                 allowed_prefixes: Optional[Iterable[str]] = None, respect_robots: bool = True,
+                 timeout: float = 30):
+        self.rag_system = rag_system
+        self.session = rag_system.http_session
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.max_workers = max_workers
+        self.per_host_concurrency = per_host_concurrency
+        self.delay = delay
+        self.allowed_prefixes = list(allowed_prefixes) if allowed_prefixes else None
+        self.respect_robots = respect_robots
+        self.timeout = timeout
+        self._hosts: Dict[str, HostPolicy] = {}
+        self._hosts_lock = threading.Lock()
+
+    def _policy(self, url: str) -> HostPolicy:
+        parsed = urlparse(url)
+        host = f"{parsed.scheme}://{parsed.netloc}"
+        with self._hosts_lock:
+            policy = self._hosts.get(host)
+            if policy is None:
+                robots = self._load_robots(host) if self.respect_robots else None
+                policy = self._hosts[host] = HostPolicy(self.per_host_concurrency, self.delay, robots)
+            return policy
+
+    def _load_robots(self, host: str) -> Optional[RobotFileParser]:
+        robots = RobotFileParser(f"{host}/robots.txt")
+        try:
+            response = self.session.get(f"{host}/robots.txt", timeout=self.timeout)
+        except Exception as e:
+            logger.info("robots.txt unavailable for %s: %s", host, e)
+            return None
+        if response.status_code >= 400:
+            return None
+        robots.parse(response.text.splitlines())
+        return robots
+
+    def _in_scope(self, url: str, start: str) -> bool:
+        parsed, origin = urlparse(url), urlparse(start)
+        if parsed.scheme not in ("http", "https") or parsed.netloc != origin.netloc:
+            return False
+        if is_pdf(url):
+            return True
+        prefixes = self.allowed_prefixes or [origin.path.rsplit("/", 1)[0] + "/"]
+        return any(parsed.path.startswith(prefix) for prefix in prefixes)
+
+    def _fetch(self, url: str, headers: Optional[Dict] = None) -> Optional[Tuple[Optional[bytes], str, Mapping]]:
+        """Body, content type and response headers; the body is None when a conditional request got 304"""
+        policy = self._policy(url)
+        if not policy.allowed(url):
+            logger.info("Skipping %s (disallowed by robots.txt)", url)
+            return None
+        with policy.slots:
+            policy.wait_turn()
+            response = self.session.get(url, headers=headers, timeout=self.timeout, stream=True)
+            try:
+                if response.status_code == 304 and headers:
+                    return None, "", response.headers
+                if response.status_code != 200:
+                    logger.info("Skipping %s (HTTP %s)", url, response.status_code)
+                    return None
+                body = bytearray()
+                for block in response.iter_content(64 * 1024):
+                    body += block
+                    if len(body) > MAX_RESPONSE_BYTES:
+                        logger.info("Skipping %s (larger than %d bytes)", url, MAX_RESPONSE_BYTES)
+                        return None
+                return bytes(body), response.headers.get("Content-Type", ""), response.headers
+            finally:
+                response.close()
+
+    def _visit(self, url: str, depth: int) -> Optional[Dict]:
+        try:
+            fetched = self._fetch(url)
+            if fetched is None:
+                return None
+            content, content_type, headers = fetched
+            validators = http_validators(content, headers)
+            if is_pdf(url, content_type):
+                page_texts = list(iter_pdf_pages(content))
+                return {'url': url, 'kind': 'pdf', 'depth': depth,
+                        'title': urlparse(url).path.rsplit("/", 1)[-1],
+                        'text': "\n".join(text for _, text in page_texts),
+                        'page_texts': page_texts, 'links': [],
+                        'grants': [], 'deadlines': [], 'validators': validators}
+            page = self.rag_system.parse_program_html(content, url)
+            return {'url': url, 'kind': 'html', 'depth': depth, 'validators': validators, **page}
+        except Exception as e:
+            logger.warning("Failed to crawl %s: %s", url, e)
+            return None
+
+    def _unchanged(self, url: str, previous: Dict) -> bool:
+        try:
+            fetched = self._fetch(url, conditional_headers(previous))
+        except Exception as e:
+            logger.info("Revalidating %s failed: %s", url, e)
+            return False
+        if fetched is None:
+            return False
+        content = fetched[0]
+        return content is None or hashlib.sha256(content).hexdigest() == previous.get('sha256')
+
+    def unchanged(self, validators: Dict[str, Dict]) -> bool:
+        """True when every URL answers 304 to a conditional request or still hashes as recorded"""
+        if not validators:
+            return True
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="crawler") as pool:
+            return all(list(pool.map(lambda item: self._unchanged(*item), validators.items())))
+
+    def crawl(self, start_url: str, on_page: Optional[Callable[[Dict], None]] = None,
+              start_page: Optional[Dict] = None) -> List[Dict]:
+        """Crawl from start_url and return the fetched pages (excluding the start page).
+
+        start_page may carry the already-parsed landing page so it is not fetched twice.
+        """
+        start_url = urldefrag(start_url)[0]
+        seen: Set[str] = {start_url}
+        pages: List[Dict] = []
+        frontier = [(link, 1) for link in (start_page or {}).get('links', [])] if start_page else [(start_url, 0)]
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="crawler") as pool:
+            while frontier and len(pages) < self.max_pages:
+                batch = []
+                for link, depth in frontier:
+                    link = urldefrag(link)[0]
+                    if depth == 0 or (link not in seen and depth <= self.max_depth and self._in_scope(link, start_url)):
+                        seen.add(link)
+                        batch.append((link, depth))
+                batch = batch[:self.max_pages - len(pages)]
+                frontier = []
+                for page in pool.map(lambda item: self._visit(*item), batch):
+                    if page is None:
+                        continue
+                    if page['depth'] > 0:
+                        pages.append(page)
+                        if on_page:
+                            on_page(page)
+                    if page['kind'] == 'html' and page['depth'] < self.max_depth:
+                        frontier.extend((urljoin(page['url'], link), page['depth'] + 1) for link in page['links'])
+        return pages
@@ -0,0 +1,193 @@
+"""Offline dense-vector retrieval over chunks using hashed term vectors."""
+import itertools
+import math
+import zlib
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from chunking import Chunk
+from search_index import tokenize
+
+# 512 float32 dimensions keeps 20k chunks at ~40 MB and a query at a few milliseconds
+DEFAULT_DIM = 512
+INITIAL_CAPACITY = 1024
+
+
+def _hash_feature(feature: str, dim: int) -> Tuple[int, float]:
+    """Map a feature to a stable (bucket, sign) pair; crc32 is identical across processes"""
+    h = zlib.crc32(feature.encode('utf-8'))
+    return h % dim, (1.0 if (h >> 31) & 1 else -1.0)
+
+
+class HashedEmbedder:
+    """Embed text as signed, hashed unigram + bigram counts with sublinear tf"""
+
+    def __init__(self, dim: int = DEFAULT_DIM):
+        self.dim = dim
+        self._buckets: Dict[str, Tuple[int, float]] = {}
+
+    def feature_counts(self, text: str) -> Dict[str, int]:
+        tokens = tokenize(text)
+        counts: Dict[str, int] = {}
+        for feature in itertools.chain(tokens, map(" ".join, zip(tokens, tokens[1:]))):
+            counts[feature] = counts.get(feature, 0) + 1
+        return counts
+
+    def vectorize(self, counts: Dict[str, float], weights: Optional[Dict[str, float]] = None) -> np.ndarray:
+        """Hash feature counts into an L2-normalised float32 vector"""
+        vector = np.zeros(self.dim, dtype=np.float32)
+        buckets = self._buckets
+        for feature, count in counts.items():
+            slot = buckets.get(feature)
+            if slot is None:
+                slot = buckets[feature] = _hash_feature(feature, self.dim)
+            value = 1.0 + math.log(count)
+            if weights is not None:
+                value *= weights.get(feature, 1.0)
+            vector[slot[0]] += slot[1] * value
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector
+
+    def embed(self, text: str) -> np.ndarray:
+        return self.vectorize(self.feature_counts(text))
+
+
+class DenseIndex:
+    """Chunk vectors stored in one contiguous float32 matrix.
+
+    Rows are appended into a growable buffer; removed rows are zeroed and
+    masked out until enough of them accumulate to be worth compacting.
+    Only query features are IDF-weighted, so stored vectors never need
+    re-weighting as chunks are added or removed.
+    """
+
+    def __init__(self, dim: int = DEFAULT_DIM, embedder: Optional[HashedEmbedder] = None):
+        self.embedder = embedder or HashedEmbedder(dim)
+        self.dim = self.embedder.dim
+        self.matrix = np.zeros((INITIAL_CAPACITY, self.dim), dtype=np.float32)
+        self.alive = np.zeros(INITIAL_CAPACITY, dtype=bool)
+        self.doc_freq: Dict[str, int] = {}
+        self.ids: List[Optional[str]] = []
+        self.rows: Dict[str, int] = {}
+        self.chunks: Dict[str, Chunk] = {}
+        self.dead = 0
+
+    def __len__(self):
+        return len(self.rows)
+
+    @classmethod
+    def from_arrays(cls, chunks: List[Chunk], matrix: np.ndarray, doc_freq: Dict[str, int]) -> "DenseIndex":
+        """Wrap a saved matrix (possibly memory-mapped) without re-embedding its chunks"""
+        index = cls(dim=matrix.shape[1])
+        if chunks:
+            index.matrix = matrix
+            index.alive = np.ones(len(chunks), dtype=bool)
+        index.doc_freq = dict(doc_freq)
+        index.ids = [chunk.chunk_id for chunk in chunks]
+        index.rows = {chunk.chunk_id: row for row, chunk in enumerate(chunks)}
+        index.chunks = {chunk.chunk_id: chunk for chunk in chunks}
+        return index
+
+    def export(self) -> Tuple[List[Chunk], np.ndarray, Dict[str, int]]:
+        """Chunks in row order, the live rows of the matrix and feature DFs, for persisting"""
+        if self.dead:
+            self.compact()
+        size = len(self.ids)
+        return [self.chunks[chunk_id] for chunk_id in self.ids], self.matrix[:size], self.doc_freq
+
+    def _grow(self, needed: int):
+        capacity = self.matrix.shape[0]
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity = max(capacity * 2, INITIAL_CAPACITY)
+        matrix = np.zeros((capacity, self.dim), dtype=np.float32)
+        matrix[:len(self.ids)] = self.matrix[:len(self.ids)]
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:len(self.ids)] = self.alive[:len(self.ids)]
+        self.matrix, self.alive = matrix, alive
+
+    def add_vector(self, chunk: Chunk, vector: np.ndarray, features: Iterable[str]):
+        """Insert a precomputed vector for a chunk, replacing any previous version"""
+        if chunk.chunk_id in self.rows:
+            self.remove(chunk.chunk_id)
+        row = len(self.ids)
+        self._grow(row + 1)
+        self.matrix[row] = vector
+        self.alive[row] = True
+        for feature in features:
+            self.doc_freq[feature] = self.doc_freq.get(feature, 0) + 1
+        self.ids.append(chunk.chunk_id)
+        self.rows[chunk.chunk_id] = row
+        self.chunks[chunk.chunk_id] = chunk
+
+    def add_chunk(self, chunk: Chunk):
+        counts = self.embedder.feature_counts(chunk.text)
+        self.add_vector(chunk, self.embedder.vectorize(counts), counts)
+
+    def add_chunks(self, chunks: Iterable[Chunk]):
+        for chunk in chunks:
+            self.add_chunk(chunk)
+
+    def remove(self, chunk_id: str):
+        """Mask a chunk out of the matrix, compacting once half the rows are dead"""
+        row = self.rows.pop(chunk_id, None)
+        if row is None:
+            return
+        for feature in self.embedder.feature_counts(self.chunks[chunk_id].text):
+            remaining = self.doc_freq.get(feature, 0) - 1
+            if remaining > 0:
+                self.doc_freq[feature] = remaining
+            else:
+                self.doc_freq.pop(feature, None)
+        self.matrix[row] = 0.0
+        self.alive[row] = False
+        self.ids[row] = None
+        self.chunks.pop(chunk_id, None)
+        self.dead += 1
+        if self.dead > len(self.rows):
+            self.compact()
+
+    def compact(self):
+        """Drop dead rows so the matrix is dense again"""
+        keep = np.flatnonzero(self.alive[:len(self.ids)])
+        capacity = max(INITIAL_CAPACITY, self.matrix.shape[0])
+        matrix = np.zeros((capacity, self.dim), dtype=np.float32)
+        matrix[:len(keep)] = self.matrix[keep]
+        self.matrix = matrix
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.alive[:len(keep)] = True
+        self.ids = [self.ids[row] for row in keep]
+        self.rows = {chunk_id: row for row, chunk_id in enumerate(self.ids)}
+        self.dead = 0
+
+    def query_vector(self, query: str) -> np.ndarray:
+        """Embed a query with each feature weighted by its IDF"""
+        counts = self.embedder.feature_counts(query)
+        n = len(self.rows)
+        weights = {
+            feature: math.log((n + 1) / (self.doc_freq.get(feature, 0) + 1)) + 1.0
+            for feature in counts
+        }
+        return self.embedder.vectorize(counts, weights)
+
+    def search(self, query: str, top_k: int = 5) -> List[Tuple[float, str]]:
+        """Return the top_k (cosine score, chunk_id) pairs for a query"""
+        size = len(self.ids)
+        if not self.rows or top_k <= 0:
+            return []
+
+        scores = self.matrix[:size] @ self.query_vector(query)
+        if self.dead:
+            scores[~self.alive[:size]] = -np.inf
+
+        k = min(top_k, len(self.rows))
+        if k < size:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(size)
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[row]), self.ids[row]) for row in top if scores[row] > 0]
@@ -0,0 +1,240 @@
+"""Eligibility rules declared in a data file and compiled to bitmasks.
+
+Every entity type and flag named in the rules gets one bit. An applicant is
+reduced to an entity mask (cached per distinct entity string) and a flag
+mask, so each program check is a couple of AND/compare operations, for one
+applicant or a whole batch at once. The rules file is re-read when it changes
+on disk; a broken edit keeps the previous rules in force.
+"""
+import json
+import logging
+import os
+import re
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "eligibility_rules.json")
+
+
+# Bits available in the int64 masks of evaluate_batch (the sign bit is left unused)
+MAX_MASK_BITS = 63
+
+
+class EligibilityRulesError(Exception):
+    """The rules file is missing, malformed or refers to undeclared flags"""
+
+
+def normalize_entity(text: Optional[str]) -> str:
+    """Lowercase words with punctuation dropped inside them, e.g. 'Non-profit 501(c)(3)' -> 'nonprofit 501c3'"""
+    return " ".join(re.sub(r"[^a-z0-9\s]", "", (text or "").lower()).split())
+
+
+@dataclass(frozen=True)
+class Restriction:
+    entity_mask: int
+    confidence: str
+    notes: str
+    recommendation: Optional[str]
+
+
+@dataclass(frozen=True)
+class ProgramRule:
+    name: str
+    entity_mask: int
+    required_mask: int
+    # (entity mask, required flag mask): flags required only of those entity types
+    entity_requirements: Tuple[Tuple[int, int], ...]
+    notes: str
+    confidence: str
+    restrictions: Tuple[Restriction, ...]
+
+
+class CompiledRules:
+    def __init__(self, spec: Dict):
+        try:
+            programs = spec['programs']
+            flags = spec.get('flags', {})
+        except (KeyError, TypeError) as e:
+            raise EligibilityRulesError(f"Rules must define 'programs': {e}")
+
+        self.version = spec.get('version')
+        self.flag_names: List[str] = list(flags)
+        self.flag_bits = {name: 1 << i for i, name in enumerate(self.flag_names)}
+        self.missing_reasons = {name: flags[name].get('missing_reason', f"{name} is required") for name in flags}
+
+        terms = {normalize_entity(term) for program in programs for term in program.get('entity_types', [])}
+        for program in programs:
+            for group in program.get('entity_requirements', []) + program.get('restrictions', []):
+                terms.update(normalize_entity(term) for term in group.get('entity_types', []))
+        # Longer terms first only affects readability of the bit order
+        self.entity_terms = sorted(terms, key=lambda term: (-len(term), term))
+        if len(self.entity_terms) > MAX_MASK_BITS or len(self.flag_names) > MAX_MASK_BITS:
+            raise EligibilityRulesError(
+                f"Rules declare {len(self.entity_terms)} entity terms and {len(self.flag_names)} flags; "
+                f"batch evaluation packs each into int64 masks of at most {MAX_MASK_BITS} bits")
+        self.entity_bits = {term: 1 << i for i, term in enumerate(self.entity_terms)}
+
+        self.programs = tuple(self._compile_program(program) for program in programs)
+        self.program_index = {program.name: i for i, program in enumerate(self.programs)}
+        self._entity_cache = lru_cache(maxsize=4096)(self._match_entity)
+
+    def _entities(self, terms: Sequence[str]) -> int:
+        mask = 0
+        for term in terms:
+            mask |= self.entity_bits[normalize_entity(term)]
+        return mask
+
+    def _flags(self, names: Sequence[str], program: str) -> int:
+        mask = 0
+        for name in names:
+            if name not in self.flag_bits:
+                raise EligibilityRulesError(f"Program '{program}' requires undeclared flag '{name}'")
+            mask |= self.flag_bits[name]
+        return mask
+
+    def _compile_program(self, program: Dict) -> ProgramRule:
+        try:
+            name = program['name']
+        except KeyError:
+            raise EligibilityRulesError("Every program needs a 'name'")
+        return ProgramRule(
+            name=name,
+            entity_mask=self._entities(program.get('entity_types', [])),
+            required_mask=self._flags(program.get('requires', []), name),
+            entity_requirements=tuple(
+                (self._entities(group.get('entity_types', [])), self._flags(group.get('requires', []), name))
+                for group in program.get('entity_requirements', [])
+            ),
+            notes=program.get('notes', 'Meets basic criteria'),
+            confidence=program.get('confidence', 'High'),
+            restrictions=tuple(
+                Restriction(self._entities(item.get('entity_types', [])), item.get('confidence', 'Medium'),
+                            item.get('notes', ''), item.get('recommendation'))
+                for item in program.get('restrictions', [])
+            ),
+        )
+
+    def _match_entity(self, normalized: str) -> int:
+        mask = 0
+        for term, bit in self.entity_bits.items():
+            if term in normalized:
+                mask |= bit
+        return mask
+
+    def applicant_masks(self, user_info: Dict) -> Tuple[int, int]:
+        """(entity mask, flag mask) for one applicant"""
+        flag_mask = 0
+        for name, bit in self.flag_bits.items():
+            if user_info.get(name):
+                flag_mask |= bit
+        # Flags only add requirements; the entity type alone decides which programs apply
+        return self._entity_cache(normalize_entity(user_info.get('entity_type'))), flag_mask
+
+    def required_flags(self, program: ProgramRule, entity_mask: int) -> int:
+        required = program.required_mask
+        for group_entities, group_flags in program.entity_requirements:
+            if entity_mask & group_entities:
+                required |= group_flags
+        return required
+
+    def evaluate(self, user_info: Dict, grant_type: Optional[str] = None) -> Dict:
+        """Eligible and ineligible programs with notes, reasons and recommendations"""
+        results = {'eligible_grants': [], 'ineligible_grants': [], 'recommendations': []}
+        entity_mask, flag_mask = self.applicant_masks(user_info)
+        user_entity = normalize_entity(user_info.get('entity_type'))
+
+        for program in self.programs:
+            if grant_type and grant_type != program.name:
+                continue
+            reasons = []
+            if not entity_mask & program.entity_mask:
+                reasons.append(f"Entity type '{user_entity}' may not qualify")
+            missing = self.required_flags(program, entity_mask) & ~flag_mask
+            reasons.extend(self.missing_reasons[name] for name, bit in self.flag_bits.items() if missing & bit)
+
+            if reasons:
+                results['ineligible_grants'].append({'grant': program.name, 'reasons': reasons})
+                continue
+            eligible = {'grant': program.name, 'confidence': program.confidence, 'notes': program.notes}
+            for restriction in program.restrictions:
+                if entity_mask & restriction.entity_mask:
+                    eligible['confidence'] = restriction.confidence
+                    eligible['notes'] = restriction.notes
+                    if restriction.recommendation and restriction.recommendation not in results['recommendations']:
+                        results['recommendations'].append(restriction.recommendation)
+            results['eligible_grants'].append(eligible)
+        return results
+
+    def evaluate_batch(self, applicants: Sequence[Dict]) -> np.ndarray:
+        """Boolean matrix of shape (applicants, programs): True where the applicant is eligible"""
+        masks = np.array([self.applicant_masks(info) for info in applicants], dtype=np.int64).reshape(-1, 2)
+        entity, flags = masks[:, :1], masks[:, 1:]
+        program_entities = np.array([program.entity_mask for program in self.programs], dtype=np.int64)
+        required = np.broadcast_to(np.array([program.required_mask for program in self.programs], dtype=np.int64),
+                                   (len(applicants), len(self.programs))).copy()
+        for column, program in enumerate(self.programs):
+            for group_entities, group_flags in program.entity_requirements:
+                required[:, column] |= np.where(entity[:, 0] & group_entities, group_flags, 0)
+        return ((entity & program_entities) != 0) & ((flags & required) == required)
+
+
+class EligibilityEngine:
+    """Compiled rules from a file, recompiled when the file's modification time changes"""
+
+    def __init__(self, path: str = DEFAULT_RULES_PATH):
+        self.path = path
+        self._rules: Optional[CompiledRules] = None
+        self._mtime: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def rules(self) -> CompiledRules:
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError as e:
+            if self._rules is None:
+                raise EligibilityRulesError(f"Eligibility rules not found at {self.path}: {e}")
+            return self._rules
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime:
+                    self._reload(mtime)
+        return self._rules
+
+    def _reload(self, mtime: float):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                rules = CompiledRules(json.load(f))
+        except (ValueError, EligibilityRulesError) as e:
+            if self._rules is None:
+                raise EligibilityRulesError(f"Invalid eligibility rules in {self.path}: {e}")
+            logger.error("Keeping previous eligibility rules; %s is invalid: %s", self.path, e)
+        else:
+            self._rules = rules
+            logger.info("Loaded eligibility rules version %s from %s", rules.version, self.path)
+        self._mtime = mtime
+
+    def check(self, user_info: Dict, grant_type: Optional[str] = None) -> Dict:
+        return self.rules.evaluate(user_info, grant_type)
+
+    def check_batch(self, applicants: Sequence[Dict]) -> np.ndarray:
+        return self.rules.evaluate_batch(applicants)
+
+
+_engines: Dict[str, EligibilityEngine] = {}
+_engines_lock = threading.Lock()
+
+
+def get_eligibility_engine(path: Optional[str] = None) -> EligibilityEngine:
+    """Process-wide engine for a rules file (DCNR_ELIGIBILITY_RULES, or the bundled file)"""
+    path = os.path.abspath(path or os.environ.get("DCNR_ELIGIBILITY_RULES") or DEFAULT_RULES_PATH)
+    with _engines_lock:
+        if path not in _engines:
+            _engines[path] = EligibilityEngine(path)
+        return _engines[path]
@@ -0,0 +1,707 @@
+"""Grant corpus management, eligibility checks and application scoring, independent of the UI."""
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Union
+from urllib.parse import urljoin
+
+import requests
+from bs4 import BeautifulSoup
+
+from batch_scoring import ApplicationTable, BatchScores, score_applications
+from chunking import make_section
+from crawler import GrantCrawler, conditional_headers, http_validators
+from eligibility import get_eligibility_engine
+from corpus_store import CorpusStore, CorpusStoreError, StoredGrantData
+from regional_advisors import get_regional_advisor
+from retrieval import INDEX_PARAMS, CorpusIndex, build_search_index, patch_search_index
+
+logger = logging.getLogger(__name__)
+
+# Stored data older than this is still served, but triggers a background refresh
+STALE_AFTER = timedelta(days=30)
+# After a failed refresh, wait 5 minutes, doubling per consecutive failure up to 6 hours
+REFRESH_BACKOFF_BASE = 300.0
+REFRESH_BACKOFF_MAX = 6 * 3600.0
+
+
+class RefreshState:
+    """Single-flight guard and failure backoff for corpus refreshes, shared by all sessions"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.in_flight = False
+        self.failures = 0
+        self.retry_at = 0.0
+        self.last_error: Optional[str] = None
+
+    def try_begin(self, force: bool = False) -> bool:
+        """Claim the refresh slot; False if one is running or a recent failure is backing off"""
+        with self._lock:
+            if self.in_flight or (not force and time.monotonic() < self.retry_at):
+                return False
+            self.in_flight = True
+            return True
+
+    def finish(self, error: Optional[str] = None):
+        with self._lock:
+            self.in_flight = False
+            self.last_error = error
+            if error is None:
+                self.failures = 0
+                self.retry_at = 0.0
+            else:
+                self.failures += 1
+                backoff = min(REFRESH_BACKOFF_BASE * 2 ** (self.failures - 1), REFRESH_BACKOFF_MAX)
+                self.retry_at = time.monotonic() + backoff
+
+
+_refresh_states: Dict[str, RefreshState] = {}
+_refresh_states_lock = threading.Lock()
+
+
+_http_session: Optional[requests.Session] = None
+_http_session_lock = threading.Lock()
+
+
+def get_http_session() -> requests.Session:
+    """Process-wide requests.Session so scrapes reuse pooled keep-alive connections"""
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            _http_session = requests.Session()
+            _http_session.headers['User-Agent'] = "PA-DCNR-Grant-Assistant/1.0"
+        return _http_session
+
+
+def refresh_state_for(store_root: str) -> RefreshState:
+    """One RefreshState per corpus store, living as long as the process"""
+    key = os.path.abspath(store_root)
+    with _refresh_states_lock:
+        if key not in _refresh_states:
+            _refresh_states[key] = RefreshState()
+        return _refresh_states[key]
+
+
+class GrantRAGSystem:
+    def __init__(self):
+        self.grant_url = "https://www.pa.gov/agencies/dcnr/programs-and-services/grants/community-conservation-partnerships-program-grants.html"
+        self.store = CorpusStore(os.environ.get("DCNR_CORPUS_STORE", "corpus_store"))
+        # Pre-store deployments kept everything in one pickle; it is migrated once
+        self.legacy_data_file = "grant_data.pkl"
+        # Read-only snapshot shipped in the repo, imported when the store is empty
+        self.seed_data_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "seed_grant_data.json")
+        self.refresh_state = refresh_state_for(self.store.root)
+        # Linked program pages and PDFs are crawled this many links deep on each refresh (0 disables)
+        self.crawl_depth = int(os.environ.get("DCNR_CRAWL_DEPTH", 1))
+        self.crawl_max_pages = int(os.environ.get("DCNR_CRAWL_MAX_PAGES", 50))
+        # Compiled from eligibility_rules.json (or DCNR_ELIGIBILITY_RULES) and reloaded when it changes
+        self.eligibility = get_eligibility_engine()
+    
+    @property
+    def http_session(self) -> requests.Session:
+        return get_http_session()
+        
+    def scrape_grant_data(self):
+        """Scrape grant information from PA DCNR website"""
+        try:
+            return self._scrape()
+        except Exception as e:
+            logger.exception("Error scraping website: %s", e)
+            # Return at least the planning session content
+            return self.fallback_grant_data()
+    
+    def fallback_grant_data(self):
+        """Grant data with only the built-in planning session content"""
+        return {
+            'last_updated': datetime.now().isoformat(),
+            'grants': [],
+            'general_info': '',
+            'deadlines': [],
+            'eligibility_criteria': {},
+            'pages': [],
+            'planning_session_transcript': self.get_planning_session_content()
+        }
+    
+    def _linked_validators(self, manifest: Optional[Dict]) -> Optional[Dict[str, Dict]]:
+        """Validators of the linked pages saved with the current version; None if they must be re-crawled"""
+        if manifest is None:
+            return None
+        meta = manifest.get('meta', {})
+        # Stores written before crawling existed hold the landing page only
+        if meta.get('crawl_depth', 0) != self.crawl_depth:
+            return None
+        if self.crawl_depth <= 0:
+            return {}
+        http_meta = meta.get('http', {})
+        try:
+            pages = StoredGrantData(self.store, manifest).get('pages', [])
+        except CorpusStoreError:
+            return None
+        linked = {}
+        for page in pages:
+            if page['url'] not in http_meta:
+                return None
+            linked[page['url']] = http_meta[page['url']]
+        return linked
+    
+    def _record_checks(self, validators: Dict[str, Dict]):
+        """Store validators per URL for the current corpus version; the corpus itself is unchanged"""
+        manifest = self.store.read_manifest()
+        http_meta = dict(manifest.get('meta', {}).get('http', {}))
+        http_meta.update(validators)
+        self.store.update_meta(http=http_meta)
+    
+    def _scrape(self):
+        """Fetch and parse the program page and save it as a new corpus version; raises on failure.
+        
+        ETag, Last-Modified and a content hash are recorded for every fetched URL.
+        The landing page request is conditional on them; when it answers 304 or
+        hashes the same as last time, the linked pages crawled last time are
+        revalidated the same way, and if none of them changed either, parsing,
+        saving and re-indexing are skipped and the current stored version is
+        returned. Otherwise linked program pages and PDFs are crawled (see
+        crawl_depth) and saved alongside the landing page; if nothing changed the
+        store keeps the current version.
+        """
+        manifest = self.store.read_manifest()
+        http_meta = (manifest or {}).get('meta', {}).get('http', {})
+        previous = http_meta.get(self.grant_url, {})
+        
+        response = get_http_session().get(self.grant_url, headers=conditional_headers(previous), timeout=30)
+        checked = datetime.now().isoformat()
+        not_modified = response.status_code == 304 and bool(previous)
+        if not not_modified:
+            response.raise_for_status()
+        validators = previous if not_modified else http_validators(response.content, response.headers)
+        
+        if previous and validators.get('sha256') == previous.get('sha256'):
+            linked = self._linked_validators(manifest)
+            if linked is not None and (not linked or self._crawler().unchanged(linked)):
+                self._record_checks({url: {**recorded, 'checked': checked}
+                                     for url, recorded in {**linked, self.grant_url: validators}.items()})
+                return self.store.load()
+            if not_modified:
+                # A linked page changed, so the landing page is needed to crawl from
+                response = get_http_session().get(self.grant_url, timeout=30)
+                response.raise_for_status()
+                validators = http_validators(response.content, response.headers)
+
+        landing = self.parse_program_html(response.content, self.grant_url)
+        grant_data = {
+            'last_updated': datetime.now().isoformat(),
+            'grants': landing['grants'],
+            'general_info': landing['text'],
+            'deadlines': landing['deadlines'],
+            'eligibility_criteria': {},
+            'pages': [],
+            'sections': landing['sections'],
+            'planning_session_transcript': self.get_planning_session_content()
+        }
+        
+        http_meta = {self.grant_url: {**validators, 'checked': checked}}
+        if self.crawl_depth > 0:
+            for page in self.crawl_linked_pages(landing):
+                http_meta[page['url']] = {**page['validators'], 'checked': checked}
+                grant_data['pages'].append({key: page[key] for key in ('url', 'title', 'kind')})
+                grant_data['grants'].extend(page['grants'])
+                grant_data['deadlines'].extend(page['deadlines'])
+                if page['kind'] == 'pdf':
+                    grant_data['sections'].extend(make_section(page['url'], [page['title']], text, page=page_no)
+                                                  for page_no, text in page['page_texts'] if text.strip())
+                else:
+                    grant_data['sections'].extend(page['sections'])
+        
+        # Save scraped data as a new corpus version
+        self.store.save(grant_data, meta={'http': http_meta, 'crawl_depth': self.crawl_depth})
+        
+        # Index the new version now, patching the previous index with only the changed sections
+        data = self.store.load()
+        if not self.store.has_index(data.manifest, INDEX_PARAMS):
+            self.load_search_index(data)
+        return data
+    
+    def parse_program_html(self, content: bytes, url: str) -> Dict:
+        """Extract title, main text, grant sections, deadline lines and absolute links from a page"""
+        soup = BeautifulSoup(content, 'html.parser')
+        heading = soup.find('h1') or soup.find('title')
+        page = {
+            'title': heading.get_text(strip=True) if heading else url,
+            'text': '',
+            'grants': [],
+            'deadlines': [],
+            'links': [],
+            'sections': []
+        }
+        
+        # Extract general program information
+        main_content = soup.find('main') or soup.find('div', class_='content')
+        if main_content:
+            # Extract paragraphs and lists
+            for elem in main_content.find_all(['p', 'ul', 'ol', 'h2', 'h3']):
+                page['text'] += elem.get_text(strip=True) + '\n'
+            for link in main_content.find_all('a', href=True):
+                page['links'].append(urljoin(url, link['href']))
+            page['sections'] = self._split_sections(main_content, page['title'], url)
+        
+        # Look for specific grant types
+        grant_sections = soup.find_all(['section', 'div'], class_=['grant', 'program'])
+        for section in grant_sections:
+            title = section.find(['h2', 'h3'])
+            grant_info = self._grant_from_paragraphs(title.get_text(strip=True) if title else '',
+                                                     section.find_all('p'), url)
+            if grant_info['title']:
+                page['grants'].append(grant_info)
+        
+        # A linked program page with no marked-up sections describes a single program
+        if not grant_sections and main_content and url != self.grant_url:
+            page['grants'].append(self._grant_from_paragraphs(page['title'], main_content.find_all('p'), url))
+        
+        page['deadlines'] = [
+            {'text': grant['deadline'], 'title': grant['title'], 'url': url}
+            for grant in page['grants'] if grant['deadline']
+        ]
+        return page
+    
+    @staticmethod
+    def _split_sections(main_content, title: str, url: str) -> List[Dict]:
+        """Group main-content text under its heading path (page title > h2 > h3 ...)"""
+        path = [title]
+        levels = [1]
+        texts: Dict[tuple, List[str]] = {}
+        for elem in main_content.find_all(['h1', 'h2', 'h3', 'h4', 'p', 'ul', 'ol']):
+            text = elem.get_text(strip=True)
+            if not text:
+                continue
+            if elem.name in ('h2', 'h3', 'h4'):
+                level = int(elem.name[1])
+                while len(levels) > 1 and levels[-1] >= level:
+                    levels.pop()
+                    path.pop()
+                levels.append(level)
+                path.append(text)
+            elif elem.name != 'h1':
+                texts.setdefault(tuple(path), []).append(text)
+        
+        sections = []
+        seen: Dict[str, int] = {}
+        for section_path, lines in texts.items():
+            section = make_section(url, list(section_path), '\n'.join(lines))
+            # Repeated heading paths on one page are told apart by position
+            seen[section['key']] = seen.get(section['key'], 0) + 1
+            if seen[section['key']] > 1:
+                section['key'] += f" ({seen[section['key']]})"
+            sections.append(section)
+        return sections
+    
+    @staticmethod
+    def _grant_from_paragraphs(title: str, paragraphs, url: str) -> Dict:
+        grant_info = {
+            'title': title,
+            'description': '',
+            'eligibility': '',
+            'deadline': '',
+            'url': url
+        }
+        
+        # Extract grant details
+        for p in paragraphs:
+            text = p.get_text(strip=True)
+            if 'eligib' in text.lower():
+                grant_info['eligibility'] += text + ' '
+            elif 'deadline' in text.lower() or 'due' in text.lower():
+                grant_info['deadline'] = text
+            else:
+                grant_info['description'] += text + ' '
+        return grant_info
+    
+    def _crawler(self) -> GrantCrawler:
+        return GrantCrawler(self, max_depth=self.crawl_depth, max_pages=self.crawl_max_pages)
+    
+    def crawl_linked_pages(self, landing: Dict) -> List[Dict]:
+        """Fetch program pages and PDFs linked from the parsed landing page"""
+        pages = self._crawler().crawl(self.grant_url, start_page=landing)
+        logger.info("Crawled %d linked pages from %s", len(pages), self.grant_url)
+        return pages
+    
+    def get_planning_session_content(self):
+        """Get the DCNR planning session transcript content"""
+        return """DCNR Community Conservation Partnerships Program - Planning Session Information
+
+Important Dates:
+- Grant applications accepted: January 21st, 2025 through April 2nd, 2025
+- Application deadline: April 2nd, 2025 at 4:00 PM
+
+Eligible Applicants:
+- Municipalities
+- Municipal authorities
+- Council of Governments
+- Conservation districts
+- School districts
+- Nonprofit 501c3 organizations
+
+Note: Municipal applicants are strongly encouraged because they are eligible for Keystone Fund. Nonprofits are only eligible for environmental stewardship funds, which is very limited.
+
+Planning Project Types:
+1. Master Site Development Plans
+   - Site-specific plan for development, rehabilitation, use, and management
+   - Focus on one site owned or controlled by applicant
+   - Typical grant award: $25,000 to $75,000
+
+2. Comprehensive Recreation, Park, Open Space & Greenway Plans
+   - Long-term development for park recreation systems
+   - Can be municipal, county, or regional scale
+   - Establishes priorities, actions, costs, and timeline
+
+3. Conservation Management/Stewardship Plans
+   - Analyzes conservation of natural areas and critical habitat
+   - Includes public access and passive recreation opportunities
+   - Requires collaboration with conservancy or land trust
+
+4. Swimming Pool Complex Feasibility Studies
+   - Structural assessment of existing features
+   - Market analysis and financial capability assessment
+   - Public engagement essential
+
+5. Indoor Recreation Facility Feasibility Studies
+   - For recreation centers, gymnasiums, indoor ice rinks
+   - Includes parking, accessibility, and site amenities
+   - Focus on one site only
+
+Grant Requirements:
+- Minimum of two quotes from qualified consultants required
+- Dollar-for-dollar match requirement
+- Detailed scope of work required (not lump sum)
+- Public participation required for all plans
+- For existing facilities: 25-year minimum lease or ownership
+
+Ready-to-Go Status Requirements:
+1. Clear and detailed scope of work uploaded
+2. Realistic, detailed budget (no lump sums)
+3. Funding commitment letter for match
+4. Site control documentation (for site-specific plans)
+
+Budget Categories:
+- Contracted professional services
+- Donated professional services
+- Other project costs (cash and non-cash)
+
+Scoring (100 points maximum):
+- Ready-to-go status
+- Criteria questions responses
+- Consistency with local/regional plans
+- Partnerships
+
+Key Tips:
+- Contact your bureau regional advisor early
+- Review frequently asked questions document
+- Involve qualified consultants early
+- Obtain detailed cost estimates
+- Reference help text in grant application
+- Visit apps.dcnr.pa.gov for resources
+
+REGIONAL ADVISORS:
+It's important to contact your regional advisor early in the grant planning process. They can provide guidance on your application and help ensure you meet all requirements."""
+    
+    def load_grant_data(self):
+        """Load saved grant data or scrape if needed"""
+        try:
+            data = self.store.load()
+            if data is None and os.path.exists(self.legacy_data_file):
+                self.store.import_pickle(self.legacy_data_file)
+                data = self.store.load()
+            if data is None and os.path.exists(self.seed_data_file):
+                self.store.import_seed(self.seed_data_file)
+                data = self.store.load()
+        except CorpusStoreError as e:
+            logger.warning("Stored grant data could not be read (%s); refreshing from the website", e)
+            data = None
+        
+        if data is None:
+            # Nothing to serve yet, so fetch inline (unless a recent failure is backing off)
+            return self.refresh() or self.fallback_grant_data()
+        
+        # Stale-while-revalidate: serve what we have, refresh in the background
+        self.refresh_if_stale(data)
+        return data
+    
+    def refresh_if_stale(self, grant_data) -> bool:
+        """Start a background refresh if grant_data is older than STALE_AFTER; True if one was started.
+        
+        A revalidation that found the page unchanged counts as fresh.
+        """
+        if not isinstance(grant_data, StoredGrantData):
+            return False
+        # Revalidations are recorded on the stored manifest, which may be newer than grant_data's copy
+        try:
+            manifest = self.store.read_manifest() or grant_data.manifest
+        except CorpusStoreError:
+            manifest = grant_data.manifest
+        last_update = datetime.fromisoformat(grant_data['last_updated'])
+        checked = manifest.get('meta', {}).get('http', {}).get(self.grant_url, {}).get('checked')
+        if checked:
+            last_update = max(last_update, datetime.fromisoformat(checked))
+        if datetime.now() - last_update > STALE_AFTER:
+            return self.refresh_in_background()
+        return False
+    
+    def refresh(self, force: bool = False):
+        """Scrape now and return the new grant data.
+        
+        Returns None without scraping if another refresh is already running, or
+        if a recent failure is still backing off (ignored when force is set).
+        Failures are logged and start or extend the backoff.
+        """
+        if not self.refresh_state.try_begin(force=force):
+            return None
+        try:
+            data = self._scrape()
+        except Exception as e:
+            logger.exception("Error refreshing grant data: %s", e)
+            self.refresh_state.finish(error=str(e))
+            return None
+        self.refresh_state.finish()
+        return data
+    
+    def refresh_in_background(self) -> bool:
+        """Start a refresh on a daemon thread if none is running; True if one was started"""
+        if not self.refresh_state.try_begin():
+            return False
+        
+        def run():
+            try:
+                self._scrape()
+            except Exception as e:
+                logger.exception("Background grant data refresh failed: %s", e)
+                self.refresh_state.finish(error=str(e))
+            else:
+                self.refresh_state.finish()
+        
+        threading.Thread(target=run, name="grant-data-refresh", daemon=True).start()
+        return True
+    
+    def is_outdated(self, grant_data) -> bool:
+        """True when the store holds a newer corpus version than grant_data"""
+        try:
+            manifest = self.store.read_manifest()
+        except CorpusStoreError:
+            return False
+        if manifest is None:
+            return False
+        if not isinstance(grant_data, StoredGrantData):
+            return True
+        return manifest['version'] != grant_data.version
+    
+    def load_search_index(self, grant_data) -> CorpusIndex:
+        """Search index over the public corpus, reusing the index saved with the stored version.
+        
+        Without one, the newest earlier version that has a saved index is patched
+        with the sections that changed since, and the result is saved.
+        """
+        if not isinstance(grant_data, StoredGrantData):
+            return build_search_index({}, grant_data)
+        
+        try:
+            stored = self.store.load_index(grant_data.manifest, INDEX_PARAMS)
+        except CorpusStoreError:
+            stored = None
+        if stored:
+            return CorpusIndex.from_arrays(*stored)
+        
+        index = self._patch_previous_index(grant_data)
+        if index is None:
+            index = build_search_index({}, grant_data)
+        manifest = self.store.save_index(grant_data.manifest, *index.dense.export(), INDEX_PARAMS)
+        if manifest:
+            grant_data.manifest = manifest
+        return index
+    
+    def _patch_previous_index(self, grant_data: StoredGrantData) -> Optional[CorpusIndex]:
+        for manifest in self.store.read_history():
+            if manifest['version'] >= grant_data.version or not self.store.has_index(manifest, INDEX_PARAMS):
+                continue
+            try:
+                index = CorpusIndex.from_arrays(*self.store.load_index(manifest, INDEX_PARAMS))
+                diff = patch_search_index(index, StoredGrantData(self.store, manifest), grant_data)
+            except CorpusStoreError as e:
+                logger.info("Could not patch the index of version %s: %s", manifest['version'], e)
+                return None
+            logger.info("Patched search index from version %s to %s: %s",
+                        manifest['version'], grant_data.version, diff.summary())
+            return index
+        return None
+    
+    def check_eligibility(self, user_info: Dict, grant_type: str = None) -> Dict:
+        """Check eligibility based on user information"""
+        eligibility_results = self.eligibility.check(user_info, grant_type)
+        eligibility_results['regional_advisor'] = None
+        
+        # Check for regional advisor if county provided
+        if 'county' in user_info:
+            advisor_info = get_regional_advisor(user_info['county'])
+            if advisor_info:
+                eligibility_results['regional_advisor'] = advisor_info
+        
+        return eligibility_results
+    
+    def check_eligibility_batch(self, applicants: Sequence[Dict]):
+        """Eligibility matrix (applicants x programs) and the program names of its columns"""
+        rules = self.eligibility.rules
+        return rules.evaluate_batch(applicants), [program.name for program in rules.programs]
+    
+    def evaluate_grant_application(self, application_info: Dict) -> Dict:
+        """Evaluate grant application and provide approval chances"""
+        score = 0
+        max_score = 100
+        feedback = []
+        strengths = []
+        weaknesses = []
+        
+        # Entity Type Score (20 points)
+        entity_type = application_info.get('entity_type', '').lower()
+        if 'municipality' in entity_type or 'county' in entity_type:
+            score += 20
+            strengths.append("✅ Municipal/County applicants have access to Keystone Fund")
+        elif 'council of governments' in entity_type:
+            score += 18
+            strengths.append("✅ Council of Governments is a strong eligible applicant")
+        elif 'school' in entity_type:
+            score += 15
+            strengths.append("✅ School districts are eligible applicants")
+        elif 'nonprofit' in entity_type or '501c3' in entity_type:
+            score += 10
+            weaknesses.append("⚠️ Nonprofits limited to environmental stewardship funds only")
+        else:
+            score += 5
+            weaknesses.append("❌ Entity type may need partnership with eligible organization")
+        
+        # Community Impact Score (20 points)
+        footfall = application_info.get('footfall', 0)
+        population_served = application_info.get('population_served', 0)
+        
+        if footfall > 0 or population_served > 0:
+            impact_number = max(footfall, population_served)
+            if impact_number >= 5000:
+                score += 20
+                strengths.append(f"✅ Strong community impact: {impact_number:,} people served")
+            elif impact_number >= 1000:
+                score += 15
+                strengths.append(f"✅ Good community impact: {impact_number:,} people served")
+            elif impact_number >= 100:
+                score += 10
+                feedback.append(f"📊 Moderate community impact: {impact_number:,} people served")
+            else:
+                score += 5
+                weaknesses.append(f"❌ Low community impact: only {impact_number} people served")
+                feedback.append("💡 Consider partnerships to increase community reach")
+        
+        # Matching Funds Score (20 points)
+        has_matching_funds = application_info.get('has_matching_funds', False)
+        match_percentage = application_info.get('match_percentage', 0)
+        
+        if has_matching_funds:
+            if match_percentage >= 100:
+                score += 20
+                strengths.append("✅ Full dollar-for-dollar match secured")
+            elif match_percentage >= 50:
+                score += 15
+                strengths.append(f"✅ {match_percentage}% match identified")
+            else:
+                score += 10
+                weaknesses.append("⚠️ Partial match may need to be increased")
+        else:
+            weaknesses.append("❌ No matching funds identified - this is required!")
+        
+        # Project Readiness Score (20 points)
+        has_scope = application_info.get('has_detailed_scope', False)
+        has_quotes = application_info.get('has_consultant_quotes', False)
+        has_site_control = application_info.get('has_site_control', False)
+        
+        readiness_score = 0
+        if has_scope:
+            readiness_score += 7
+            strengths.append("✅ Detailed scope of work prepared")
+        else:
+            weaknesses.append("❌ Need detailed scope of work")
+            
+        if has_quotes:
+            readiness_score += 7
+            strengths.append("✅ Consultant quotes obtained")
+        else:
+            weaknesses.append("❌ Need minimum 2 consultant quotes")
+            
+        if has_site_control:
+            readiness_score += 6
+            strengths.append("✅ Site control documented")
+        elif application_info.get('project_type', '').lower() in ['master site', 'feasibility']:
+            weaknesses.append("❌ Site control required for this project type")
+            
+        score += readiness_score
+        
+        # Public Support Score (10 points)
+        has_public_support = application_info.get('has_public_support', False)
+        has_partnerships = application_info.get('has_partnerships', False)
+        
+        if has_public_support:
+            score += 5
+            strengths.append("✅ Public support demonstrated")
+        else:
+            feedback.append("💡 Consider conducting public meetings or surveys")
+            
+        if has_partnerships:
+            score += 5
+            strengths.append("✅ Strong partnerships in place")
+        else:
+            feedback.append("💡 Consider partnering with other organizations")
+        
+        # Planning Priorities Score (10 points)
+        addresses_equity = application_info.get('addresses_equity', False)
+        rehabilitation_project = application_info.get('rehabilitation_project', False)
+        
+        if addresses_equity:
+            score += 5
+            strengths.append("✅ Addresses recreation for all/equity")
+        if rehabilitation_project:
+            score += 5
+            strengths.append("✅ Focuses on rehabilitation of existing facilities")
+        
+        # Calculate approval chances
+        if score >= 80:
+            approval_chance = "Excellent (80-95%)"
+            overall_feedback = "Your application appears very strong! Make sure all documentation is complete."
+        elif score >= 65:
+            approval_chance = "Good (60-80%)"
+            overall_feedback = "Your application has good potential. Address the weaknesses to improve chances."
+        elif score >= 50:
+            approval_chance = "Moderate (40-60%)"
+            overall_feedback = "Your application needs improvement. Focus on addressing major weaknesses."
+        elif score >= 35:
+            approval_chance = "Low (20-40%)"
+            overall_feedback = "Significant improvements needed. Consider partnering or waiting until better prepared."
+        else:
+            approval_chance = "Very Low (<20%)"
+            overall_feedback = "Major issues need to be addressed. Consider seeking technical assistance."
+        
+        # Add regional advisor recommendation if county provided
+        if 'county' in application_info:
+            advisor_info = get_regional_advisor(application_info['county'])
+            if advisor_info:
+                feedback.append(f"💡 Contact your regional advisor {advisor_info['advisor_name']} at {advisor_info['phone']} for guidance")
+        
+        return {
+            'score': score,
+            'max_score': max_score,
+            'approval_chance': approval_chance,
+            'strengths': strengths,
+            'weaknesses': weaknesses,
+            'feedback': feedback,
+            'overall_feedback': overall_feedback
+        }
+    
+    def evaluate_grant_applications(self, applications: Union[ApplicationTable, Sequence[Dict]]) -> BatchScores:
+        """Vectorized evaluate_grant_application over a table or list of applications"""
+        if not isinstance(applications, ApplicationTable):
+            applications = ApplicationTable.from_records(applications)
+        return score_applications(applications)
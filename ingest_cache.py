@@ -0,0 +1,288 @@
+"""Content-addressed cache of extracted, chunked and embedded uploads.
+
+Entries are keyed by the SHA-256 of the file bytes together with every
+parameter that affects the result, so re-processing an unchanged file, or the
+same file uploaded in another session, is a lookup. Entries are independent
+of the file name; chunk ids and labels are applied when an entry is used.
+The directory is bounded: each write drops entries unused for max_age_seconds,
+then the least recently used ones until it fits in max_disk_bytes. Sizes and
+last use are read from disk once per process and tracked in memory after that,
+so entries other processes write are only counted after a restart.
+
+Layout::
+
+    ingest_cache/<params digest>/<sha256>.json   page texts, chunk spans, features
+    ingest_cache/<params digest>/<sha256>.npy    dense vectors, one row per chunk
+"""
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from chunking import Chunk, chunk_text, make_chunk_id
+from corpus_store import atomic_write
+from dense_index import HashedEmbedder
+from pdf_extract import DEFAULT_MAX_BYTES, DEFAULT_MAX_PAGES, PDFDocument
+from retrieval import INDEX_PARAMS
+
+logger = logging.getLogger(__name__)
+
+# Bump when extraction or chunking changes in a way the parameters below do not capture
+INGEST_VERSION = 1
+# Latin-1 accepts every byte, so it is the fallback rather than a candidate; trying it before
+# cp1252 would turn Windows smart quotes and dashes into control characters
+TEXT_ENCODINGS = ('utf-8', 'cp1252')
+
+
+def decode_text(data: bytes) -> str:
+    for encoding in TEXT_ENCODINGS:
+        try:
+            return data.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    return data.decode('latin-1')
+
+
+class IngestedFile:
+    """Extracted pages, chunk spans and chunk vectors of one file, shared by every session using it"""
+
+    def __init__(self, sha256: str, pages: List[Tuple[Optional[int], str]], spans: List[Tuple[int, int, int]],
+                 vectors: np.ndarray, features: List[List[str]], total_pages: int):
+        self.sha256 = sha256
+        self.pages = pages
+        self.spans = spans
+        self.vectors = vectors
+        self.features = features
+        self.total_pages = total_pages
+        self.texts = [pages[index][1][start:end] for index, start, end in spans]
+        self.text = "\n".join(text for _, text in pages)
+
+    @property
+    def truncated(self) -> bool:
+        return self.total_pages > len(self.pages)
+
+    def chunks(self, doc_key: str, source: str) -> List[Chunk]:
+        """Chunks labelled for one upload, in the same order as vectors and features"""
+        chunks = []
+        for (index, start, end), text in zip(self.spans, self.texts):
+            page = self.pages[index][0]
+            chunks.append(Chunk(make_chunk_id(doc_key, page, start), doc_key, source, text, page, start, end))
+        return chunks
+
+    def to_files(self) -> Tuple[bytes, bytes]:
+        table = json.dumps({
+            'sha256': self.sha256,
+            'pages': self.pages,
+            'spans': self.spans,
+            'features': self.features,
+            'total_pages': self.total_pages,
+        }).encode('utf-8')
+        buffer = io.BytesIO()
+        np.save(buffer, np.ascontiguousarray(self.vectors, dtype=np.float32))
+        return table, buffer.getvalue()
+
+    @classmethod
+    def from_files(cls, table: bytes, matrix: np.ndarray) -> "IngestedFile":
+        data = json.loads(table.decode('utf-8'))
+        return cls(data['sha256'], [tuple(page) for page in data['pages']],
+                   [tuple(span) for span in data['spans']], matrix, data['features'], data['total_pages'])
+
+
+class IngestionCache:
+    """In-memory LRU over an on-disk store of IngestedFile entries"""
+
+    def __init__(self, root: str, max_memory_entries: int = 64,
+                 pdf_max_pages: int = DEFAULT_MAX_PAGES, pdf_max_bytes: int = DEFAULT_MAX_BYTES,
+                 embedder: Optional[HashedEmbedder] = None, max_disk_bytes: int = 1024 ** 3,
+                 max_age_seconds: float = 30 * 24 * 3600):
+        self.pdf_max_pages = pdf_max_pages
+        self.pdf_max_bytes = pdf_max_bytes
+        self.embedder = embedder or HashedEmbedder(INDEX_PARAMS['dim'])
+        params = dict(INDEX_PARAMS, pdf_max_pages=pdf_max_pages, pdf_max_bytes=pdf_max_bytes,
+                      version=INGEST_VERSION)
+        params_digest = hashlib.sha256(json.dumps(params, sort_keys=True).encode('utf-8')).hexdigest()
+        # Entries under other parameter digests are never read again but count towards the disk cap
+        self.base = root
+        self.root = os.path.join(root, params_digest[:16])
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.max_age_seconds = max_age_seconds
+        self.hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, IngestedFile]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Entries on disk in least recently used order: (directory, sha256) -> (last use, bytes)
+        self._disk: "OrderedDict[Tuple[str, str], Tuple[float, int]]" = OrderedDict()
+        self._disk_bytes = 0
+        self._scan_disk()
+
+    def _paths(self, sha256: str) -> Tuple[str, str]:
+        base = os.path.join(self.root, sha256)
+        return base + '.json', base + '.npy'
+
+    def _remember(self, entry: IngestedFile):
+        with self._lock:
+            self._memory[entry.sha256] = entry
+            self._memory.move_to_end(entry.sha256)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+
+    def _scan_disk(self):
+        """Size and last use of every entry on disk, read once; later changes are tracked in memory"""
+        entries = {}
+        for directory, _, names in os.walk(self.base):
+            for name in names:
+                base, extension = os.path.splitext(name)
+                if extension not in ('.json', '.npy'):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(directory, name))
+                except FileNotFoundError:
+                    continue
+                used, size = entries.get((directory, base), (0.0, 0))
+                used = stat.st_mtime if extension == '.json' else used
+                entries[(directory, base)] = (used, size + stat.st_size)
+        self._disk = OrderedDict(sorted(entries.items(), key=lambda item: item[1][0]))
+        self._disk_bytes = sum(size for _, size in entries.values())
+
+    def _touch(self, sha256: str):
+        """Mark an entry as just used; call with the lock held"""
+        key = (self.root, sha256)
+        if key in self._disk:
+            self._disk[key] = (time.time(), self._disk[key][1])
+            self._disk.move_to_end(key)
+
+    def get(self, sha256: str) -> Optional[IngestedFile]:
+        table_path, matrix_path = self._paths(sha256)
+        with self._lock:
+            entry = self._memory.get(sha256)
+            if entry is not None:
+                self._memory.move_to_end(sha256)
+                self._touch(sha256)
+                self.hits += 1
+        if entry is not None:
+            self._mark_used(table_path)
+            return entry
+
+        try:
+            with open(table_path, 'rb') as f:
+                table = f.read()
+            entry = IngestedFile.from_files(table, np.load(matrix_path, mmap_mode='r'))
+        except (FileNotFoundError, ValueError) as e:
+            if not isinstance(e, FileNotFoundError):
+                logger.warning("Ignoring unreadable ingestion cache entry %s: %s", sha256, e)
+            with self._lock:
+                self.misses += 1
+            return None
+        self._mark_used(table_path)
+        with self._lock:
+            self._touch(sha256)
+            self.hits += 1
+        self._remember(entry)
+        return entry
+
+    @staticmethod
+    def _mark_used(table_path: str):
+        # The table's mtime carries the last use across restarts
+        try:
+            os.utime(table_path)
+        except FileNotFoundError:
+            pass
+
+    def put(self, entry: IngestedFile):
+        table, matrix = entry.to_files()
+        os.makedirs(self.root, exist_ok=True)
+        table_path, matrix_path = self._paths(entry.sha256)
+        # The table is written last: its presence marks a complete entry
+        atomic_write(matrix_path, matrix)
+        atomic_write(table_path, table)
+        self._remember(entry)
+        with self._lock:
+            _, previous = self._disk.pop((self.root, entry.sha256), (0.0, 0))
+            self._disk[(self.root, entry.sha256)] = (time.time(), len(table) + len(matrix))
+            self._disk_bytes += len(table) + len(matrix) - previous
+        self._evict_disk()
+
+    def _evict_disk(self):
+        """Drop entries unused for max_age_seconds, then the least recently used beyond max_disk_bytes"""
+        oldest = time.time() - self.max_age_seconds
+        evicted = []
+        with self._lock:
+            while self._disk:
+                (directory, base), (used, size) = next(iter(self._disk.items()))
+                if used >= oldest and self._disk_bytes <= self.max_disk_bytes:
+                    break
+                del self._disk[(directory, base)]
+                self._disk_bytes -= size
+                if directory == self.root:
+                    self._memory.pop(base, None)
+                evicted.append((directory, base))
+        for directory, base in evicted:
+            # Table first, so a concurrent reader never finds it without its vectors
+            for extension in ('.json', '.npy'):
+                try:
+                    os.remove(os.path.join(directory, base + extension))
+                except FileNotFoundError:
+                    pass
+
+    def lookup(self, data: bytes) -> Optional[IngestedFile]:
+        return self.get(hashlib.sha256(data).hexdigest())
+
+    def open_pdf(self, data: bytes) -> PDFDocument:
+        return PDFDocument(data, max_pages=self.pdf_max_pages, max_bytes=self.pdf_max_bytes)
+
+    def ingest(self, data: bytes, is_pdf: bool, on_page: Optional[Callable[[int, int], None]] = None,
+               document: Optional[PDFDocument] = None) -> IngestedFile:
+        """Cached entry for the file bytes, extracting, chunking and embedding them on a miss.
+
+        on_page(done, total) is called as PDF pages are extracted; document may
+        pass in a PDF already opened with open_pdf. Raises PDFLimitError or
+        PyPDF2 errors for PDFs that cannot be read.
+        """
+        sha256 = hashlib.sha256(data).hexdigest()
+        entry = self.get(sha256)
+        if entry is not None:
+            return entry
+
+        pages, spans, vectors, features = [], [], [], []
+
+        def add_page(page_no: Optional[int], text: str):
+            index = len(pages)
+            pages.append((page_no, text))
+            for chunk in chunk_text(text, "", "", page=page_no,
+                                    max_tokens=INDEX_PARAMS['chunk_tokens'],
+                                    overlap=INDEX_PARAMS['chunk_overlap']):
+                counts = self.embedder.feature_counts(chunk.text)
+                spans.append((index, chunk.start, chunk.end))
+                vectors.append(self.embedder.vectorize(counts))
+                features.append(list(counts))
+
+        if is_pdf:
+            document = document or self.open_pdf(data)
+            total_pages = document.total_pages
+            # Each page is chunked and embedded as it arrives, while the workers extract later ones
+            for page_no, text in document.pages():
+                add_page(page_no, text)
+                if on_page:
+                    on_page(len(pages), document.page_count)
+        else:
+            total_pages = 1
+            add_page(None, decode_text(data))
+        matrix = np.vstack(vectors) if vectors else np.zeros((0, self.embedder.dim), dtype=np.float32)
+
+        entry = IngestedFile(sha256, pages, spans, matrix, features, total_pages)
+        self.put(entry)
+        return entry
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "memory_entries": len(self._memory),
+                    "max_memory_entries": self.max_memory_entries, "disk_bytes": self._disk_bytes,
+                    "max_disk_bytes": self.max_disk_bytes}
@@ -0,0 +1,253 @@
+"""Shared chat-completion client with pooled connections, retries and a circuit breaker."""
+import email.utils
+import os
+import random
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+import httpx
+from openai import APIConnectionError, APIStatusError, OpenAI
+
+from metrics import inc
+
+RETRYABLE_STATUS = frozenset([408, 409, 429, 500, 502, 503, 504])
+
+
+class LLMUnavailableError(Exception):
+    """The provider is degraded: the circuit is open or retries were exhausted"""
+
+
+def parse_retry_after(headers) -> Optional[float]:
+    """Seconds to wait from Retry-After (seconds or HTTP date) or retry-after-ms headers"""
+    if headers is None:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return max(0.0, float(value) / 1000)
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        parsed = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, parsed.timestamp() - time.time())
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures and lets a single probe through after reset_timeout"""
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if self.clock() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._probing or self.failures >= self.failure_threshold:
+                self.opened_at = self.clock()
+            self._probing = False
+
+
+class RateLimiter:
+    """Token bucket shared by threads: at most rate requests per second, bursting up to burst"""
+
+    def __init__(self, rate: float, burst: Optional[int] = None,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self.clock = clock
+        self.sleep = sleep
+        self._tokens = float(self.burst)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Take a token, returning how long to wait before using it"""
+        with self._lock:
+            now = self.clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def acquire(self):
+        wait = self._reserve()
+        if wait > 0:
+            self.sleep(wait)
+
+
+class BreakerStream:
+    """Iterates a streamed completion, recording a failure on the breaker if the stream breaks"""
+
+    def __init__(self, stream, breaker: CircuitBreaker):
+        self.stream = stream
+        self.breaker = breaker
+
+    def __iter__(self):
+        try:
+            yield from self.stream
+        except GeneratorExit:
+            # The caller stopped reading; the provider did nothing wrong
+            raise
+        except BaseException:
+            self.breaker.record_failure()
+            inc("dcnr_llm_requests_total", outcome="stream_error")
+            raise
+
+    def close(self):
+        self.stream.close()
+
+
+class ResilientLLMClient:
+    """OpenAI chat client over one pooled HTTP transport.
+
+    Retries 429/5xx responses, timeouts and connection errors with jittered
+    exponential backoff, honouring Retry-After. Repeated failures open the
+    circuit breaker, after which calls fail fast with LLMUnavailableError so
+    callers can fall back to search-only answers.
+    """
+
+    def __init__(self, api_key: str, base_url: Optional[str] = None,
+                 connect_timeout: float = 5.0, read_timeout: float = 60.0,
+                 max_connections: int = 20, max_retries: int = 3,
+                 backoff_base: float = 0.5, backoff_max: float = 8.0,
+                 max_retry_after: float = 30.0, breaker: Optional[CircuitBreaker] = None,
+                 rate_limiter: Optional[RateLimiter] = None,
+                 sleep: Callable[[float], None] = time.sleep):
+        timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.http_client = httpx.Client(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections,
+                                max_keepalive_connections=max_connections)
+        )
+        # Retries are handled here, so the SDK's own retry loop is disabled
+        self.openai = OpenAI(api_key=api_key, base_url=base_url, timeout=timeout,
+                             max_retries=0, http_client=self.http_client)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_retry_after = max_retry_after
+        self.breaker = breaker or CircuitBreaker()
+        # Every attempt, retries included, spends a token
+        self.rate_limiter = rate_limiter
+        self.sleep = sleep
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_retry_after))
+        return delay
+
+    def create_chat_completion(self, **kwargs):
+        """chat.completions.create with retries; with stream=True, retries cover the response headers only"""
+        if not self.breaker.allow():
+            inc("dcnr_llm_requests_total", outcome="circuit_open")
+            raise LLMUnavailableError("LLM provider circuit is open")
+
+        try:
+            response = self._create_with_retries(kwargs)
+        except (LLMUnavailableError, APIStatusError):
+            raise  # Already recorded on the breaker
+        except BaseException:
+            # Anything else must still settle the breaker, or a half-open probe would never finish
+            self.breaker.record_failure()
+            inc("dcnr_llm_requests_total", outcome="error")
+            raise
+        if kwargs.get("stream"):
+            return BreakerStream(response, self.breaker)
+        return response
+
+    def _create_with_retries(self, kwargs):
+        last_error: Optional[Exception] = None
+        for attempt in range(self.max_retries + 1):
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            try:
+                response = self.openai.chat.completions.create(**kwargs)
+            except APIStatusError as e:
+                if e.status_code not in RETRYABLE_STATUS:
+                    # The request itself is wrong; the provider is healthy
+                    self.breaker.record_success()
+                    inc("dcnr_llm_requests_total", outcome=f"status_{e.status_code}")
+                    raise
+                last_error = e
+                retry_after = parse_retry_after(e.response.headers)
+            except APIConnectionError as e:  # includes timeouts
+                last_error = e
+                retry_after = None
+            else:
+                self.breaker.record_success()
+                inc("dcnr_llm_requests_total", outcome="ok")
+                return response
+
+            if attempt < self.max_retries:
+                inc("dcnr_llm_retries_total", error=type(last_error).__name__)
+                self.sleep(self._backoff(attempt, retry_after))
+
+        self.breaker.record_failure()
+        inc("dcnr_llm_requests_total", outcome="unavailable")
+        raise LLMUnavailableError(f"LLM request failed after {self.max_retries + 1} attempts: {last_error}") from last_error
+
+    def close(self):
+        self.http_client.close()
+
+
+_shared_clients: Dict[Tuple[str, Optional[str]], ResilientLLMClient] = {}
+_shared_lock = threading.Lock()
+
+
+def get_shared_client(api_key: str, base_url: Optional[str] = None) -> ResilientLLMClient:
+    """Process-wide client per (api_key, base_url), so every session with the same key reuses one connection pool"""
+    base_url = base_url or os.environ.get("OPENAI_BASE_URL") or None
+    with _shared_lock:
+        client = _shared_clients.get((api_key, base_url))
+        if client is None:
+            client = _shared_clients[(api_key, base_url)] = ResilientLLMClient(
+                api_key,
+                base_url=base_url,
+                connect_timeout=float(os.environ.get("DCNR_LLM_CONNECT_TIMEOUT", 5)),
+                read_timeout=float(os.environ.get("DCNR_LLM_READ_TIMEOUT", 60)),
+                max_retries=int(os.environ.get("DCNR_LLM_MAX_RETRIES", 3))
+            )
+        return client
@@ -0,0 +1,233 @@
+"""In-process timing spans, counters and histograms with Prometheus and JSON-lines export.
+
+Spans nest through a context variable, so a span opened inside another is
+recorded under the path "outer/inner", e.g. "answer/search/county_match".
+Each finished span adds its duration to the dcnr_stage_seconds histogram and,
+when it ends with an exception, to dcnr_errors_total by exception class. Set
+DCNR_TRACE_JSONL to also log every span as one JSON line.
+
+With DCNR_METRICS=0 every call returns after one attribute check and span()
+hands back a shared no-op object, so instrumentation can stay in hot paths.
+"""
+import bisect
+import contextvars
+import json
+import os
+import threading
+import time
+from typing import Dict, IO, Iterable, List, Optional, Tuple
+
+# Seconds; covers sub-millisecond lookups up to slow LLM round-trips
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+STAGE_HISTOGRAM = "dcnr_stage_seconds"
+ERROR_COUNTER = "dcnr_errors_total"
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("dcnr_current_span", default=None)
+
+
+def _label_key(labels: Dict) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(key: LabelKey, extra: Iterable[Tuple[str, str]] = ()) -> str:
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "count", "sum")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        # One slot per bucket plus +Inf; cumulated on export
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        total = 0
+        out = []
+        for bound, count in zip(list(self.buckets) + [float("inf")], self.counts):
+            total += count
+            out.append(("+Inf" if bound == float("inf") else repr(bound), total))
+        return out
+
+
+class Span:
+    """A timed stage; use via span(), not directly"""
+    __slots__ = ("registry", "name", "path", "attrs", "start", "_parent", "_token")
+
+    def __init__(self, registry: "Metrics", name: str, attrs: Dict):
+        self.registry = registry
+        self.name = name
+        self.attrs = attrs
+
+    def set(self, **attrs):
+        """Attach attributes (e.g. result counts) to the span's trace line"""
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self._parent = _current_span.get()
+        self.path = f"{self._parent.path}/{self.name}" if self._parent is not None else self.name
+        self._token = _current_span.set(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        try:
+            _current_span.reset(self._token)
+        except ValueError:
+            # Exited from another context (e.g. a generator finished elsewhere)
+            _current_span.set(self._parent)
+        error = exc_type.__name__ if exc_type is not None and issubclass(exc_type, Exception) else None
+        self.registry._finish_span(self, duration, error)
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+    path = ""
+
+    def set(self, **attrs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Metrics:
+    """Thread-safe registry of counters and histograms keyed by name and labels"""
+
+    def __init__(self, enabled: bool = True, trace_path: Optional[str] = None,
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.enabled = enabled
+        self.buckets = buckets
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self._lock = threading.Lock()
+        self._trace: Optional[IO] = open(trace_path, "a", encoding="utf-8") if trace_path else None
+
+    def span(self, name: str, **attrs):
+        if not self.enabled:
+            return NOOP_SPAN
+        return Span(self, name, attrs)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        if not self.enabled:
+            return
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        if not self.enabled:
+            return
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def _finish_span(self, span: Span, duration: float, error: Optional[str]):
+        self.observe(STAGE_HISTOGRAM, duration, stage=span.path)
+        if error:
+            self.inc(ERROR_COUNTER, stage=span.path, error=error)
+        if self._trace is not None:
+            line = json.dumps({"ts": time.time(), "span": span.path, "duration_ms": round(duration * 1000, 3),
+                               "error": error, **span.attrs}, default=str)
+            with self._lock:
+                self._trace.write(line + "\n")
+                self._trace.flush()
+
+    def counter_value(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._counters.get(name, {}).get(_label_key(labels), 0)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        with self._lock:
+            for name in sorted(self._counters):
+                lines.append(f"# TYPE {name} counter")
+                for key, value in sorted(self._counters[name].items()):
+                    lines.append(f"{name}{_format_labels(key)} {value:g}")
+            for name in sorted(self._histograms):
+                lines.append(f"# TYPE {name} histogram")
+                for key, histogram in sorted(self._histograms[name].items()):
+                    for bound, count in histogram.cumulative():
+                        lines.append(f"{name}_bucket{_format_labels(key, [('le', bound)])} {count}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {histogram.sum:.9g}")
+                    lines.append(f"{name}_count{_format_labels(key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> List[Dict]:
+        """Every series as a JSON-serialisable dict"""
+        now = time.time()
+        records = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                for key, value in sorted(series.items()):
+                    records.append({"ts": now, "type": "counter", "name": name, "labels": dict(key),
+                                    "value": value})
+            for name, series in sorted(self._histograms.items()):
+                for key, histogram in sorted(series.items()):
+                    records.append({"ts": now, "type": "histogram", "name": name, "labels": dict(key),
+                                    "count": histogram.count, "sum": histogram.sum,
+                                    "buckets": dict(histogram.cumulative())})
+        return records
+
+    def render_jsonl(self) -> str:
+        return "".join(json.dumps(record) + "\n" for record in self.snapshot())
+
+
+def _env_enabled() -> bool:
+    return os.environ.get("DCNR_METRICS", "1").strip().lower() not in ("0", "false", "no", "off")
+
+
+# Process-wide registry used by the module-level helpers
+METRICS = Metrics(enabled=_env_enabled(), trace_path=os.environ.get("DCNR_TRACE_JSONL") or None)
+
+
+def span(name: str, **attrs):
+    """Time a stage: with span("search"): ..."""
+    if not METRICS.enabled:
+        return NOOP_SPAN
+    return Span(METRICS, name, attrs)
+
+
+def inc(name: str, value: float = 1, **labels):
+    if METRICS.enabled:
+        METRICS.inc(name, value, **labels)
+
+
+def observe(name: str, value: float, **labels):
+    if METRICS.enabled:
+        METRICS.observe(name, value, **labels)
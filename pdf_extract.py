@@ -0,0 +1,88 @@
+"""Page-streaming PDF text extraction, fanned out to worker processes for large files."""
+import io
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+
+import PyPDF2
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_PAGES = 500
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+# Below this many pages, starting worker processes costs more than it saves
+PARALLEL_MIN_PAGES = 24
+PAGES_PER_TASK = 8
+
+
+class PDFLimitError(Exception):
+    """The file is larger than the configured byte limit"""
+
+
+def _pool_context():
+    # Forking a threaded server (Streamlit, the API pool) can copy held locks into the child
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+_worker_reader: Optional[PyPDF2.PdfReader] = None
+
+
+def _init_worker(data: bytes):
+    # Each worker parses the document once; tasks then only carry page ranges
+    global _worker_reader
+    _worker_reader = PyPDF2.PdfReader(io.BytesIO(data))
+
+
+def _extract_range(start: int, stop: int) -> List[Tuple[int, str]]:
+    return [(page_no + 1, _worker_reader.pages[page_no].extract_text() or "")
+            for page_no in range(start, stop)]
+
+
+class PDFDocument:
+    """A PDF held in memory, checked against per-file limits when opened.
+
+    Pages beyond max_pages are not extracted; `truncated` tells callers so.
+    """
+
+    def __init__(self, data: bytes, max_pages: int = DEFAULT_MAX_PAGES,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        if len(data) > max_bytes:
+            raise PDFLimitError(f"PDF is {len(data):,} bytes; the limit is {max_bytes:,}")
+        self.data = data
+        self.reader = PyPDF2.PdfReader(io.BytesIO(data))
+        self.total_pages = len(self.reader.pages)
+        self.page_count = min(self.total_pages, max_pages)
+        self.truncated = self.total_pages > self.page_count
+        if self.truncated:
+            logger.info("Extracting the first %d of %d PDF pages", self.page_count, self.total_pages)
+
+    def pages(self, workers: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+        """Yield (1-based page number, text) in page order as pages are extracted"""
+        workers = workers or os.cpu_count() or 1
+        if workers < 2 or self.page_count < PARALLEL_MIN_PAGES:
+            for page_no in range(self.page_count):
+                yield page_no + 1, self.reader.pages[page_no].extract_text() or ""
+            return
+
+        with ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context(),
+                                 initializer=_init_worker, initargs=(self.data,)) as pool:
+            futures = [pool.submit(_extract_range, start, min(start + PAGES_PER_TASK, self.page_count))
+                       for start in range(0, self.page_count, PAGES_PER_TASK)]
+            try:
+                for future in futures:
+                    yield from future.result()
+            finally:
+                for future in futures:
+                    future.cancel()
+
+    def text(self, workers: Optional[int] = None) -> str:
+        return "\n".join(text for _, text in self.pages(workers))
+
+
+def iter_pdf_pages(data: bytes, max_pages: int = DEFAULT_MAX_PAGES, max_bytes: int = DEFAULT_MAX_BYTES,
+                   workers: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+    """Stream (page number, text) pairs from PDF bytes"""
+    return PDFDocument(data, max_pages=max_pages, max_bytes=max_bytes).pages(workers)
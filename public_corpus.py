@@ -0,0 +1,85 @@
+"""Process-wide, read-only public corpus and search index shared by every session."""
+import itertools
+import logging
+import threading
+import time
+from collections.abc import Mapping
+from dataclasses import dataclass
+from typing import Optional
+
+from grant_rag import GrantRAGSystem
+from regional_advisors import COUNTY_INDEX, CountyIndex
+from retrieval import CorpusIndex
+
+logger = logging.getLogger(__name__)
+
+# How often readers look for a newer stored corpus version
+CHECK_INTERVAL = 5.0
+
+
+@dataclass(frozen=True)
+class CorpusSnapshot:
+    """One immutable corpus version: grant data, its search index and the county lookup.
+
+    generation increases with every swap and identifies the snapshot in cache keys.
+    """
+    generation: int
+    grant_data: Mapping
+    index: CorpusIndex
+    county_index: CountyIndex
+
+
+class PublicCorpus:
+    """Holds the current CorpusSnapshot and hot-swaps it when the store publishes a new version.
+
+    Readers never block and never see a half-built index: a new snapshot is
+    built completely and then published with a single reference assignment.
+    Only one thread builds at a time; the others keep reading the old one.
+    """
+
+    def __init__(self, rag_system: GrantRAGSystem, check_interval: float = CHECK_INTERVAL):
+        self.rag_system = rag_system
+        self.check_interval = check_interval
+        self._snapshot: Optional[CorpusSnapshot] = None
+        self._generations = itertools.count(1)
+        self._checked = 0.0
+        self._build_lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._snapshot is not None
+
+    def current(self) -> CorpusSnapshot:
+        """The latest snapshot, loading it on first use"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return self.reload()
+        now = time.monotonic()
+        if now - self._checked >= self.check_interval:
+            self._checked = now
+            self.rag_system.refresh_if_stale(snapshot.grant_data)
+            # A refresh in flight is still indexing the version it published; swap once it is done
+            if not self.rag_system.refresh_state.in_flight and self.rag_system.is_outdated(snapshot.grant_data):
+                return self.reload(blocking=False)
+        return snapshot
+
+    def reload(self, blocking: bool = True) -> CorpusSnapshot:
+        """Publish a snapshot of the newest stored version if it differs from the current one.
+
+        With blocking=False, returns the current snapshot when another thread is already building.
+        """
+        if not self._build_lock.acquire(blocking=blocking):
+            return self._snapshot
+        try:
+            snapshot = self._snapshot
+            if snapshot is not None and not self.rag_system.is_outdated(snapshot.grant_data):
+                return snapshot
+            grant_data = self.rag_system.load_grant_data() or {}
+            index = self.rag_system.load_search_index(grant_data)
+            self._snapshot = CorpusSnapshot(next(self._generations), grant_data, index, COUNTY_INDEX)
+            self._checked = time.monotonic()
+            logger.info("Published public corpus generation %d (%d chunks)",
+                        self._snapshot.generation, len(index))
+            return self._snapshot
+        finally:
+            self._build_lock.release()
@@ -0,0 +1,196 @@
+"""DCNR regional advisor directory with a precomputed county index."""
+import re
+from difflib import SequenceMatcher
+from functools import lru_cache
+from typing import Dict, List, Optional, Set, Tuple
+
+# Regional Advisors Data
+REGIONAL_ADVISORS = {
+    "regions": {
+        "1": {
+            "advisor": "Danielle Guttman",
+            "phone": "(717) 884-6908",
+            "email": "dguttman@pa.gov",
+            "counties": ["philadelphia", "delaware", "chester", "montgomery", "bucks"]
+        },
+        "2": {
+            "advisor": "Jeanne Barrett Ortiz",
+            "phone": "(267) 252-2806",
+            "email": "jeabarrett@pa.gov",
+            "counties": ["northampton", "lehigh", "carbon", "monroe", "pike"]
+        },
+        "3": {
+            "advisor": "Lindsay Baer",
+            "phone": "(717) 858-1185",
+            "email": "libaer@pa.gov",
+            "counties": ["perry", "cumberland", "franklin", "adams", "york", "lancaster", 
+                        "lebanon", "dauphin", "juniata", "mifflin", "huntingdon", "blair", 
+                        "cambria", "bedford", "fulton", "somerset"]
+        },
+        "4": {
+            "advisor": "Wes Fahringer",
+            "phone": "(570) 900-3265",
+            "email": "mfahringer@pa.gov",
+            "counties": ["centre", "clinton", "lycoming", "union", "snyder", 
+                        "northumberland", "montour", "columbia"]
+        },
+        "5": {
+            "advisor": "Adriene Smochek",
+            "phone": "(412) 565-7803",
+            "email": "asmochek@pa.gov",
+            "counties": ["beaver", "allegheny", "washington", "greene", "fayette", 
+                        "westmoreland", "indiana", "armstrong", "butler", "lawrence"]
+        },
+        "6": {
+            "advisor": "Adam Mattis",
+            "phone": "(412) 770-3774",
+            "email": "amattis@pa.gov",
+            "counties": ["erie", "crawford", "mercer", "venango", "forest", "warren", 
+                        "mckean", "elk", "clarion", "jefferson", "clearfield", "potter", 
+                        "tioga", "bradford", "susquehanna", "wayne", "wyoming", "sullivan", 
+                        "lackawanna"]
+        }
+    }
+}
+
+# Words that come before "county" when someone names their county in a sentence
+COUNTY_WORDS = frozenset(["county", "counties", "co"])
+
+# Without an explicit "... County" the bar is higher, so ordinary words such as
+# "like" are not mistaken for a county ("pike")
+FUZZY_CUTOFF = 0.6
+FREE_TEXT_CUTOFF = 0.8
+
+WORD_PATTERN = re.compile(r"[a-z]+")
+
+
+def _normalize_county(name: str) -> str:
+    """Reduce a county name to lowercase letters only ("McKean County" -> "mckean")"""
+    name = name.lower().strip()
+    if name.endswith(" county"):
+        name = name[:-len(" county")]
+    return "".join(WORD_PATTERN.findall(name))
+
+
+def _trigrams(name: str) -> Set[str]:
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class CountyIndex:
+    """County lookups built once: an exact county -> region dict plus a trigram index for typos"""
+
+    def __init__(self, advisors: Dict):
+        self.advisors = advisors
+        self.county_to_region: Dict[str, str] = {}
+        self.trigram_index: Dict[str, Set[str]] = {}
+        for region_num, region_data in advisors["regions"].items():
+            for county in region_data["counties"]:
+                key = _normalize_county(county)
+                self.county_to_region[key] = region_num
+                for gram in _trigrams(key):
+                    self.trigram_index.setdefault(gram, set()).add(key)
+        self.max_words = 2  # longest phrase tried when joining words ("mc kean")
+        self.fuzzy_match = lru_cache(maxsize=4096)(self._fuzzy_match)
+
+    def _fuzzy_match(self, word: str, cutoff: float = FUZZY_CUTOFF) -> Optional[str]:
+        """Closest county by difflib ratio, only comparing counties sharing a trigram"""
+        overlaps: Dict[str, int] = {}
+        for gram in _trigrams(word):
+            for county in self.trigram_index.get(gram, ()):
+                overlaps[county] = overlaps.get(county, 0) + 1
+        best, best_ratio = None, cutoff
+        for county in overlaps:
+            ratio = SequenceMatcher(None, word, county).ratio()
+            if ratio >= best_ratio:
+                best, best_ratio = county, ratio
+        return best
+
+    def lookup(self, county_name: str) -> Tuple[Optional[str], bool]:
+        """Resolve a county name to its canonical key; the flag is True for fuzzy matches"""
+        key = _normalize_county(county_name)
+        if not key:
+            return None, False
+        if key in self.county_to_region:
+            return key, False
+        match = self.fuzzy_match(key)
+        return match, match is not None
+
+    def find_in_text(self, text: str) -> Optional[str]:
+        """Find the county a free-text question refers to, handling phrases like "Bucks County" """
+        words = WORD_PATTERN.findall(text.lower())
+        phrases: List[Tuple[str, bool]] = []
+        for i in range(len(words)):
+            for n in range(self.max_words, 0, -1):
+                if i + n > len(words):
+                    continue
+                phrase = "".join(words[i:i + n])
+                followed_by_county = i + n < len(words) and words[i + n] in COUNTY_WORDS
+                phrases.append((phrase, followed_by_county))
+
+        # Exact "X County" phrases win over bare words such as "forest" or "union"
+        exact = [(phrase, followed) for phrase, followed in phrases if phrase in self.county_to_region]
+        for phrase, followed_by_county in exact:
+            if followed_by_county:
+                return phrase
+        if exact:
+            return exact[0][0]
+
+        # Typos: "X County" phrases first with the normal cutoff, then any longer word
+        for phrase, followed_by_county in phrases:
+            if followed_by_county:
+                match = self.fuzzy_match(phrase)
+                if match:
+                    return match
+        for phrase, _ in phrases:
+            if len(phrase) >= 4 and phrase not in COUNTY_WORDS:
+                match = self.fuzzy_match(phrase, FREE_TEXT_CUTOFF)
+                if match:
+                    return match
+        return None
+
+    def advisor_for(self, county: str) -> Dict:
+        region_num = self.county_to_region[county]
+        region_data = self.advisors["regions"][region_num]
+        return {
+            "region": region_num,
+            "advisor_name": region_data["advisor"],
+            "phone": region_data["phone"],
+            "email": region_data["email"],
+            "counties_served": region_data["counties"]
+        }
+
+
+COUNTY_INDEX = CountyIndex(REGIONAL_ADVISORS)
+
+
+def get_regional_advisor(county_name):
+    """Get the regional advisor for a given county"""
+    county, is_fuzzy = COUNTY_INDEX.lookup(county_name)
+    if county is None:
+        return None
+    advisor_info = COUNTY_INDEX.advisor_for(county)
+    if is_fuzzy:
+        advisor_info["matched_county"] = county  # Include what we matched to
+    return advisor_info
+
+
+def find_county_in_text(text: str) -> Optional[str]:
+    """Return the county mentioned in a question, if any"""
+    return COUNTY_INDEX.find_in_text(text)
+
+
+def format_advisor_info(advisor_info):
+    """Format advisor information for display"""
+    if not advisor_info:
+        return "Regional advisor information not found. Please check the county name."
+    
+    return f"""
+**Your Regional Advisor (Region {advisor_info['region']}):**
+👤 **{advisor_info['advisor_name']}**
+📞 Phone: {advisor_info['phone']}
+📧 Email: {advisor_info['email']}
+
+This advisor serves {len(advisor_info['counties_served'])} counties in your region.
+Contact them early in your grant planning process for guidance and support!
+"""
@@ -0,0 +1,225 @@
+"""Corpus-level retrieval over chunks, combining the keyword and dense indexes."""
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from chunking import DEFAULT_CHUNK_OVERLAP, DEFAULT_CHUNK_TOKENS, Chunk, chunk_grant_data, grant_sections
+from dense_index import DEFAULT_DIM, DenseIndex
+from metrics import inc
+from search_index import BM25Index
+
+SEARCH_MODES = ("hybrid", "keyword", "dense")
+
+# Anything that changes how chunks or vectors are produced invalidates a saved index
+INDEX_PARAMS = {"dim": DEFAULT_DIM, "chunk_tokens": DEFAULT_CHUNK_TOKENS,
+                "chunk_overlap": DEFAULT_CHUNK_OVERLAP}
+
+
+@dataclass
+class RetrievalConfig:
+    """Candidate budget for each retriever and the size of the fused result list"""
+    keyword_candidates: int = 20
+    dense_candidates: int = 20
+    top_k: int = 5
+    rrf_k: int = 60
+    # Per-ranking weights; "advisor" is the county lookup, which should lead when it fires
+    weights: Dict[str, float] = field(default_factory=lambda: {
+        "keyword": 1.0, "dense": 1.0, "advisor": 2.0
+    })
+
+    @classmethod
+    def from_env(cls) -> "RetrievalConfig":
+        """Read overrides such as DCNR_KEYWORD_CANDIDATES from the environment"""
+        config = cls()
+        for name in ("keyword_candidates", "dense_candidates", "top_k", "rrf_k"):
+            value = os.environ.get(f"DCNR_{name.upper()}")
+            if value:
+                setattr(config, name, int(value))
+        return config
+
+    def cache_key(self) -> Tuple:
+        return (self.keyword_candidates, self.dense_candidates, self.top_k, self.rrf_k,
+                tuple(sorted(self.weights.items())))
+
+
+def reciprocal_rank_fusion(rankings: Dict[str, List[str]], k: int = 60,
+                           weights: Optional[Dict[str, float]] = None) -> List[Tuple[float, str]]:
+    """Merge ranked id lists: each id scores sum(weight / (k + rank)) over the lists it appears in"""
+    weights = weights or {}
+    fused: Dict[str, float] = {}
+    for name, ranking in rankings.items():
+        weight = weights.get(name, 1.0)
+        for rank, key in enumerate(ranking, start=1):
+            fused[key] = fused.get(key, 0.0) + weight / (k + rank)
+    return sorted(((score, key) for key, score in fused.items()), reverse=True)
+
+
+class CorpusIndex:
+    """Keeps a BM25 index and a dense index over the same set of chunks"""
+
+    def __init__(self):
+        self.keyword = BM25Index()
+        self.dense = DenseIndex()
+        self.doc_chunks: Dict[str, List[str]] = {}
+
+    def __len__(self):
+        return len(self.keyword)
+
+    @classmethod
+    def from_arrays(cls, chunks: List[Chunk], matrix, doc_freq: Dict[str, int]) -> "CorpusIndex":
+        """Restore from a saved chunk table and dense matrix; only BM25 postings are rebuilt"""
+        index = cls()
+        index.keyword.add_chunks(chunks)
+        index.dense = DenseIndex.from_arrays(chunks, matrix, doc_freq)
+        for chunk in chunks:
+            index.doc_chunks.setdefault(chunk.doc_key, []).append(chunk.chunk_id)
+        return index
+
+    def add_chunks(self, chunks: Iterable[Chunk]):
+        for chunk in chunks:
+            self.keyword.add_chunk(chunk)
+            self.dense.add_chunk(chunk)
+            self.doc_chunks.setdefault(chunk.doc_key, []).append(chunk.chunk_id)
+
+    def add_embedded(self, chunks: List[Chunk], vectors, features: List[List[str]]):
+        """Add chunks whose dense vectors and features were computed earlier (e.g. cached)"""
+        for chunk, vector, chunk_features in zip(chunks, vectors, features):
+            self.keyword.add_chunk(chunk)
+            self.dense.add_vector(chunk, vector, chunk_features)
+            self.doc_chunks.setdefault(chunk.doc_key, []).append(chunk.chunk_id)
+
+    def remove_chunks(self, chunk_ids: Iterable[str]):
+        for chunk_id in chunk_ids:
+            chunk = self.keyword.chunks.get(chunk_id)
+            self.keyword.remove_document(chunk_id)
+            self.dense.remove(chunk_id)
+            if chunk is not None and chunk_id in self.doc_chunks.get(chunk.doc_key, ()):
+                self.doc_chunks[chunk.doc_key].remove(chunk_id)
+                if not self.doc_chunks[chunk.doc_key]:
+                    del self.doc_chunks[chunk.doc_key]
+
+    def remove_documents(self, doc_keys: Iterable[str]):
+        """Remove every chunk of the given source documents or sections"""
+        for doc_key in doc_keys:
+            for chunk_id in self.doc_chunks.pop(doc_key, []):
+                self.keyword.remove_document(chunk_id)
+                self.dense.remove(chunk_id)
+
+    def candidate_rankings(self, query: str, config: RetrievalConfig,
+                           mode: str = "hybrid") -> Dict[str, List[str]]:
+        """Run the retrievers selected by mode, each within its candidate budget"""
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode '{mode}', expected one of {SEARCH_MODES}")
+        rankings = {}
+        if mode in ("hybrid", "keyword"):
+            rankings["keyword"] = [
+                chunk_id for _, chunk_id, _ in self.keyword.search(query, top_k=config.keyword_candidates)
+            ]
+        if mode in ("hybrid", "dense"):
+            rankings["dense"] = [
+                chunk_id for _, chunk_id in self.dense.search(query, top_k=config.dense_candidates)
+            ]
+        return rankings
+
+    def search(self, query: str, config: Optional[RetrievalConfig] = None,
+               mode: str = "hybrid") -> List[Tuple[float, Chunk]]:
+        """Rank chunks for a query, fusing the retrievers with reciprocal rank fusion"""
+        config = config or RetrievalConfig()
+        rankings = self.candidate_rankings(query, config, mode)
+        fused = reciprocal_rank_fusion(rankings, k=config.rrf_k, weights=config.weights)
+        return [(score, self.keyword.chunks[chunk_id]) for score, chunk_id in fused[:config.top_k]]
+
+
+def build_search_index(document_chunks: Dict[str, List[Chunk]], grant_data: Dict) -> CorpusIndex:
+    """Build the chunk-level search indexes for uploaded documents and scraped grant data"""
+    index = CorpusIndex()
+    for chunks in document_chunks.values():
+        index.add_chunks(chunks)
+    index.add_chunks(chunk_grant_data(grant_data))
+    return index
+
+
+@dataclass
+class SectionDiff:
+    """Doc keys of grant sections that appeared, changed or disappeared between two corpus versions"""
+    added: List[str] = field(default_factory=list)
+    changed: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+
+    def __bool__(self):
+        return bool(self.added or self.changed or self.removed)
+
+    def summary(self) -> str:
+        return f"{len(self.added)} added, {len(self.changed)} changed, {len(self.removed)} removed"
+
+
+def diff_sections(old: Dict[str, str], new: Dict[str, str]) -> SectionDiff:
+    """Compare {doc_key: content hash} maps of two corpus versions"""
+    return SectionDiff(
+        added=[key for key in new if key not in old],
+        changed=[key for key in new if key in old and old[key] != new[key]],
+        removed=[key for key in old if key not in new],
+    )
+
+
+def patch_search_index(index: CorpusIndex, old_grant_data: Dict, new_grant_data: Dict) -> SectionDiff:
+    """Bring an index built from old_grant_data up to new_grant_data by re-chunking only changed sections"""
+    diff = diff_sections(
+        {key: unit['sha256'] for key, unit in grant_sections(old_grant_data).items()},
+        {key: unit['sha256'] for key, unit in grant_sections(new_grant_data).items()},
+    )
+    index.remove_documents(diff.changed + diff.removed)
+    index.add_chunks(chunk_grant_data(new_grant_data, doc_keys=diff.added + diff.changed))
+    return diff
+
+
+def normalize_query(query: str) -> str:
+    """Canonical form of a question for cache keys: lowercase words, single spaces"""
+    return " ".join(re.findall(r"[a-z0-9]+", query.lower()))
+
+
+class RetrievalCache:
+    """Bounded LRU cache of search results keyed by normalized query and corpus version"""
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def make_key(query: str, corpus_version: Hashable, *extra: Hashable) -> Tuple:
+        return (normalize_query(query), corpus_version) + extra
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                inc("dcnr_retrieval_cache_total", result="hit")
+                return self._entries[key]
+            self.misses += 1
+            inc("dcnr_retrieval_cache_total", result="miss")
+            return None
+
+    def put(self, key: Hashable, value: Any):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries),
+                "maxsize": self.maxsize}
@@ -0,0 +1,140 @@
+"""Inverted index with BM25 scoring for grant documents and scraped content."""
+import heapq
+import math
+import re
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from chunking import Chunk
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Very common words that carry no retrieval signal but have huge postings lists
+STOPWORDS = frozenset([
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for",
+    "from", "how", "i", "in", "is", "it", "me", "my", "of", "on", "or", "our",
+    "the", "to", "we", "what", "when", "where", "which", "who", "why", "with",
+    "you", "your",
+])
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase text and split it into alphanumeric index terms"""
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+
+def tokenize_with_offsets(text: str) -> List[Tuple[str, int]]:
+    """Tokenize text, keeping the character offset of every term"""
+    return [
+        (m.group(), m.start())
+        for m in TOKEN_PATTERN.finditer(text.lower())
+        if m.group() not in STOPWORDS
+    ]
+
+
+class BM25Index:
+    """Inverted index over (source, text) documents ranked with Okapi BM25"""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        # term -> {doc_id: (term frequency, offset of first occurrence)}
+        self.postings: Dict[str, Dict[str, Tuple[int, int]]] = defaultdict(dict)
+        self.doc_lengths: Dict[str, int] = {}
+        self.doc_terms: Dict[str, List[str]] = {}
+        self.docs: Dict[str, Tuple[str, str]] = {}
+        self.chunks: Dict[str, Chunk] = {}
+        self.total_length = 0
+
+    def __len__(self):
+        return len(self.docs)
+
+    def add_document(self, doc_id: str, source: str, text: str):
+        """Index a document, replacing any previous version with the same id"""
+        if doc_id in self.docs:
+            self.remove_document(doc_id)
+
+        term_stats: Dict[str, List[int]] = {}
+        length = 0
+        for term, offset in tokenize_with_offsets(text):
+            length += 1
+            stats = term_stats.get(term)
+            if stats is None:
+                term_stats[term] = [1, offset]
+            else:
+                stats[0] += 1
+
+        for term, (tf, offset) in term_stats.items():
+            self.postings[term][doc_id] = (tf, offset)
+
+        self.docs[doc_id] = (source, text)
+        self.doc_terms[doc_id] = list(term_stats)
+        self.doc_lengths[doc_id] = length
+        self.total_length += length
+
+    def add_chunk(self, chunk: Chunk):
+        """Index a single passage, keeping its page and offset metadata"""
+        self.add_document(chunk.chunk_id, chunk.label, chunk.text)
+        self.chunks[chunk.chunk_id] = chunk
+
+    def add_chunks(self, chunks: Iterable[Chunk]):
+        """Index a sequence of passages"""
+        for chunk in chunks:
+            self.add_chunk(chunk)
+
+    def remove_document(self, doc_id: str):
+        """Drop a document and its postings from the index"""
+        if doc_id not in self.docs:
+            return
+        for term in self.doc_terms.pop(doc_id):
+            term_postings = self.postings.get(term)
+            if term_postings is not None:
+                term_postings.pop(doc_id, None)
+                if not term_postings:
+                    del self.postings[term]
+        self.total_length -= self.doc_lengths.pop(doc_id)
+        del self.docs[doc_id]
+        self.chunks.pop(doc_id, None)
+
+    def idf(self, term: str) -> float:
+        """BM25 inverse document frequency (always positive)"""
+        n = len(self.docs)
+        df = len(self.postings.get(term, ()))
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def search(self, query: str, top_k: Optional[int] = None) -> List[Tuple[float, str, int]]:
+        """Rank documents for a query.
+
+        Returns (score, doc_id, offset) tuples, where offset is the position of the
+        first occurrence of the rarest matching query term in that document.
+        """
+        if not self.docs:
+            return []
+
+        avg_length = self.total_length / len(self.docs) or 1.0
+        scores: Dict[str, float] = {}
+        anchors: Dict[str, Tuple[float, int]] = {}
+
+        for term in set(tokenize(query)):
+            term_postings = self.postings.get(term)
+            if not term_postings:
+                continue
+            idf = self.idf(term)
+            for doc_id, (tf, offset) in term_postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+                if doc_id not in anchors or idf > anchors[doc_id][0]:
+                    anchors[doc_id] = (idf, offset)
+
+        if top_k is None:
+            ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        else:
+            ranked = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+        return [(score, doc_id, anchors[doc_id][1]) for doc_id, score in ranked]
+
+    def snippet(self, doc_id: str, offset: int, before: int = 100, length: int = 500) -> str:
+        """Cut a snippet window around a known offset without rescanning the text"""
+        text = self.docs[doc_id][1]
+        start = max(0, offset - before)
+        return text[start:start + length]
+
@@ -0,0 +1,73 @@
+"""Shared fixtures: a local HTTP site whose routes tests can change between requests."""
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FixtureSite:
+    """Routes map a path to {"body", "status"?, "etag"?, "content_type"?, "headers"?}"""
+
+    def __init__(self):
+        self.routes: Dict[str, Dict] = {}
+        self.requests: List[Dict] = []
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def _handler(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                with site._lock:
+                    site.requests.append({'path': self.path, 'headers': dict(self.headers)})
+                route = site.routes.get(self.path)
+                if route is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                etag = route.get('etag')
+                if etag and self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                body = route['body'] if isinstance(route['body'], bytes) else route['body'].encode('utf-8')
+                self.send_response(route.get('status', 200))
+                self.send_header("Content-Type", route.get('content_type', "text/html; charset=utf-8"))
+                self.send_header("Content-Length", str(len(body)))
+                if etag:
+                    self.send_header("ETag", etag)
+                for name, value in route.get('headers', {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def hits(self, path: str) -> List[Dict]:
+        with self._lock:
+            return [request for request in self.requests if request['path'] == path]
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def site():
+    fixture = FixtureSite()
+    yield fixture
+    fixture.close()
@@ -0,0 +1,25 @@
+"""Exact and near-duplicate answer cache lookups."""
+from answer_cache import AnswerCache, question_similarity
+
+SCOPE = ("model", "system prompt", "context")
+
+
+def test_near_duplicates_are_off_by_default(tmp_path):
+    cache = AnswerCache(str(tmp_path / "answers.sqlite3"))
+    cache.put(*SCOPE, "What is the deadline for trail grants?", "April 2nd")
+    assert cache.get(*SCOPE, "what is the deadline for trail grants") == "April 2nd"
+    assert cache.get(*SCOPE, "What is the deadline for the trail grants?") is None
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+
+def test_reordered_or_negated_questions_never_match(tmp_path):
+    cache = AnswerCache(str(tmp_path / "answers.sqlite3"), near_duplicate_threshold=0.5)
+    question = ("what are the eligibility requirements for a municipality applying to the recreation "
+                "and conservation grant program in centre county this year")
+    cache.put(*SCOPE, "can counties fund nonprofits", "yes")
+    cache.put(*SCOPE, question, "municipalities qualify")
+
+    assert question_similarity("can counties fund nonprofits", "can nonprofits fund counties") < 0.5
+    assert cache.get(*SCOPE, "can nonprofits fund counties") is None
+    assert cache.get(*SCOPE, question.replace("municipality applying", "municipality not applying")) is None
+    assert cache.get(*SCOPE, question + " please") == "municipalities qualify"
@@ -0,0 +1,86 @@
+"""Request validation, streaming errors and keep-alive handling of the JSON API."""
+import http.client
+import json
+import threading
+
+import pytest
+
+from api_server import PooledHTTPServer
+
+
+class FakeService:
+    """Stands in for AssistantService without loading a corpus"""
+
+    def eligibility(self, user_info):
+        return {'eligible_programs': [], 'entity_type': user_info.get('entity_type', '').lower()}
+
+    def evaluate(self, body):
+        return {'score': 0}
+
+    def stream(self, query, history=None):
+        def pieces():
+            yield "partial answer"
+            raise RuntimeError("model went away")
+        return pieces()
+
+
+@pytest.fixture
+def server():
+    httpd = PooledHTTPServer(("127.0.0.1", 0), FakeService(), workers=2, backlog=2)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def post(server, path, body):
+    conn = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=10)
+    conn.request("POST", path, json.dumps(body), {"Content-Type": "application/json"})
+    response = conn.getresponse()
+    data = response.read()
+    conn.close()
+    return response, data
+
+
+@pytest.mark.parametrize("path, body, field", [
+    ("/eligibility", {"entity_type": 5}, "entity_type"),
+    ("/eligibility", {"entity_type": "nonprofit", "has_501c3": "yes"}, "has_501c3"),
+    ("/evaluate", {"county": None}, "county"),
+    ("/evaluate", {"footfall": "many"}, "footfall"),
+    ("/evaluate", {"applications": [{}, {"match_percentage": True}]}, "applications[1].match_percentage"),
+    ("/evaluate", {"applications": {"entity_type": "county"}}, "applications"),
+])
+def test_wrong_field_types_are_rejected(server, path, body, field):
+    response, data = post(server, path, body)
+    assert response.status == 400
+    assert field in json.loads(data)['error']
+
+
+def test_valid_bodies_are_accepted(server):
+    response, data = post(server, "/eligibility", {"entity_type": "Nonprofit", "has_501c3": True})
+    assert response.status == 200
+    assert json.loads(data)['entity_type'] == "nonprofit"
+    response, _ = post(server, "/evaluate", {"applications": [{"county": "Centre", "footfall": 1200.5}]})
+    assert response.status == 200
+
+
+def test_stream_error_becomes_an_event(server):
+    response, data = post(server, "/answer/stream", {"query": "deadlines?"})
+    assert response.status == 200
+    text = data.decode()
+    assert 'data: {"delta": "partial answer"}' in text
+    assert "event: error" in text and "model went away" in text
+    assert "event: done" not in text
+    assert '"error":' not in text.split("event: error")[0]
+
+
+def test_keep_alive_yields_to_waiting_connections(server):
+    response, _ = post(server, "/evaluate", {})
+    assert response.getheader("Connection") is None
+    server.waiting = 1
+    try:
+        response, _ = post(server, "/evaluate", {})
+        assert response.getheader("Connection") == "close"
+    finally:
+        server.waiting = 0
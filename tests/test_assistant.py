@@ -0,0 +1,18 @@
+"""The chat answer's sources footer."""
+from types import SimpleNamespace
+
+from assistant import sources_of, stream_answer
+
+RESULTS = [(0.9, "Trail Guide", "Trails need matching funds."), (0.8, "PA DCNR Website", "Deadlines are in April."),
+           (0.7, "Trail Guide", "Trails must be open to the public."), (0.6, "Advisors", "Call your advisor.")]
+
+
+class FakeClient:
+    def create_chat_completion(self, **kwargs):
+        return SimpleNamespace(usage=None, choices=[SimpleNamespace(message=SimpleNamespace(content="Apply by April."))])
+
+
+def test_sources_footer_follows_rank_order():
+    answer = "".join(stream_answer("When is the deadline?", RESULTS, FakeClient(), stream=False))
+    assert sources_of(RESULTS) == ["Trail Guide", "PA DCNR Website", "Advisors"]
+    assert answer.endswith("📚 **Sources:** Trail Guide, PA DCNR Website, Advisors")
@@ -0,0 +1,72 @@
+"""Resuming a batch from its output file."""
+import json
+
+from batch_qa import CheckpointWriter, load_checkpoint, run_batch
+
+
+class FlakyService:
+    """Answers every question except those in `failing`"""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.asked = []
+
+    def answer(self, question, raise_errors=False):
+        self.asked.append(question)
+        if question in self.failing:
+            raise RuntimeError("rate limited")
+        return f"answer to {question}", [(1.0, "guide.pdf", "text")]
+
+
+QUESTIONS = [{'id': str(n), 'question': f"q{n}"} for n in range(1, 6)]
+
+
+def run(service, path):
+    done = load_checkpoint(str(path))
+    writer = CheckpointWriter(str(path))
+    try:
+        return run_batch(service, QUESTIONS, writer, workers=2, skip=done)
+    finally:
+        writer.close()
+
+
+def records(path):
+    return [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+
+
+def test_resume_retries_failures_and_leaves_one_record_per_id(tmp_path):
+    path = tmp_path / "answers.jsonl"
+    assert run(FlakyService(failing={"q2", "q4"}), path) == {'answered': 3, 'failed': 2, 'skipped': 0}
+
+    service = FlakyService()
+    assert run(service, path) == {'answered': 2, 'failed': 0, 'skipped': 3}
+    assert sorted(service.asked) == ["q2", "q4"]
+    final = records(path)
+    assert sorted(record['id'] for record in final) == ["1", "2", "3", "4", "5"]
+    assert all('answer' in record and 'error' not in record for record in final)
+
+
+def test_partial_last_line_is_truncated(tmp_path):
+    path = tmp_path / "answers.jsonl"
+    answered = json.dumps({'id': "1", 'question': "q1", 'answer': "a"})
+    path.write_text(answered + "\n" + '{"id": "2", "question": "q2", "ans', encoding='utf-8')
+
+    assert load_checkpoint(str(path)) == {"1"}
+    assert path.read_text(encoding='utf-8') == answered + "\n"
+    assert not (tmp_path / "answers.jsonl.tmp").exists()
+
+
+def test_last_answer_per_id_is_kept(tmp_path):
+    path = tmp_path / "answers.jsonl"
+    lines = [{'id': "1", 'question': "q1", 'answer': "old"}, {'id': "1", 'question': "q1", 'answer': "new"}]
+    path.write_text("".join(json.dumps(line) + "\n" for line in lines), encoding='utf-8')
+    assert load_checkpoint(str(path)) == {"1"}
+    assert records(path) == [lines[1]]
+
+
+def test_compact_file_is_left_alone(tmp_path):
+    path = tmp_path / "answers.jsonl"
+    path.write_text(json.dumps({'id': "1", 'question': "q1", 'answer': "a"}) + "\n", encoding='utf-8')
+    before = path.stat().st_mtime_ns
+    assert load_checkpoint(str(path)) == {"1"}
+    assert path.stat().st_mtime_ns == before
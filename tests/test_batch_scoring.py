@@ -0,0 +1,55 @@
+"""Batch scoring must match evaluate_grant_application on every record."""
+import random
+
+import pytest
+
+from batch_scoring import BOOL_COLUMNS, ApplicationTable, check_parity, score_applications
+from grant_rag import GrantRAGSystem
+
+ENTITIES = ["Municipality", "county", "Council of Governments", "school district", "Nonprofit", "501c3 org",
+            "land trust", "", "Borough of State College"]
+PROJECTS = ["master site", "Feasibility", "trail", "", "comprehensive plan"]
+COUNTIES = ["Centre", "Erie", "chester county", "Allegany", "Nowhere", ""]
+# Thresholds of the impact and match tiers, and values either side of them
+EDGES = [0, -1, 1, 49, 50, 99, 100, 999, 1000, 4999, 5000, 20000]
+
+
+def random_record(rng: random.Random) -> dict:
+    """An application with each field randomly present, at or around the scoring thresholds"""
+    record = {}
+    for name in BOOL_COLUMNS:
+        if rng.random() < 0.9:
+            record[name] = rng.choice([True, False, 0, 1, "", "yes"])
+    for name in ('footfall', 'population_served', 'match_percentage'):
+        if rng.random() < 0.9:
+            record[name] = rng.choice([rng.choice(EDGES), rng.randint(0, 20000), rng.uniform(0, 6000)])
+    if rng.random() < 0.9:
+        record['entity_type'] = rng.choice(ENTITIES)
+    if rng.random() < 0.9:
+        record['project_type'] = rng.choice(PROJECTS)
+    if rng.random() < 0.8:
+        record['county'] = rng.choice(COUNTIES)
+    return record
+
+
+@pytest.fixture(scope="module")
+def evaluate():
+    return GrantRAGSystem().evaluate_grant_application
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_random_records_match_scalar(seed, evaluate):
+    rng = random.Random(seed)
+    records = [random_record(rng) for _ in range(3000)]
+    assert check_parity(records, evaluate) == []
+
+
+def test_result_matches_results(evaluate):
+    rng = random.Random(7)
+    records = [random_record(rng) for _ in range(200)]
+    scores = score_applications(ApplicationTable.from_records(records))
+    assert [scores.result(i) for i in range(len(scores))] == scores.results()
+
+
+def test_empty_table():
+    assert score_applications(ApplicationTable.from_records([])).results() == []
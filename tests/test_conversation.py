@@ -0,0 +1,79 @@
+"""Bounded conversation memory: limits, folding, summaries and follow-up retrieval queries."""
+import pytest
+
+from context_builder import count_tokens
+from conversation import MESSAGE_OVERHEAD_TOKENS, SUMMARY_PREFIX, ConversationMemory
+
+TRANSCRIPT = [message for n in range(4) for message in (
+    {'role': 'user', 'content': f"question {n}"}, {'role': 'assistant', 'content': f"answer {n}"})]
+
+
+def test_transcript_uses_environment_limits(monkeypatch):
+    monkeypatch.setenv("DCNR_HISTORY_TURNS", "1")
+    memory = ConversationMemory.from_messages(TRANSCRIPT)
+    assert memory.max_turns == 1
+    assert [turn.user for turn in memory.turns] == ["question 3"]
+    assert "question 0" in memory.summary
+
+
+def test_explicit_limits_win(monkeypatch):
+    monkeypatch.setenv("DCNR_HISTORY_TURNS", "1")
+    assert len(ConversationMemory.from_messages(TRANSCRIPT, max_turns=3).turns) == 3
+
+
+def rendered_tokens(memory):
+    return sum(count_tokens(message['content']) + MESSAGE_OVERHEAD_TOKENS for message in memory.history_messages())
+
+
+def test_history_stays_under_the_token_ceiling():
+    memory = ConversationMemory(max_turns=10, history_tokens=600, summary_tokens=100, turn_tokens=150)
+    for n in range(30):
+        memory.add_turn(f"Question {n} about trail grants? " * 30, f"Answer {n}. Trails need matching funds. " * 40)
+        assert memory.tokens == rendered_tokens(memory) <= 600
+        assert memory.turns[-1].user.startswith(f"Question {n} ")
+    assert memory.folded > 0 and memory.summary
+
+
+def test_oldest_turns_fold_into_the_summary():
+    memory = ConversationMemory(max_turns=2)
+    for message in TRANSCRIPT[:6:2]:
+        memory.add_turn(message['content'], message['content'].replace("question", "answer") + ". More detail.")
+    assert [turn.user for turn in memory.turns] == ["question 1", "question 2"]
+    assert memory.folded == 1
+    assert memory.summary == "- Asked: question 0 | Answer: answer 0."
+    assert memory.history_messages()[0] == {'role': 'system', 'content': SUMMARY_PREFIX + memory.summary}
+
+
+def test_failing_summarizer_falls_back_to_extractive():
+    def failing(summary, turn, max_tokens):
+        raise RuntimeError("rate limited")
+    memory = ConversationMemory(max_turns=1, summarizer=failing)
+    memory.add_turn("question 0", "answer 0")
+    memory.add_turn("question 1", "answer 1")
+    assert memory.summary == "- Asked: question 0 | Answer: answer 0"
+
+    memory = ConversationMemory(max_turns=1, summarizer=lambda summary, turn, max_tokens: "Applicant is a county.")
+    memory.add_turn("question 0", "answer 0")
+    memory.add_turn("question 1", "answer 1")
+    assert memory.summary == "Applicant is a county."
+
+
+def test_limits_must_leave_room_for_a_verbatim_turn():
+    with pytest.raises(ValueError):
+        ConversationMemory(history_tokens=800, summary_tokens=300, turn_tokens=350)
+    ConversationMemory(history_tokens=1200, summary_tokens=300, turn_tokens=350)
+
+
+@pytest.mark.parametrize("question, expanded", [
+    ("what about for nonprofits?", True),
+    ("And land trusts?", True),
+    ("is it open to them?", True),
+    ("Counties?", True),
+    ("What documents do I need for a Land and Water Conservation Fund application?", False),
+])
+def test_follow_ups_are_expanded_for_retrieval(question, expanded):
+    memory = ConversationMemory()
+    assert memory.retrieval_query(question) == question
+    memory.add_turn("What are the eligibility requirements for trail grants?", "Municipalities qualify.")
+    expected = f"{question} What are the eligibility requirements for trail grants?" if expanded else question
+    assert memory.retrieval_query(question) == expected
@@ -0,0 +1,75 @@
+"""Seeding, legacy migration, unchanged saves and garbage collection of the corpus store."""
+import gc
+import os
+import pickle
+from collections import OrderedDict
+from datetime import date, datetime, timezone
+
+import numpy as np
+import pytest
+
+from chunking import Chunk
+from corpus_store import KEEP_HISTORY, CorpusStore, CorpusStoreError
+
+SEED = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "seed_grant_data.json")
+
+
+def test_seed_is_imported_without_touching_the_fixture(tmp_path):
+    before = os.stat(SEED).st_mtime_ns
+    store = CorpusStore(str(tmp_path / "store"))
+    manifest = store.import_seed(SEED)
+    assert manifest['version'] == 1
+    assert "Conservation" in store.load()['general_info']
+    assert os.stat(SEED).st_mtime_ns == before
+
+
+def test_unchanged_save_keeps_version_and_index(tmp_path):
+    store = CorpusStore(str(tmp_path / "store"))
+    data = {'last_updated': "2025-01-01T00:00:00", 'general_info': "Trail grants", 'grants': []}
+    manifest = store.save(data)
+    chunks = [Chunk("c0", "general_info", "general_info", "Trail grants", None, 0, 12)]
+    store.save_index(manifest, chunks, np.ones((1, 4), dtype=np.float32), {"trail": 1}, {"dim": 4})
+
+    kept = store.save(data, meta={'checked': "now"})
+    assert kept['version'] == 1
+    assert kept['meta']['checked'] == "now"
+    assert store.has_index(kept, {"dim": 4})
+
+    assert store.save({**data, 'general_info': "Trail and park grants"})['version'] == 2
+
+
+def test_legacy_pickle_with_dates_is_migrated(tmp_path):
+    legacy = tmp_path / "grant_data.pkl"
+    legacy.write_bytes(pickle.dumps(OrderedDict([
+        ('last_updated', datetime(2024, 5, 1, 9, 30, tzinfo=timezone.utc)),
+        ('general_info', "Trail grants"),
+        ('deadlines', [{'date': date(2025, 4, 2), 'text': "Applications due"}]),
+    ])))
+    store = CorpusStore(str(tmp_path / "store"))
+    store.import_pickle(str(legacy))
+    data = store.load()
+    assert data['last_updated'] == "2024-05-01T09:30:00+00:00"
+    assert data['deadlines'] == [{'date': "2025-04-02", 'text': "Applications due"}]
+
+
+def test_legacy_pickle_cannot_run_code(tmp_path):
+    legacy = tmp_path / "grant_data.pkl"
+    legacy.write_bytes(pickle.dumps({'general_info': Chunk("c0", "d", "s", "t", None, 0, 1)}))
+    with pytest.raises(CorpusStoreError):
+        CorpusStore(str(tmp_path / "store")).import_pickle(str(legacy))
+
+
+def test_open_views_keep_their_version_through_garbage_collection(tmp_path):
+    store = CorpusStore(str(tmp_path / "store"))
+    data = {'last_updated': "2025-01-01T00:00:00", 'grants': []}
+    store.save({**data, 'general_info': "Version 1"})
+    held = store.load()
+    digest = held.manifest['sources']['general_info']['sha256']
+    for n in range(2, KEEP_HISTORY + 3):
+        store.save({**data, 'general_info': f"Version {n}"})
+    assert held['general_info'] == "Version 1"
+
+    del held
+    gc.collect()
+    store.save({**data, 'general_info': "Version 99"})
+    assert not os.path.exists(store.object_path(digest))
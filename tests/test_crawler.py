@@ -0,0 +1,75 @@
+"""Crawl depth, scope, robots.txt and deduplication against a local site."""
+import pytest
+
+from crawler import GrantCrawler
+from grant_rag import GrantRAGSystem
+
+
+def page(*links: str) -> str:
+    anchors = "".join(f'<a href="{link}">{link}</a>' for link in links)
+    return f"<html><body><main><h1>Page</h1><p>Grant text.</p>{anchors}</main></body></html>"
+
+
+@pytest.fixture
+def rag(tmp_path, monkeypatch):
+    monkeypatch.setenv("DCNR_CORPUS_STORE", str(tmp_path / "store"))
+    return GrantRAGSystem()
+
+
+def crawl(site, rag, **options):
+    crawler = GrantCrawler(rag, delay=0, **{'max_depth': 3, **options})
+    pages = crawler.crawl(f"{site.url}/grants/index.html")
+    return sorted(p['url'][len(site.url):] for p in pages)
+
+
+def fetched(site):
+    return sorted(r['path'] for r in site.requests if r['path'] != "/robots.txt")
+
+
+def test_depth_limit(site, rag):
+    site.routes.update({
+        '/grants/index.html': {'body': page("a.html")},
+        '/grants/a.html': {'body': page("b.html")},
+        '/grants/b.html': {'body': page("c.html")},
+        '/grants/c.html': {'body': page()},
+    })
+    assert crawl(site, rag, max_depth=2) == ['/grants/a.html', '/grants/b.html']
+    assert '/grants/c.html' not in fetched(site)
+
+
+def test_only_same_host_and_path_prefix(site, rag):
+    port = site.url.rsplit(":", 1)[1]
+    site.routes.update({
+        '/grants/index.html': {'body': page("in.html", "/news/out.html", f"http://localhost:{port}/grants/other.html",
+                                            "mailto:grants@example.org")},
+        '/grants/in.html': {'body': page()},
+        '/grants/other.html': {'body': page()},
+        '/news/out.html': {'body': page()},
+    })
+    assert crawl(site, rag) == ['/grants/in.html']
+    assert fetched(site) == ['/grants/in.html', '/grants/index.html']
+
+
+def test_robots_txt_is_honoured(site, rag):
+    site.routes.update({
+        '/robots.txt': {'body': "User-agent: *\nDisallow: /grants/private/\n", 'content_type': "text/plain"},
+        '/grants/index.html': {'body': page("public.html", "private/plan.html")},
+        '/grants/public.html': {'body': page()},
+        '/grants/private/plan.html': {'body': page()},
+    })
+    assert crawl(site, rag) == ['/grants/public.html']
+    assert '/grants/private/plan.html' not in fetched(site)
+
+    site.requests.clear()
+    assert crawl(site, rag, respect_robots=False) == ['/grants/private/plan.html', '/grants/public.html']
+
+
+def test_each_url_is_fetched_once(site, rag):
+    site.routes.update({
+        '/grants/index.html': {'body': page("a.html", "b.html", "a.html#deadlines", "index.html")},
+        '/grants/a.html': {'body': page("b.html", "shared.html", "index.html#top")},
+        '/grants/b.html': {'body': page("a.html", "shared.html")},
+        '/grants/shared.html': {'body': page("a.html")},
+    })
+    assert crawl(site, rag) == ['/grants/a.html', '/grants/b.html', '/grants/shared.html']
+    assert fetched(site) == ['/grants/a.html', '/grants/b.html', '/grants/index.html', '/grants/shared.html']
@@ -0,0 +1,142 @@
+"""Compiled eligibility rules against the original checks, flags, reloading and the batch path."""
+import copy
+import json
+import os
+import random
+
+import pytest
+
+from eligibility import DEFAULT_RULES_PATH, MAX_MASK_BITS, CompiledRules, EligibilityEngine, EligibilityRulesError
+from grant_rag import GrantRAGSystem
+
+# check_eligibility's hard-coded criteria before the rules file replaced them
+BASELINE_CRITERIA = {
+    'Recreation and Conservation': ['municipality', 'county', 'council of governments'],
+    'Partnership Grants': ['nonprofit', '501c3', 'educational institution'],
+    'Land Trust Grants': ['land trust', 'conservancy'],
+}
+ENTITY_TYPES = ["Municipality", "County", "Council of Governments", "Nonprofit", "501c3 organization",
+                "Educational Institution", "Land Trust", "Conservancy", "School District", "Borough", ""]
+ALL_FLAGS = {'has_501c3': True, 'has_matching_funds': True}
+
+
+def baseline_eligible(entity_type: str):
+    user_entity = entity_type.lower()
+    return [name for name, entities in BASELINE_CRITERIA.items() if any(e in user_entity for e in entities)]
+
+
+def grants(results, key):
+    return [item['grant'] for item in results[key]]
+
+
+@pytest.fixture(scope="module")
+def rules():
+    with open(DEFAULT_RULES_PATH, encoding='utf-8') as f:
+        return CompiledRules(json.load(f))
+
+
+@pytest.mark.parametrize("entity_type", ENTITY_TYPES)
+def test_matches_baseline_when_requirements_are_met(entity_type, rules):
+    results = rules.evaluate({'entity_type': entity_type, **ALL_FLAGS})
+    expected = baseline_eligible(entity_type)
+    assert grants(results, 'eligible_grants') == expected
+    assert grants(results, 'ineligible_grants') == [name for name in BASELINE_CRITERIA if name not in expected]
+    for item in results['ineligible_grants']:
+        assert item['reasons'] == [f"Entity type '{entity_type.lower()}' may not qualify"]
+
+
+def test_501c3_status_never_changes_the_entity_type(rules):
+    municipality = {'entity_type': "Municipality", 'has_matching_funds': True}
+    assert rules.evaluate({**municipality, 'has_501c3': True}) == rules.evaluate(municipality)
+    assert rules.evaluate({'entity_type': "School District", 'has_501c3': True})['eligible_grants'] == []
+
+
+def test_501c3_status_is_required_of_nonprofits(rules):
+    without = rules.evaluate({'entity_type': "Nonprofit"})
+    assert without['eligible_grants'] == []
+    partnership = without['ineligible_grants'][1]
+    assert partnership == {'grant': "Partnership Grants",
+                           'reasons': ["501(c)(3) status is required for nonprofit applicants"]}
+
+    with_status = rules.evaluate({'entity_type': "Nonprofit", 'has_501c3': True})
+    assert with_status['eligible_grants'][0]['grant'] == "Partnership Grants"
+    assert with_status['eligible_grants'][0]['confidence'] == "Medium"
+    assert len(with_status['recommendations']) == 1
+    # Educational institutions qualify without it
+    assert grants(rules.evaluate({'entity_type': "Educational Institution"}), 'eligible_grants') == [
+        "Partnership Grants"]
+
+
+def test_matching_funds_are_required_for_recreation_and_conservation(rules):
+    results = rules.evaluate({'entity_type': "County"})
+    assert results['ineligible_grants'][0] == {'grant': "Recreation and Conservation",
+                                               'reasons': ["Dollar-for-dollar matching funds are required"]}
+    assert grants(rules.evaluate({'entity_type': "County", 'has_matching_funds': True}), 'eligible_grants') == [
+        "Recreation and Conservation"]
+
+
+def test_missing_entity_type(rules):
+    results = rules.evaluate({'entity_type': None, **ALL_FLAGS})
+    assert results['eligible_grants'] == []
+    assert results['ineligible_grants'][0]['reasons'] == ["Entity type '' may not qualify"]
+
+
+def test_grant_type_filter_and_advisor():
+    results = GrantRAGSystem().check_eligibility({'entity_type': "County", 'county': "Centre"}, "Land Trust Grants")
+    assert grants(results, 'ineligible_grants') == ["Land Trust Grants"]
+    assert results['regional_advisor'] is not None
+
+
+def test_batch_matches_single_applicant_path(rules):
+    rng = random.Random(3)
+    applicants = [{'entity_type': rng.choice(ENTITY_TYPES + [None, "Non-profit Land Trust"]),
+                   'has_501c3': rng.random() < 0.5, 'has_matching_funds': rng.random() < 0.5}
+                  for _ in range(500)]
+    matrix = rules.evaluate_batch(applicants)
+    assert matrix.shape == (len(applicants), len(rules.programs))
+    for row, applicant in zip(matrix, applicants):
+        eligible = set(grants(rules.evaluate(applicant), 'eligible_grants'))
+        assert [program.name in eligible for program in rules.programs] == row.tolist()
+
+
+def write_rules(path, spec, mtime):
+    path.write_text(json.dumps(spec), encoding='utf-8')
+    os.utime(path, (mtime, mtime))
+
+
+def test_rules_reload_when_the_file_changes(tmp_path):
+    with open(DEFAULT_RULES_PATH, encoding='utf-8') as f:
+        spec = json.load(f)
+    path = tmp_path / "rules.json"
+    write_rules(path, spec, 1_000_000)
+    engine = EligibilityEngine(str(path))
+    assert grants(engine.check({'entity_type': "Conservancy"}), 'eligible_grants') == ["Land Trust Grants"]
+
+    changed = copy.deepcopy(spec)
+    changed['programs'][2]['entity_types'] = ["land trust"]
+    write_rules(path, changed, 1_000_100)
+    assert grants(engine.check({'entity_type': "Conservancy"}), 'eligible_grants') == []
+
+    # A broken edit keeps the rules in force
+    path.write_text("{not json", encoding='utf-8')
+    os.utime(path, (1_000_200, 1_000_200))
+    assert grants(engine.check({'entity_type': "Land Trust"}), 'eligible_grants') == ["Land Trust Grants"]
+
+
+@pytest.mark.parametrize("content", [
+    "{not json",
+    json.dumps({'flags': {}}),
+    json.dumps({'programs': [{'entity_types': ["county"]}]}),
+    json.dumps({'programs': [{'name': "Trails", 'entity_types': ["county"], 'requires': ["has_permit"]}]}),
+    json.dumps({'programs': [{'name': "Trails", 'entity_types': [f"type {n}" for n in range(MAX_MASK_BITS + 1)]}]}),
+])
+def test_malformed_rules_raise(tmp_path, content):
+    path = tmp_path / "rules.json"
+    path.write_text(content, encoding='utf-8')
+    with pytest.raises(EligibilityRulesError):
+        EligibilityEngine(str(path)).rules
+
+
+def test_missing_rules_file_raises(tmp_path):
+    with pytest.raises(EligibilityRulesError):
+        EligibilityEngine(str(tmp_path / "absent.json")).rules
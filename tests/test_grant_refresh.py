@@ -0,0 +1,109 @@
+"""Conditional refresh, content-hash skip and single-flight/backoff against a local site."""
+import pytest
+
+import grant_rag
+from grant_rag import GrantRAGSystem
+
+LANDING = """<html><head><title>Grants</title></head><body><main>
+<h1>Community Conservation Partnerships</h1>
+<h2>Trail Grants</h2><p>Trail grants fund new and rehabilitated trails.</p>
+<a href="/grants/trails.html">Trails</a>
+</main></body></html>"""
+
+TRAILS = """<html><body><main><h1>Trail Grants</h1>
+<p>Applications are due April 2nd.</p><p>Eligible applicants include municipalities.</p>
+</main></body></html>"""
+
+
+@pytest.fixture
+def rag(site, tmp_path, monkeypatch):
+    monkeypatch.setenv("DCNR_CORPUS_STORE", str(tmp_path / "store"))
+    monkeypatch.setenv("DCNR_CRAWL_DEPTH", "0")
+    system = GrantRAGSystem()
+    system.grant_url = f"{site.url}/grants/index.html"
+    return system
+
+
+def version(rag):
+    return rag.store.read_manifest()['version']
+
+
+def test_not_modified_keeps_version_and_records_check(site, rag):
+    site.routes['/grants/index.html'] = {'body': LANDING, 'etag': '"v1"'}
+    assert rag.refresh() is not None
+    first = rag.store.read_manifest()['meta']['http'][rag.grant_url]['checked']
+
+    assert rag.refresh().version == 1
+    second = site.hits('/grants/index.html')[-1]
+    assert second['headers'].get('If-None-Match') == '"v1"'
+    assert rag.store.read_manifest()['meta']['http'][rag.grant_url]['checked'] >= first
+
+
+def test_unchanged_body_skips_parsing(site, rag, monkeypatch):
+    site.routes['/grants/index.html'] = {'body': LANDING}
+    rag.refresh()
+
+    def fail(*args, **kwargs):
+        raise AssertionError("unchanged page was parsed again")
+    monkeypatch.setattr(rag, 'parse_program_html', fail)
+    assert rag.refresh().version == 1
+
+
+def test_changed_body_saves_new_version(site, rag):
+    site.routes['/grants/index.html'] = {'body': LANDING, 'etag': '"v1"'}
+    rag.refresh()
+    site.routes['/grants/index.html'] = {'body': LANDING.replace("new and", "new, extended and"), 'etag': '"v2"'}
+    assert rag.refresh().version == 2
+
+
+def test_linked_pages_are_revalidated(site, rag):
+    rag.crawl_depth = 1
+    site.routes['/grants/index.html'] = {'body': LANDING, 'etag': '"v1"'}
+    site.routes['/grants/trails.html'] = {'body': TRAILS, 'etag': '"t1"'}
+    rag.refresh()
+    assert [page['url'] for page in rag.store.load()['pages']] == [f"{site.url}/grants/trails.html"]
+
+    assert rag.refresh().version == 1
+    assert site.hits('/grants/trails.html')[-1]['headers'].get('If-None-Match') == '"t1"'
+
+    site.routes['/grants/trails.html'] = {'body': TRAILS.replace("April 2nd", "April 9th"), 'etag': '"t2"'}
+    data = rag.refresh()
+    assert data.version == 2
+    assert any("April 9th" in deadline['text'] for deadline in data['deadlines'])
+
+
+def test_failure_backs_off_until_forced(site, rag):
+    site.routes['/grants/index.html'] = {'body': "down", 'status': 500}
+    assert rag.refresh() is None
+    assert rag.refresh_state.failures == 1
+    requests_made = len(site.hits('/grants/index.html'))
+
+    assert rag.refresh() is None
+    assert len(site.hits('/grants/index.html')) == requests_made
+
+    site.routes['/grants/index.html'] = {'body': LANDING}
+    assert rag.refresh(force=True).version == 1
+    assert rag.refresh_state.failures == 0
+
+
+def test_backoff_doubles_up_to_cap(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(grant_rag.time, 'monotonic', lambda: now[0])
+    state = grant_rag.RefreshState()
+    delays = []
+    for _ in range(12):
+        assert state.try_begin(force=True)
+        state.finish(error="boom")
+        delays.append(state.retry_at - now[0])
+    assert delays[:3] == [grant_rag.REFRESH_BACKOFF_BASE * factor for factor in (1, 2, 4)]
+    assert delays[-1] == grant_rag.REFRESH_BACKOFF_MAX
+
+
+def test_refresh_is_single_flight(site, rag):
+    site.routes['/grants/index.html'] = {'body': LANDING}
+    assert rag.refresh_state.try_begin()
+    assert rag.refresh() is None
+    assert rag.refresh_in_background() is False
+    assert site.hits('/grants/index.html') == []
+    rag.refresh_state.finish()
+    assert rag.refresh() is not None
@@ -0,0 +1,90 @@
+"""Section diffs and incremental index patches must match a full rebuild."""
+import pytest
+
+from chunking import grant_sections, make_section
+from retrieval import CorpusIndex, build_search_index, patch_search_index
+
+URL = "https://www.dcnr.pa.gov/grants"
+QUERIES = ["trail grant deadline", "matching funds for municipalities", "land acquisition conservancy",
+           "planning session feasibility study", "splash pad playground rehabilitation"]
+
+
+def corpus(sections):
+    return {
+        'sections': [make_section(URL, ["Grants", title], text) for title, text in sections.items()],
+        'planning_session_transcript': "The planning session covered feasibility studies and master plans.",
+    }
+
+
+BASE = {
+    "Trails": "Trail grants fund new and rehabilitated trails. Applications are due April 2nd. " * 8,
+    "Parks": "Park rehabilitation grants fund playgrounds and pavilions for municipalities. " * 8,
+    "Land": "Land acquisition grants help a conservancy or land trust buy open space. " * 8,
+}
+
+
+class Recorder:
+    """Records which doc_keys the patch embeds and removes"""
+
+    def __init__(self, index: CorpusIndex, monkeypatch):
+        self.embedded, self.removed = [], []
+        add_chunk, remove_documents = index.dense.add_chunk, index.remove_documents
+
+        def record_add(chunk):
+            self.embedded.append(chunk.doc_key)
+            return add_chunk(chunk)
+
+        def record_remove(doc_keys):
+            doc_keys = list(doc_keys)
+            self.removed.extend(doc_keys)
+            return remove_documents(doc_keys)
+        monkeypatch.setattr(index.dense, 'add_chunk', record_add)
+        monkeypatch.setattr(index, 'remove_documents', record_remove)
+
+
+def key(title):
+    return f"section:{URL}#Grants > {title}"
+
+
+def results(index):
+    return [[(round(score, 9), chunk.chunk_id, chunk.text) for score, chunk in index.search(query)]
+            for query in QUERIES]
+
+
+@pytest.mark.parametrize("change, added, changed, removed", [
+    ({**BASE, "Splash": "Splash pad grants fund spray parks and playground rehabilitation. " * 6},
+     ["Splash"], [], []),
+    ({**BASE, "Parks": BASE["Parks"] + "Splash pad projects qualify as playground rehabilitation."},
+     [], ["Parks"], []),
+    ({title: text for title, text in BASE.items() if title != "Land"}, [], [], ["Land"]),
+])
+def test_patch_reembeds_only_the_changed_sections(monkeypatch, change, added, changed, removed):
+    old, new = corpus(BASE), corpus(change)
+    index = build_search_index({}, old)
+    recorder = Recorder(index, monkeypatch)
+
+    diff = patch_search_index(index, old, new)
+
+    assert diff.added == [key(title) for title in added]
+    assert diff.changed == [key(title) for title in changed]
+    assert diff.removed == [key(title) for title in removed]
+    assert set(recorder.embedded) == set(diff.added + diff.changed)
+    assert sorted(recorder.removed) == sorted(diff.changed + diff.removed)
+    assert sorted(index.doc_chunks) == sorted(grant_sections(new))
+    expected = results(build_search_index({}, new))
+    assert any(expected)
+    assert results(index) == expected
+
+
+def test_unchanged_corpus_is_not_touched(monkeypatch):
+    data = corpus(BASE)
+    index = build_search_index({}, data)
+    recorder = Recorder(index, monkeypatch)
+    assert not patch_search_index(index, data, corpus(dict(BASE)))
+    assert recorder.embedded == [] and recorder.removed == []
+
+
+def test_section_keys_are_stable_and_hashes_follow_content():
+    first, second = grant_sections(corpus(BASE)), grant_sections(corpus({**BASE, "Trails": "Closed."}))
+    assert list(first) == list(second)
+    assert [first[k]['sha256'] == second[k]['sha256'] for k in first] == [False, True, True, True]
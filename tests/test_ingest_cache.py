@@ -0,0 +1,93 @@
+"""Text decoding and the on-disk bounds of the ingestion cache."""
+import os
+import time
+
+from ingest_cache import IngestionCache, decode_text
+
+
+def test_windows_punctuation_decodes_as_cp1252():
+    assert decode_text("“Trail” grants – 2025".encode('cp1252')) == "“Trail” grants – 2025"
+    assert decode_text("Café".encode('utf-8')) == "Café"
+    # 0x81 is undefined in cp1252
+    assert decode_text(b"a\x81b") == "a\x81b"
+
+
+def text(region: int) -> bytes:
+    """Uploads of almost the same size"""
+    return f"Trail grants fund new trails in region {region}. ".encode() * 50
+
+
+def disk_entries(cache):
+    return sorted(name for name in os.listdir(cache.root) if name.endswith('.json'))
+
+
+def test_least_recently_used_entries_are_dropped_beyond_the_byte_cap(tmp_path):
+    cache = IngestionCache(str(tmp_path), max_memory_entries=0)
+    first = cache.ingest(text(1), is_pdf=False)
+    entry_bytes = sum(os.path.getsize(os.path.join(cache.root, first.sha256 + ext)) for ext in ('.json', '.npy'))
+    cache.max_disk_bytes = 2.5 * entry_bytes
+    second = cache.ingest(text(2), is_pdf=False)
+    cache.get(first.sha256)
+
+    third = cache.ingest(text(3), is_pdf=False)
+    assert disk_entries(cache) == sorted([first.sha256 + '.json', third.sha256 + '.json'])
+    assert cache.get(second.sha256) is None
+
+
+def test_entries_unused_past_the_age_limit_are_dropped(tmp_path):
+    cache = IngestionCache(str(tmp_path), max_memory_entries=0, max_age_seconds=3600)
+    stale = cache.ingest(b"Old guidance", is_pdf=False)
+    past = time.time() - 7200
+    for ext in ('.json', '.npy'):
+        os.utime(os.path.join(cache.root, stale.sha256 + ext), (past, past))
+
+    # Last use is read from disk when the cache starts
+    cache = IngestionCache(str(tmp_path), max_memory_entries=0, max_age_seconds=3600)
+    fresh = cache.ingest(b"New guidance", is_pdf=False)
+    assert disk_entries(cache) == [fresh.sha256 + '.json']
+    assert not os.path.exists(os.path.join(cache.root, stale.sha256 + '.npy'))
+
+
+def test_writes_do_not_rescan_the_directory(tmp_path, monkeypatch):
+    cache = IngestionCache(str(tmp_path), max_memory_entries=0)
+    first = cache.ingest(text(1), is_pdf=False)
+    size = cache.stats()['disk_bytes']
+
+    def walk(*args):
+        raise AssertionError("the cache directory was walked again")
+    monkeypatch.setattr(os, 'walk', walk)
+    cache.max_disk_bytes = 1.5 * size
+    second = cache.ingest(text(2), is_pdf=False)
+    assert disk_entries(cache) == [second.sha256 + '.json']
+    assert cache.get(first.sha256) is None
+    assert cache.stats()['disk_bytes'] == sum(
+        os.path.getsize(os.path.join(cache.root, name)) for name in os.listdir(cache.root))
+
+
+class StreamingDocument:
+    """Stands in for PDFDocument, logging when each page is handed out"""
+    total_pages = page_count = 3
+
+    def __init__(self, events):
+        self.events = events
+
+    def pages(self):
+        for page_no in range(1, self.page_count + 1):
+            self.events.append(f"page {page_no}")
+            yield page_no, f"Page {page_no} covers trail grant eligibility and matching funds."
+
+
+def test_pdf_pages_are_embedded_as_they_arrive(tmp_path):
+    cache = IngestionCache(str(tmp_path))
+    events = []
+    feature_counts = cache.embedder.feature_counts
+
+    def record(text):
+        events.append(f"embed {text.split()[1]}")
+        return feature_counts(text)
+    cache.embedder.feature_counts = record
+
+    entry = cache.ingest(b"%PDF-stub", is_pdf=True, document=StreamingDocument(events))
+    assert events == ["page 1", "embed 1", "page 2", "embed 2", "page 3", "embed 3"]
+    assert [page for page, _ in entry.pages] == [1, 2, 3]
+    assert len(entry.spans) == len(entry.vectors) == 3
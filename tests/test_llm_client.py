@@ -0,0 +1,217 @@
+"""Retries, circuit breaking and rate limiting against a local chat-completions stub."""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from openai import BadRequestError
+
+from llm_client import (CircuitBreaker, LLMUnavailableError, RateLimiter, ResilientLLMClient, get_shared_client,
+                        parse_retry_after)
+
+
+def completion(content: str = "ok") -> dict:
+    return {"id": "stub", "object": "chat.completion", "created": 0, "model": "stub",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                         "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2}}
+
+
+class StubLLM:
+    """Answers POSTs from a script of (status, headers, body); the last entry repeats"""
+
+    def __init__(self):
+        self.script = [(200, {}, completion())]
+        self.calls = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers['Content-Length']))
+                stub.calls.append(time.monotonic())
+                status, headers, body = stub.script.pop(0) if len(stub.script) > 1 else stub.script[0]
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+ERROR = {"error": {"message": "stub error"}}
+
+
+@pytest.fixture
+def stub():
+    server = StubLLM()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def make_client(stub):
+    clients = []
+
+    def make(**kwargs):
+        sleeps = []
+        kwargs.setdefault('sleep', sleeps.append)
+        client = ResilientLLMClient("test-key", base_url=stub.base_url, **kwargs)
+        client.sleeps = sleeps
+        clients.append(client)
+        return client
+    yield make
+    for client in clients:
+        client.close()
+
+
+def ask(client, **kwargs):
+    return client.create_chat_completion(model="stub", messages=[{"role": "user", "content": "hi"}], **kwargs)
+
+
+def test_429_waits_for_retry_after(stub, make_client):
+    stub.script = [(429, {"Retry-After": "2"}, ERROR), (200, {}, completion("after wait"))]
+    client = make_client()
+    assert ask(client).choices[0].message.content == "after wait"
+    assert len(stub.calls) == 2
+    assert client.sleeps[0] >= 2
+
+
+def test_5xx_is_retried_then_gives_up(stub, make_client):
+    stub.script = [(500, {}, ERROR), (503, {}, ERROR), (200, {}, completion())]
+    client = make_client(max_retries=3)
+    assert ask(client).choices[0].message.content == "ok"
+    assert len(stub.calls) == 3
+
+    stub.calls.clear()
+    stub.script = [(502, {}, ERROR)]
+    with pytest.raises(LLMUnavailableError):
+        ask(client)
+    assert len(stub.calls) == 4
+    assert client.breaker.failures == 1
+
+
+def test_client_errors_are_not_retried(stub, make_client):
+    stub.script = [(400, {}, ERROR)]
+    client = make_client()
+    with pytest.raises(BadRequestError):
+        ask(client)
+    assert len(stub.calls) == 1
+    assert client.breaker.state == "closed"
+
+
+def test_breaker_opens_half_opens_and_closes(stub, make_client):
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=lambda: now[0])
+    client = make_client(max_retries=0, breaker=breaker)
+    stub.script = [(503, {}, ERROR)]
+    for _ in range(2):
+        with pytest.raises(LLMUnavailableError):
+            ask(client)
+    assert breaker.state == "open"
+
+    with pytest.raises(LLMUnavailableError, match="circuit is open"):
+        ask(client)
+    assert len(stub.calls) == 2
+
+    now[0] = 31
+    assert breaker.state == "half-open"
+    stub.script = [(503, {}, ERROR)]
+    with pytest.raises(LLMUnavailableError):
+        ask(client)
+    assert breaker.state == "open"
+
+    now[0] = 62
+    stub.script = [(200, {}, completion())]
+    ask(client)
+    assert breaker.state == "closed"
+
+
+def test_unexpected_error_settles_half_open_probe(make_client, monkeypatch):
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=lambda: now[0])
+    client = make_client(max_retries=0, breaker=breaker)
+    breaker.record_failure()
+    now[0] = 31
+
+    def broken(**kwargs):
+        raise ValueError("unexpected")
+    monkeypatch.setattr(client.openai.chat.completions, "create", broken)
+    with pytest.raises(ValueError):
+        ask(client)
+    assert breaker.state == "open"
+
+    now[0] = 62
+    monkeypatch.undo()
+    ask(client)
+    assert breaker.state == "closed"
+
+
+def test_stream_errors_are_recorded(make_client, monkeypatch):
+    client = make_client()
+
+    def broken_stream():
+        yield "first"
+        raise ConnectionResetError("stream dropped")
+
+    monkeypatch.setattr(client.openai.chat.completions, "create", lambda **kwargs: broken_stream())
+    pieces = []
+    with pytest.raises(ConnectionResetError):
+        for piece in ask(client, stream=True):
+            pieces.append(piece)
+    assert pieces == ["first"]
+    assert client.breaker.failures == 1
+
+
+def test_rate_limiter_spaces_requests():
+    now = [0.0]
+
+    def sleep(seconds):
+        now[0] += seconds
+    limiter = RateLimiter(rate=10, burst=2, clock=lambda: now[0], sleep=sleep)
+    for _ in range(6):
+        limiter.acquire()
+    # Two requests go at once, the other four wait 0.1 s each
+    assert now[0] == pytest.approx(0.4)
+
+
+def test_client_spends_a_token_per_attempt(stub, make_client):
+    stub.script = [(500, {}, ERROR), (200, {}, completion())]
+    client = make_client(rate_limiter=RateLimiter(rate=20, burst=1), sleep=lambda seconds: None)
+    started = time.monotonic()
+    for _ in range(3):
+        ask(client)
+    # Four attempts at 20/s with a burst of one take at least three intervals
+    assert len(stub.calls) == 4
+    assert time.monotonic() - started >= 0.15
+
+
+def test_shared_client_follows_key_and_endpoint(monkeypatch):
+    monkeypatch.delenv("OPENAI_BASE_URL", raising=False)
+    first = get_shared_client("sk-old")
+    assert get_shared_client("sk-old") is first
+    assert get_shared_client("sk-new") is not first
+    assert get_shared_client("sk-old", base_url="http://127.0.0.1:9/v1") is not first
+
+
+@pytest.mark.parametrize("headers, expected", [
+    ({"retry-after-ms": "-250"}, 0.0),
+    ({"retry-after-ms": "1500"}, 1.5),
+    ({"retry-after": "-3"}, 0.0),
+    ({"retry-after": "2"}, 2.0),
+])
+def test_retry_after_is_never_negative(headers, expected):
+    assert parse_retry_after(headers) == expected
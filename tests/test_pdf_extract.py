@@ -0,0 +1,21 @@
+"""Parallel extraction must return the same pages, in order, as the serial path."""
+import io
+
+import PyPDF2
+
+from pdf_extract import PARALLEL_MIN_PAGES, PDFDocument
+
+
+def blank_pdf(pages: int) -> bytes:
+    writer = PyPDF2.PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(100, 100)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+def test_worker_processes_match_serial_extraction():
+    document = PDFDocument(blank_pdf(PARALLEL_MIN_PAGES + 5))
+    assert list(document.pages(workers=2)) == list(document.pages(workers=1))
+    assert [number for number, _ in document.pages(workers=2)] == list(range(1, PARALLEL_MIN_PAGES + 6))
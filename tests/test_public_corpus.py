@@ -0,0 +1,108 @@
+"""Hot-swapping the shared public corpus while readers are using it."""
+import threading
+
+import pytest
+
+from assistant import search_all_content
+from grant_rag import GrantRAGSystem
+from public_corpus import PublicCorpus
+from retrieval import RetrievalCache
+
+QUERY = "splash pad grants for municipalities"
+
+
+@pytest.fixture
+def corpus(tmp_path, monkeypatch):
+    monkeypatch.setenv("DCNR_CORPUS_STORE", str(tmp_path / "store"))
+    rag = GrantRAGSystem()
+    # Keep the test offline: the seed corpus is old enough to trigger a background scrape
+    monkeypatch.setattr(rag, 'refresh_if_stale', lambda grant_data: False)
+    return PublicCorpus(rag, check_interval=0)
+
+
+def search(snapshot):
+    return search_all_content(QUERY, {}, snapshot.grant_data, index=snapshot.index)
+
+
+def publish_new_version(corpus, old):
+    data = dict(old.grant_data)
+    data['general_info'] = old.grant_data['general_info'] + "\nSplash pad grants now fund municipalities."
+    corpus.rag_system.store.save(data)
+
+
+def test_readers_keep_their_snapshot_across_a_swap(corpus):
+    old = corpus.current()
+    expected = search(old)
+    assert not any("Splash pad" in text for _, _, text in expected)
+
+    stop = threading.Event()
+    started = threading.Barrier(5)
+    failures, generations = [], []
+
+    def hold_old_snapshot():
+        started.wait()
+        while not stop.is_set():
+            if search(old) != expected:
+                failures.append("old snapshot changed under a reader")
+
+    def follow_current():
+        seen = []
+        started.wait()
+        while not stop.is_set():
+            snapshot = corpus.current()
+            seen.append(snapshot.generation)
+            if snapshot.generation == old.generation and search(snapshot) != expected:
+                failures.append("current snapshot mixed versions")
+        generations.append(seen)
+
+    readers = [threading.Thread(target=hold_old_snapshot) for _ in range(2)]
+    readers += [threading.Thread(target=follow_current) for _ in range(2)]
+    for reader in readers:
+        reader.start()
+    try:
+        started.wait()
+        publish_new_version(corpus, old)
+        new = corpus.reload()
+    finally:
+        stop.set()
+        for reader in readers:
+            reader.join()
+
+    assert failures == []
+    assert new.generation > old.generation
+    assert corpus.current() is new
+    for seen in generations:
+        assert seen == sorted(seen)
+    assert any("Splash pad" in text for _, _, text in search(new))
+    assert search(old) == expected
+
+    # Cache keys of the app's cached_search_all_content go stale with the generation
+    assert RetrievalCache.make_key(QUERY, (old.generation, 0)) != RetrievalCache.make_key(QUERY, (new.generation, 0))
+
+
+def test_only_one_thread_builds_a_new_snapshot(corpus, monkeypatch):
+    old = corpus.current()
+    publish_new_version(corpus, old)
+    builds = []
+    load_search_index = corpus.rag_system.load_search_index
+
+    def counting_load(grant_data):
+        builds.append(grant_data.version)
+        return load_search_index(grant_data)
+    monkeypatch.setattr(corpus.rag_system, 'load_search_index', counting_load)
+
+    barrier = threading.Barrier(6)
+    results = []
+
+    def read():
+        barrier.wait()
+        results.append(corpus.current())
+    threads = [threading.Thread(target=read) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(builds) == 1
+    assert all(snapshot.generation in (old.generation, old.generation + 1) for snapshot in results)
+    assert corpus.current().generation == old.generation + 1